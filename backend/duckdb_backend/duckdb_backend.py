@@ -0,0 +1,83 @@
+import duckdb
+import pandas as pd
+import pyarrow as pa
+
+from backend.duckdb_backend.duckdb_populated_table import (
+    DuckDBPopulatedTable,
+    arrow_to_pandas,
+)
+from backend.sql_backend.sql_backend import SQLBackend
+from backend.sql_backend.sql_frame import Query, SQLFrame, quote
+from representation.representation import End
+from schema.node import AtomicNode, SchemaClass
+
+
+class DuckDBBackend(SQLBackend):
+    """
+    A SQLBackend that keeps its tables in DuckDB, a columnar database.
+    Data frames are loaded through Arrow, and the result of a derivation is kept as an Arrow table,
+    so joins, cross products and deduplication are vectorised and run on every core.
+    """
+
+    def __init__(self, database: str = ":memory:", threads: int | None = None):
+        """
+        Creates a new DuckDBBackend
+
+        Args:
+            database (str): The path of the database file. Defaults to a new in-memory database
+            threads (int | None): The number of threads DuckDB may use. Defaults to one per core
+        """
+        super().__init__()
+        self.connection = duckdb.connect(database)
+        if threads is not None:
+            self.connection.execute(f"SET threads = {int(threads)}")
+
+    def null_safe_eq(self, x: str, y: str) -> str:
+        return f"{x} IS NOT DISTINCT FROM {y}"
+
+    def execute_statement(self, sql: str) -> None:
+        self.connection.execute(sql)
+
+    def read_query(self, sql: str) -> pd.DataFrame:
+        return arrow_to_pandas(self.connection.execute(sql).to_arrow_table())
+
+    def write_table(self, table: str, data: pd.DataFrame) -> None:
+        self.connection.register(
+            "frame", pa.Table.from_pandas(data, preserve_index=False)
+        )
+        try:
+            self.connection.execute(
+                f"CREATE OR REPLACE TABLE {quote(table)} AS SELECT * FROM frame"
+            )
+        finally:
+            self.connection.unregister("frame")
+
+    def register_table(self, table: str, data: pd.DataFrame) -> None:
+        # The frame is scanned in place through Arrow, rather than copied into a table of the database
+        self.connection.register(
+            table, pa.Table.from_pandas(data, preserve_index=False)
+        )
+
+    def unregister_table(self, table: str) -> None:
+        self.connection.unregister(table)
+
+    def extend_domain(self, node: AtomicNode, domain_node: SchemaClass):
+        # The table is rebuilt, rather than inserted into, so that the type of its column
+        # is widened to fit the domain that extends it
+        table = quote(self.node_tables[node])
+        domain = quote(self.node_tables[self.lookup(domain_node)])
+        self.execute_statement(
+            f"CREATE OR REPLACE TABLE {table} AS "
+            f"SELECT v FROM {table} UNION SELECT v FROM {domain}"
+        )
+
+    def populate(
+        self, query: Query, frame: SQLFrame, last: End
+    ) -> DuckDBPopulatedTable:
+        if frame.source is None:
+            return DuckDBPopulatedTable(pa.table({}), self.connection)
+        sql, labels = query.to_sql(frame)
+        result = self.connection.execute(sql).to_arrow_table()
+        return DuckDBPopulatedTable(
+            result.rename_columns([str(label) for label in labels]), self.connection
+        )
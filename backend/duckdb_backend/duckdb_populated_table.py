@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import itertools
+import operator
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from backend.pandas_backend.display import display_column, window_bounds
+from backend.pandas_backend.exp_compiler import exp_compiler
+from backend.populated_table import PopulatedTable
+from backend.sql_backend.sql_frame import quote
+from exp.exp import Exp
+from frontend.derivation.derivation_node import ColumnNode
+from representation.domain import Domain
+
+_names = itertools.count()
+
+
+def arrow_to_pandas(table: pa.Table) -> pd.DataFrame:
+    """
+    Converts an Arrow table to a pandas data frame.
+    List columns become columns of Python lists and missing values become NaN,
+    as they are in the frames of the pandas backend.
+
+    Args:
+        table (pa.Table): The Arrow table
+
+    Returns:
+        pd.DataFrame: The data frame
+    """
+    columns = {}
+    for name, column in zip(table.column_names, table.columns):
+        if pa.types.is_list(column.type) or pa.types.is_large_list(column.type):
+            columns[name] = pd.Series(column.to_pylist(), dtype=object)
+        else:
+            columns[name] = column.to_pandas()
+            if columns[name].dtype == object:
+                columns[name] = columns[name].where(columns[name].notnull(), np.nan)
+    return pd.DataFrame(columns, columns=table.column_names)
+
+
+class DuckDBPopulatedTable(PopulatedTable):
+    """
+    A populated table whose raw table is an Arrow table.
+    Displaying the table, and selecting the columns needed by expressions and aggregations,
+    runs in DuckDB, so only the table that is displayed is converted to pandas.
+    The query that displays the table is only run when its result is first needed,
+    and a window of it is fetched with LIMIT and OFFSET.
+    """
+
+    def __init__(self, raw_table: pa.Table, connection):
+        """
+        Creates a new DuckDBPopulatedTable
+
+        Args:
+            raw_table (pa.Table): The result of the derivation
+            connection: The DuckDB connection used to query the raw table
+        """
+        # Arrow tables are immutable, so the raw table is shared rather than copied
+        self.raw_table = raw_table
+        self.connection = connection
+        self.display_query = None
+        self.to_display = None
+        self.num_rows = None
+        self.keys_count = 0
+        self.dropped_vals_count = 0
+
+    @classmethod
+    def create_from_table(cls, table: DuckDBPopulatedTable) -> DuckDBPopulatedTable:
+        populated = DuckDBPopulatedTable(table.raw_table, table.connection)
+        populated.display_query = table.display_query
+        populated.to_display = table.to_display
+        populated.num_rows = table.num_rows
+        populated.keys_count = table.keys_count
+        populated.dropped_vals_count = table.dropped_vals_count
+        return populated
+
+    def column(self, name: str) -> str:
+        """
+        Returns the identifier of a column of the raw table.
+        DuckDB matches identifiers case-insensitively, so columns are referred to by position.
+
+        Args:
+            name (str): The name of the column
+
+        Returns:
+            str: The quoted identifier
+        """
+        return quote(f"c{self.raw_table.column_names.index(name)}")
+
+    def query(self, sql: str, ctes: list[str] = None) -> pa.Table:
+        """
+        Runs a query over the raw table, which the query refers to as raw
+
+        Args:
+            sql (str): The query
+            ctes (list[str]): Common table expressions the query may also refer to
+
+        Returns:
+            pa.Table: The result of the query
+        """
+        name = f"raw_{next(_names)}"
+        ctes = [f"raw AS (SELECT * FROM {quote(name)})"] + (ctes or [])
+        raw = self.raw_table.rename_columns(
+            [f"c{i}" for i in range(self.raw_table.num_columns)]
+        )
+        self.connection.register(name, raw)
+        try:
+            return self.connection.execute(
+                f"WITH {', '.join(ctes)} {sql}"
+            ).to_arrow_table()
+        finally:
+            self.connection.unregister(name)
+
+    def get_raw_table(self):
+        return arrow_to_pandas(self.raw_table)
+
+    def display(
+        self, left: list[ColumnNode], right: list[ColumnNode], backend: "DuckDBBackend"
+    ):
+        keys = left
+        hidden = [c.get_hidden_keys() for c in keys if c.is_val_column()]
+        to_add_set = set()
+        to_add = []
+        for hid in hidden:
+            for h in hid:
+                if h not in to_add_set:
+                    to_add_set.add(h)
+                    to_add += [h]
+        keys = keys + to_add
+        values = right
+
+        self.to_display = None
+        self.num_rows = None
+        self.dropped_vals_count = 0
+        if len(values) == 0:
+            self.keys_count = reduce(
+                operator.mul,
+                [backend.get_domain_size(c.get_schema_node()) for c in left],
+            )
+            self.display_query = None
+            self.to_display = pd.DataFrame()
+            self.num_rows = 0
+            return self
+
+        keys_str = [k.get_name() for k in keys]
+        vals_str = [v.get_name() for v in values]
+        ks = [self.column(k) for k in keys_str]
+        on = " AND ".join(f"l.{k} IS NOT DISTINCT FROM r.{k}" for k in ks)
+        ctes = [
+            "app AS (SELECT DISTINCT * FROM raw)",
+            f"d0 AS (SELECT DISTINCT {', '.join(ks)} FROM app)",
+        ]
+        lists = set()
+        previous = []
+        for i, val in enumerate(values):
+            v = self.column(val.get_name())
+            hidden_dependencies = [
+                h.name for h in val.get_hidden_keys() if h.name not in set(hidden)
+            ]
+            if len(hidden_dependencies) > 0:
+                not_null = " AND ".join(f"{c} IS NOT NULL" for c in ks + [v])
+                to_add = (
+                    f"SELECT {', '.join(ks)}, list({v}) AS {v} FROM app "
+                    f"WHERE {not_null} GROUP BY {', '.join(ks)}"
+                )
+                lists.add(val.get_name())
+            else:
+                to_add = f"SELECT {', '.join(ks + [v])} FROM app"
+            projection = [f"COALESCE(l.{k}, r.{k}) AS {k}" for k in ks]
+            projection += [f"l.{p}" for p in previous] + [f"r.{v}"]
+            ctes += [
+                f"d{i + 1} AS (SELECT DISTINCT {', '.join(projection)} "
+                f"FROM d{i} AS l FULL OUTER JOIN ({to_add}) AS r ON {on})"
+            ]
+            previous += [v]
+
+        vs = [
+            (
+                f"COALESCE({self.column(v)}, []) AS {self.column(v)}"
+                if v in lists
+                else self.column(v)
+            )
+            for v in vals_str
+        ]
+        all_missing = " AND ".join(f"{self.column(v)} IS NULL" for v in vals_str)
+        any_missing = " OR ".join(f"{k} IS NULL" for k in ks)
+        sql = (
+            f"SELECT DISTINCT {', '.join(ks + vs)} FROM d{len(values)} "
+            f"WHERE NOT ({all_missing}) AND NOT ({any_missing})"
+        )
+        self.keys_count = reduce(
+            operator.mul,
+            [backend.get_domain_size(c.get_schema_node()) for c in keys],
+            1,
+        )
+        self.display_query = (sql, ctes, ks, keys_str, vals_str)
+        return self
+
+    def fetch_display(self, limit: int | None = None, offset: int = 0) -> pd.DataFrame:
+        """
+        Runs the query that displays the table
+
+        Args:
+            limit (int | None): The most rows to fetch, or None for every row from the offset on
+            offset (int): The first row to fetch
+
+        Returns:
+            pd.DataFrame: The rows, indexed by the keys
+        """
+        sql, ctes, ks, keys_str, vals_str = self.display_query
+        # Rows with the same keys are ordered by their values, so that windows do not overlap
+        order = ks + [self.column(v) for v in vals_str]
+        sql = f"{sql} ORDER BY {', '.join(order)}"
+        if limit is not None:
+            sql = f"{sql} LIMIT {limit} OFFSET {offset}"
+        result = self.query(sql, ctes)
+        df = arrow_to_pandas(result.rename_columns(keys_str + vals_str))
+        return df.set_index(keys_str)
+
+    def get_table_to_display(self):
+        assert self.display_query is not None or self.to_display is not None
+        if self.to_display is None:
+            self.to_display = self.fetch_display()
+            self.num_rows = len(self.to_display)
+        return self.to_display
+
+    def get_displayed_table(self) -> pd.DataFrame | None:
+        return self.to_display
+
+    def get_window(self, offset: int, limit: int | None) -> pd.DataFrame:
+        """
+        Returns a window of the displayed frame.
+        Unless the frame has already been fetched, only the rows of the window are fetched.
+
+        Args:
+            offset (int): The first row of the window, counted from the end if negative
+            limit (int | None): The most rows the window has, or None for every row from the first on
+
+        Returns:
+            pd.DataFrame: The rows of the window
+        """
+        if self.to_display is not None:
+            start, stop = window_bounds(len(self.to_display), offset, limit)
+            return self.to_display.iloc[start:stop]
+        if offset < 0 or limit is None:
+            start, stop = window_bounds(self.get_num_rows(), offset, limit)
+            offset, limit = start, stop - start
+        return self.fetch_display(max(limit, 0), offset)
+
+    def get_num_rows(self) -> int:
+        if self.num_rows is None:
+            sql, ctes, _, _, _ = self.display_query
+            result = self.query(f"SELECT count(*) FROM ({sql})", ctes)
+            self.num_rows = result.column(0)[0].as_py()
+        return self.num_rows
+
+    def display_column(self, value: str, keys: list[str]) -> pd.DataFrame | None:
+        """
+        Builds the displayed frame of one of the value columns from the displayed frame,
+        if it has already been fetched with the same keys
+
+        Args:
+            value (str): The name of the value column
+            keys (list[str]): The names of the key columns the column is displayed by
+
+        Returns:
+            pd.DataFrame | None: The values of the column indexed by the keys, or None if the
+                displayed frame has not been fetched with those keys
+        """
+        if (
+            self.to_display is None
+            or value not in self.to_display.columns
+            or list(self.to_display.index.names) != keys
+        ):
+            return None
+        df = display_column(self.to_display, value)
+        # The query that displays the column orders the rows with the same keys by its values
+        if df[value].map(lambda v: isinstance(v, list)).any():
+            return df
+        return (
+            df.reset_index().sort_values(keys + [value], kind="stable").set_index(keys)
+        )
+
+    def get_num_dropped_keys(self):
+        return self.keys_count - self.get_num_rows()
+
+    def get_num_dropped_vals(self):
+        return self.dropped_vals_count
+
+    def evaluate_exp(
+        self, exp: Exp, start: list[Domain], modified_keys: list[int]
+    ) -> pd.DataFrame:
+        df = arrow_to_pandas(self.raw_table.select([k.name for k in start]))
+        df = df.rename({k.name: i for i, k in enumerate(start)}, axis=1)
+        n = len(start)
+        val = pd.DataFrame(exp_compiler(exp)(df))
+        assert len(val.columns) == 1
+        val = val.rename(columns={val.columns[0]: n})
+        df = df.join(val)
+        df = df[modified_keys + [n]].rename(
+            {j: i for (i, j) in enumerate(modified_keys)} | {n: len(modified_keys)},
+            axis=1,
+        )
+        return df
+
+    def group_by(self, keys: list[Domain], val: Domain) -> pd.DataFrame:
+        columns = ", ".join(self.column(k.name) for k in keys + [val])
+        df = arrow_to_pandas(self.query(f"SELECT DISTINCT {columns} FROM raw"))
+        df.columns = list(range(len(df.columns)))
+        return df
+
+    def copy(self) -> DuckDBPopulatedTable:
+        return DuckDBPopulatedTable.create_from_table(self)
@@ -0,0 +1,158 @@
+import importlib.util
+import os
+import unittest
+
+import expecttest
+import pandas as pd
+
+from backend.pandas_backend.exceptions import KeyDuplicationException
+from schema.schema import Schema
+
+duckdb_installed = importlib.util.find_spec("duckdb") is not None
+bonuses = os.path.join(os.path.dirname(__file__), "../../../tests/csv/bonuses")
+
+
+@unittest.skipUnless(duckdb_installed, "duckdb is not installed")
+class TestDuckDBBackend(expecttest.TestCase):
+
+    def initialise(self):
+        from backend.duckdb_backend.duckdb_backend import DuckDBBackend
+
+        trips_df = pd.DataFrame(
+            {
+                "trip_id": [1, 2, 3, 4],
+                "hr": [7, 7, 8, 9],
+                "destination": ["Zoo", "CBD", "Zoo", "Uni"],
+            }
+        )
+        backend = DuckDBBackend(threads=2)
+        backend.write_table("trips", trips_df)
+        s = Schema(backend=backend)
+        trips = s.insert_sql_table("trips", ["trip_id"])
+        return s, trips
+
+    def test_executeQuery_keepsResultAsArrowTable(self):
+        import pyarrow as pa
+
+        s, trips = self.initialise()
+        t = s.get(trip_id=trips["trip_id"]).infer(["trip_id"], trips["hr"])
+        self.assertIsInstance(t.populated_table.raw_table, pa.Table)
+        self.assertIs(t.populated_table.raw_table, t.populated_table.copy().raw_table)
+
+    def test_display_distinguishesColumnsByCase(self):
+        s, trips = self.initialise()
+        t = s.get(Trip=trips["trip_id"], trip=trips["trip_id"])
+        t = t.infer(["Trip"], trips["hr"]).infer(["trip"], trips["destination"])
+        self.assertExpectedInline(
+            str(t),
+            """\
+[Trip trip || hr destination]
+           hr destination
+Trip trip                
+1    1      7         Zoo
+     2      7         CBD
+     3      7         Zoo
+     4      7         Uni
+2    1      7         Zoo
+     2      7         CBD
+     3      7         Zoo
+     4      7         Uni
+3    1      8         Zoo
+     2      8         CBD
+     3      8         Zoo
+     4      8         Uni
+4    1      9         Zoo
+     2      9         CBD
+     3      9         Zoo
+     4      9         Uni
+
+""",
+        )
+
+    def test_displayColumn_matchesColumnDisplayedByQuery(self):
+        s, trips = self.initialise()
+        t = s.get(trip_id=trips["trip_id"]).infer(["trip_id"], trips["hr"])
+        t = t.infer(["trip_id"], trips["destination"])
+        fresh = str(t["destination"])
+        str(t)
+        self.assertIsNotNone(
+            t.populated_table.display_column("destination", ["trip_id"])
+        )
+        self.assertEqual(fresh, str(t["destination"]))
+        self.assertExpectedInline(
+            fresh,
+            """\
+[trip_id || destination]
+        destination
+trip_id            
+1               Zoo
+2               CBD
+3               Zoo
+4               Uni""",
+        )
+
+    def test_evaluateExpAndGroupBy_runOnArrowTable(self):
+        s, trips = self.initialise()
+        t = s.get(trip_id=trips["trip_id"]).infer(["trip_id"], trips["hr"])
+        t = t.infer(["trip_id"], trips["destination"])
+        t = t.mutate(late=t["hr"] > 7).hide("hr")
+        self.assertExpectedInline(
+            str(t),
+            """\
+[trip_id || destination late]
+        destination   late
+trip_id                   
+1               Zoo  False
+2               CBD  False
+3               Zoo   True
+4               Uni   True
+
+""",
+        )
+        grouped = t.populated_table.group_by(
+            [t.get_domain_with_name("destination")], t.get_domain_with_name("late")
+        )
+        self.assertExpectedInline(
+            str(grouped.sort_values([0, 1]).reset_index(drop=True)),
+            """\
+     0      1
+0  CBD  False
+1  Uni   True
+2  Zoo  False
+3  Zoo   True""",
+        )
+
+    def test_insertDataframes_loadsSchemaFromCSV(self):
+        from backend.duckdb_backend.duckdb_backend import DuckDBBackend
+
+        cardnum_df = pd.read_csv(f"{bonuses}/cardnum.csv").set_index("val_id")
+        person_df = pd.read_csv(f"{bonuses}/person.csv").set_index("cardnum")
+        backend = DuckDBBackend(threads=2)
+        s = Schema(backend=backend)
+        cardnum, person = s.insert_dataframes([cardnum_df, person_df])
+        s.blend(cardnum["cardnum"], person["cardnum"], s.create_class("Cardnum"))
+        t = s.get(val_id=cardnum["val_id"]).infer(["val_id"], cardnum["cardnum"])
+        t = t.infer(["cardnum"], person["person"])
+        self.assertExpectedInline(
+            str(t),
+            """\
+[val_id || cardnum person]
+        cardnum person
+val_id                
+1          5172    NaN
+2          2354  Steve
+3          1410    Tom
+4          1111  Steve
+5          2354  Steve
+8          4412    NaN
+
+""",
+        )
+        tables = backend.connection.execute("SHOW TABLES").fetchall()
+        self.assertEqual([t for (t,) in tables if t.startswith("frame")], [])
+
+        self.assertRaises(
+            KeyDuplicationException,
+            lambda: s.insert_dataframes([person_df, pd.concat([person_df] * 2)]),
+        )
+        self.assertEqual(len(s.schema_graph.schema_nodes), 5)
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype
+
+
+def is_missing(value) -> bool:
+    """
+    Returns True if a scalar cell is None or NaN
+
+    Args:
+        value: The cell
+
+    Returns:
+        bool: True if the cell is missing, False otherwise
+    """
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def to_hashable(value):
+    """
+    Converts a cell into a hashable value that compares equal exactly when the cells are equal.
+    List cells (e.g. the values of a column with hidden keys) become tuples,
+    and missing values inside them are normalised so that NaN compares equal to NaN.
+
+    Args:
+        value: The cell
+
+    Returns:
+        The hashable value
+    """
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return tuple(None if is_missing(v) else to_hashable(v) for v in value)
+    return value
+
+
+def duplicated_rows(df: pd.DataFrame) -> np.ndarray:
+    """
+    Marks every row that is equal to an earlier row.
+    Rows are hashed column by column, without converting the frame to strings.
+    Missing values are equal to each other.
+
+    Args:
+        df (pd.DataFrame): The frame
+
+    Returns:
+        np.ndarray: A boolean mask, True for every duplicate row
+    """
+    columns = {}
+    for i in range(len(df.columns)):
+        column = df.iloc[:, i]
+        if column.dtype == object and infer_dtype(column, skipna=True) == "mixed":
+            column = column.map(to_hashable)
+        columns[i] = column
+    return pd.DataFrame(columns, copy=False).duplicated(keep="first").to_numpy()
+
+
+def deduplicate(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Drops every row of a frame that is equal to an earlier row
+
+    Args:
+        df (pd.DataFrame): The frame
+
+    Returns:
+        pd.DataFrame: The frame, keeping the first occurrence of each row
+    """
+    if len(df.columns) == 0 or len(df) <= 1:
+        return df
+    duplicated = duplicated_rows(df)
+    if not duplicated.any():
+        return df
+    return df[~duplicated]
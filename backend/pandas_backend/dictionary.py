@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype
+
+
+def decode_column(column: pd.Series) -> pd.Series:
+    """
+    Replaces a categorical column by the values it encodes
+
+    Args:
+        column (pd.Series): The column
+
+    Returns:
+        pd.Series: The values, or the column itself if it is not categorical
+    """
+    if not isinstance(column.dtype, pd.CategoricalDtype):
+        return column
+    return column.astype(column.dtype.categories.dtype)
+
+
+def decode(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replaces the categorical columns of a frame by the values they encode
+
+    Args:
+        df (pd.DataFrame): The frame
+
+    Returns:
+        pd.DataFrame: The frame, or a shallow copy of it with object columns in place of categorical ones
+    """
+    encoded = [
+        i for i, dtype in enumerate(df.dtypes) if isinstance(dtype, pd.CategoricalDtype)
+    ]
+    if len(encoded) == 0:
+        return df
+    df = df.copy(deep=False)
+    for i in encoded:
+        df.isetitem(i, decode_column(df.iloc[:, i]))
+    return df
+
+
+class StringDictionary:
+    """
+    An append-only dictionary of the strings stored in a pandas backend.
+    String columns are encoded as categoricals whose codes index into the dictionary, and every
+    encoded column shares the dtype of the dictionary, so that pandas joins and deduplicates
+    them by their integer codes. As there is one dictionary for the whole backend, nodes that
+    are blended share it without being encoded again.
+    Strings are only ever appended, so the codes of a column stay valid as the dictionary grows,
+    and a column encoded before it grew is brought up to date by relabelling its codes.
+    """
+
+    def __init__(self):
+        """Creates a new, empty StringDictionary"""
+        self.dtype = pd.CategoricalDtype(pd.Index([], dtype=object))
+
+    def __len__(self):
+        return len(self.dtype.categories)
+
+    def is_current(self, column: pd.Series) -> bool:
+        return (
+            isinstance(column.dtype, pd.CategoricalDtype)
+            and column.dtype.categories is self.dtype.categories
+        )
+
+    def is_encoded(self, column: pd.Series) -> bool:
+        """
+        Returns True if a column is a categorical encoded with this dictionary, as it is now or was before it grew
+
+        Args:
+            column (pd.Series): The column
+
+        Returns:
+            bool: True if the codes of the column index into this dictionary
+        """
+        if not isinstance(column.dtype, pd.CategoricalDtype):
+            return False
+        categories = column.dtype.categories
+        strings = self.dtype.categories
+        if categories is strings:
+            return True
+        return len(categories) <= len(strings) and strings[: len(categories)].equals(
+            categories
+        )
+
+    def encode(self, column: pd.Series) -> pd.Series:
+        """
+        Encodes a column of strings, adding the strings that are not in the dictionary to it.
+        Columns encoded before the dictionary grew are relabelled, and columns that are not
+        of strings are returned as they are.
+
+        Args:
+            column (pd.Series): The column
+
+        Returns:
+            pd.Series: The encoded column
+        """
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            if self.is_current(column):
+                return column
+            if self.is_encoded(column):
+                return self.from_codes(column.cat.codes.to_numpy(), column)
+            column = column.astype(column.dtype.categories.dtype)
+        if column.dtype != object or infer_dtype(column, skipna=True) != "string":
+            return column
+        codes = self.dtype.categories.get_indexer(column)
+        new = np.flatnonzero(codes == -1)
+        new = new[column.iloc[new].notna().to_numpy()]
+        if len(new) > 0:
+            added = pd.Index(column.iloc[new].unique(), dtype=object)
+            self.dtype = pd.CategoricalDtype(self.dtype.categories.append(added))
+            codes[new] = self.dtype.categories.get_indexer(column.iloc[new])
+        return self.from_codes(codes, column)
+
+    def encode_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Encodes the columns of strings of a frame, and brings its encoded columns up to date
+
+        Args:
+            df (pd.DataFrame): The frame
+
+        Returns:
+            pd.DataFrame: The frame, or a shallow copy of it with its columns of strings encoded
+        """
+        columns = [df.iloc[:, i] for i in range(len(df.columns))]
+        encoded = [self.encode(c) for c in columns]
+        changed = [i for i, c in enumerate(columns) if encoded[i] is not c]
+        if len(changed) == 0:
+            return df
+        df = df.copy(deep=False)
+        for i in changed:
+            df.isetitem(i, encoded[i])
+        return df
+
+    def refresh(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Brings the encoded columns of a frame up to date, without looking at its other columns
+
+        Args:
+            df (pd.DataFrame): The frame
+
+        Returns:
+            pd.DataFrame: The frame, or a shallow copy of it with its encoded columns relabelled
+        """
+        stale = [
+            i
+            for i, dtype in enumerate(df.dtypes)
+            if isinstance(dtype, pd.CategoricalDtype)
+            and not self.is_current(df.iloc[:, i])
+        ]
+        if len(stale) == 0:
+            return df
+        df = df.copy(deep=False)
+        for i in stale:
+            df.isetitem(i, self.encode(df.iloc[:, i]))
+        return df
+
+    def concat(self, frames: list[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Concatenates frames with the same columns, encoding their columns of strings.
+        Columns that are encoded in every frame are concatenated by their codes,
+        as pandas would otherwise compare their dictionaries string by string.
+
+        Args:
+            frames (list[pd.DataFrame]): The frames
+
+        Returns:
+            pd.DataFrame: The concatenated frame, with a new range index
+        """
+        frames = [self.encode_frame(f) for f in frames]
+        n = len(frames[0].columns)
+        encoded = [
+            i for i in range(n) if all(self.is_current(f.iloc[:, i]) for f in frames)
+        ]
+        columns = {
+            i: pd.Categorical.from_codes(
+                np.concatenate([f.iloc[:, i].cat.codes.to_numpy() for f in frames]),
+                dtype=self.dtype,
+                validate=False,
+            )
+            for i in encoded
+        }
+        others = [i for i in range(n) if i not in columns]
+        if len(others) > 0:
+            # The other columns are concatenated as pandas concatenates the frames
+            rest = pd.concat(
+                [decode(f.iloc[:, others]) for f in frames], ignore_index=True
+            )
+            for j, i in enumerate(others):
+                columns[i] = self.encode(rest.iloc[:, j])
+        df = pd.DataFrame({i: columns[i] for i in range(n)}, copy=False)
+        df.columns = frames[0].columns
+        return df
+
+    def from_codes(self, codes, column: pd.Series) -> pd.Series:
+        encoded = pd.Categorical.from_codes(codes, dtype=self.dtype, validate=False)
+        return pd.Series(encoded, index=column.index, name=column.name, copy=False)
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from backend.pandas_backend.deduplicate import deduplicate, duplicated_rows
+from backend.pandas_backend.dictionary import decode
+
+
+def group_lists(values: pd.Series, groups: np.ndarray, num_groups: int) -> np.ndarray:
+    """
+    Collects the values of each group that are not missing into a list, in the order they occur
+
+    Args:
+        values (pd.Series): The values
+        groups (np.ndarray): The group of each value, numbered from 0
+        num_groups (int): The number of groups
+
+    Returns:
+        np.ndarray: The list of each group, or NaN for a group without values
+    """
+    lists = np.full(num_groups, np.nan, dtype=object)
+    present = values.notna().to_numpy()
+    if not present.any():
+        return lists
+    groups = groups[present]
+    order = np.argsort(groups, kind="stable")
+    groups = groups[order]
+    values = values[present].astype(object).to_numpy()[order]
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    for group, part in zip(groups[starts], np.split(values, starts[1:])):
+        lists[group] = part.tolist()
+    return lists
+
+
+def number_groups(rows: pd.DataFrame, keys: list[str]) -> tuple[np.ndarray, int]:
+    """
+    Numbers the groups of rows with the same keys, in the order they first occur
+
+    Args:
+        rows (pd.DataFrame): The rows, none of which have missing keys
+        keys (list[str]): The key columns
+
+    Returns:
+        tuple[np.ndarray, int]: The group of each row, and the number of groups
+    """
+    groups = (
+        rows.groupby(keys, sort=False, dropna=False, observed=True).ngroup().to_numpy()
+    )
+    return groups, groups.max() + 1 if len(groups) > 0 else 0
+
+
+def combine_values(rows: pd.DataFrame, keys: list[str], values: list[str]):
+    """
+    Pairs every key with each combination of the distinct values it has in each value column,
+    combining the columns from left to right
+
+    Args:
+        rows (pd.DataFrame): The rows, none of which have missing keys
+        keys (list[str]): The key columns
+        values (list[str]): The value columns
+
+    Returns:
+        pd.DataFrame: The keys and the combinations of values, with the keys in the order they first occur
+    """
+    combined = deduplicate(rows[keys])
+    for value in values:
+        combined = pd.merge(
+            combined, deduplicate(rows[keys + [value]]), on=keys, how="left"
+        )
+    return combined
+
+
+def display_frame(
+    table: pd.DataFrame, keys: list[str], values: list[str], listed: set[str]
+) -> pd.DataFrame:
+    """
+    Builds the frame a table displays from its rows, in one grouped pass over them.
+    Rows are grouped by their keys, and rows with a missing key are dropped.
+    Each key is paired with the distinct value of every value column, which is usually unique;
+    only keys with more than one combination of values are combined column by column.
+    Values that depend on hidden keys are collected into a list per key instead, and keys
+    without any value are dropped.
+
+    Args:
+        table (pd.DataFrame): The distinct rows of the table, with every key and value column
+        keys (list[str]): The key columns, including the hidden keys the values are displayed by
+        values (list[str]): The value columns, in the order they are displayed
+        listed (set[str]): The value columns that are collected into lists
+
+    Returns:
+        pd.DataFrame: The values, indexed by the keys in the order they first occur in the table
+    """
+    rows = table[table[keys].notna().all(axis=1).to_numpy()]
+    groups, num_groups = number_groups(rows, keys)
+
+    scalars = [v for v in values if v not in listed]
+    distinct = ~duplicated_rows(rows[keys + scalars])
+    df = rows[keys + scalars][distinct]
+    df_groups = groups[distinct]
+    combinations = np.bincount(df_groups, minlength=num_groups)
+    if (combinations > 1).any():
+        unique = combinations[df_groups] == 1
+        repeated = combinations[groups] > 1
+        combined = combine_values(rows[repeated], keys, scalars)
+        combined_groups = np.flatnonzero(combinations > 1)[
+            combined.groupby(keys, sort=False, dropna=False).ngroup().to_numpy()
+        ]
+        df = pd.concat([df[unique], combined])
+        df_groups = np.concatenate([df_groups[unique], combined_groups])
+        order = np.argsort(df_groups, kind="stable")
+        df, df_groups = df.iloc[order], df_groups[order]
+    df = df.reset_index(drop=True)
+
+    lists = {v: group_lists(rows[v], groups, num_groups) for v in values if v in listed}
+    for value, column in lists.items():
+        df[value] = column[df_groups]
+    kept = df[values].notna().any(axis=1).to_numpy()
+    df = df[keys + values][kept]
+    # Keys without values that depend on hidden keys display them as empty lists
+    for value, column in lists.items():
+        for group in np.flatnonzero(pd.isna(column)):
+            column[group] = []
+        df[value] = column[df_groups[kept]]
+    return df.set_index(keys)
+
+
+def count_rows(
+    rows: pd.DataFrame,
+    groups: np.ndarray,
+    num_groups: int,
+    values: list[str],
+    listed: set[str],
+) -> np.ndarray:
+    """
+    Counts the rows display_frame builds for each group, without building them.
+    A group has a row for each combination of the distinct values of the columns that are not
+    collected into lists, less the combination of missing values if all of its values are missing.
+    Duplicate rows and encoded columns do not change the counts.
+
+    Args:
+        rows (pd.DataFrame): The rows, none of which have missing keys
+        groups (np.ndarray): The group of each row, numbered from 0
+        num_groups (int): The number of groups
+        values (list[str]): The value columns
+        listed (set[str]): The value columns that are collected into lists
+
+    Returns:
+        np.ndarray: The number of rows of each group
+    """
+    counts = np.ones(num_groups, dtype=np.int64)
+    all_missing = np.ones(num_groups, dtype=bool)
+    for value in values:
+        missing = rows[value].isna().to_numpy()
+        if value in listed:
+            all_missing &= np.bincount(groups[~missing], minlength=num_groups) == 0
+            continue
+        distinct = ~duplicated_rows(
+            pd.DataFrame({0: groups, 1: rows[value]}, copy=False)
+        )
+        counts *= np.bincount(groups[distinct], minlength=num_groups)
+        all_missing &= np.bincount(groups[missing], minlength=num_groups) > 0
+    return counts - all_missing
+
+
+def window_bounds(total: int, offset: int, limit: int | None) -> tuple[int, int]:
+    """
+    Finds the rows of a window over a frame
+
+    Args:
+        total (int): The number of rows of the frame
+        offset (int): The first row of the window, counted from the end if negative
+        limit (int | None): The most rows the window has, or None for every row from the first on
+
+    Returns:
+        tuple[int, int]: The first row of the window, and the row after its last
+    """
+    start = max(total + offset, 0) if offset < 0 else min(offset, total)
+    stop = total if limit is None else min(start + max(limit, 0), total)
+    return start, stop
+
+
+def display_window(
+    table: pd.DataFrame,
+    keys: list[str],
+    values: list[str],
+    listed: set[str],
+    offset: int,
+    limit: int | None,
+) -> tuple[pd.DataFrame, int]:
+    """
+    Builds a window of the frame display_frame would build, and counts the rows of the whole frame.
+    The rows of every group are counted first, so that only the rows of the table whose keys
+    are in the window are deduplicated, decoded and displayed.
+
+    Args:
+        table (pd.DataFrame): The rows of the table, which may be duplicated or encoded
+        keys (list[str]): The key columns, including the hidden keys the values are displayed by
+        values (list[str]): The value columns, in the order they are displayed
+        listed (set[str]): The value columns that are collected into lists
+        offset (int): The first row of the window, counted from the end if negative
+        limit (int | None): The most rows the window has, or None for every row from the first on
+
+    Returns:
+        tuple[pd.DataFrame, int]: The rows of the window, and the number of rows of the frame
+    """
+    present = np.flatnonzero(table[keys].notna().all(axis=1).to_numpy())
+    rows = table[keys + values].iloc[present]
+    groups, num_groups = number_groups(rows, keys)
+    counts = count_rows(rows, groups, num_groups, values, listed)
+    ends = np.cumsum(counts)
+    total = int(ends[-1]) if num_groups > 0 else 0
+    start, stop = window_bounds(total, offset, limit)
+    in_window = (ends > start) & (ends - counts < stop)
+    first = int((ends - counts)[in_window][0]) if in_window.any() else start
+    selected = np.zeros(len(table), dtype=bool)
+    selected[present[in_window[groups]]] = True
+    # Rows are deduplicated with all of their columns, as display_frame is given them
+    app = decode(deduplicate(table[selected])[keys + values])
+    df = display_frame(app, keys, values, listed)
+    return df.iloc[start - first : stop - first], total
+
+
+def display_column(df: pd.DataFrame, value: str) -> pd.DataFrame:
+    """
+    Builds the frame display_frame would build for one of the value columns of a frame it has
+    built, with the same keys, from that frame rather than from the rows of the table.
+    Each key keeps the distinct values it has in the column, in the order they first occur,
+    and keys whose values are all missing, or whose list is empty, are dropped.
+
+    Args:
+        df (pd.DataFrame): The frame built by display_frame
+        value (str): The value column
+
+    Returns:
+        pd.DataFrame: The values of the column, indexed by the keys
+    """
+    column = df[[value]]
+    empty = column[value].map(lambda v: isinstance(v, list) and len(v) == 0)
+    column = column[column[value].notna().to_numpy() & ~empty.to_numpy()]
+    return column[~duplicated_rows(column.reset_index())]
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from collections.abc import Hashable
+
+from backend.pandas_backend.plan_cache import PlanCache
+
+
+class ExecutionTrace:
+    """
+    The interpreter states reached while executing the intermediate representation of a table.
+    The i-th state is the state after interpreting the prefix with the i-th digest, together with
+    the nodes and edges that prefix read. States that were not kept are None.
+    The states are charged to the budget of the plan cache, as the states of its entries are.
+    """
+
+    def __init__(
+        self,
+        digests: list[str],
+        states: list[tuple | None],
+        dependencies: list[frozenset[Hashable] | None],
+    ):
+        """
+        Creates a new ExecutionTrace
+
+        Args:
+            digests (list[str]): The digests of each prefix of the representation
+            states (list[tuple | None]): The (stack, stack pointer) pair after each prefix
+            dependencies (list[frozenset[Hashable] | None]): The nodes and edges read by each prefix
+        """
+        assert len(digests) == len(states) == len(dependencies)
+        self.digests = digests
+        self.states = states
+        self.dependencies = dependencies
+        self.size = self.size_of_states()
+
+    def size_of_states(self) -> int:
+        """
+        Estimates the number of bytes the kept states take up
+
+        Returns:
+            int: The number of bytes charged for the states
+        """
+        return sum(
+            PlanCache.size_of(state) for state in self.states if state is not None
+        )
+
+    def longest_common_prefix(self, digests: list[str]) -> int:
+        """
+        Finds the length of the longest prefix shared with another representation
+
+        Args:
+            digests (list[str]): The digests of each prefix of the other representation
+
+        Returns:
+            int: The number of steps in the longest shared prefix
+        """
+        n = min(len(self.digests), len(digests))
+        # digests are chained, so the shared prefixes are exactly the first i
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.digests[mid - 1] == digests[mid - 1]:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Drops the states of the prefixes that read the data of a node or edge.
+        Prefixes read everything their own prefixes read, so the trace is cut before the first of them.
+
+        Args:
+            key (Hashable): The node or edge whose data has changed
+        """
+        for i, dependencies in enumerate(self.dependencies):
+            if dependencies is not None and key in dependencies:
+                self.digests = self.digests[:i]
+                self.states = self.states[:i]
+                self.dependencies = self.dependencies[:i]
+                self.size = self.size_of_states()
+                return
+
+    def __len__(self):
+        return len(self.digests)
@@ -0,0 +1,390 @@
+import operator
+import typing
+from collections.abc import Callable, Hashable
+
+import numpy as np
+import pandas as pd
+
+from backend.pandas_backend.exp_interpreter import aggregate, exp_interpreter, negate
+from exp.exp import Exp
+
+BINARY = {
+    "ADD": ("+", operator.add, "np.add"),
+    "SUB": ("-", operator.sub, "np.subtract"),
+    "MUL": ("*", operator.mul, "np.multiply"),
+    "DIV": ("/", operator.truediv, "np.true_divide"),
+    "EQ": ("==", operator.eq, "np.equal"),
+    "LT": ("<", operator.lt, "np.less"),
+    "AND": ("&", operator.and_, "np.bitwise_and"),
+    "OR": ("|", operator.or_, "np.bitwise_or"),
+}
+
+UNARY = {
+    "NEG": ("-{}", operator.neg, "np.negative"),
+    "NOT": ("~{}", negate, "np.invert"),
+    "NA": ("pd.isnull({})", pd.isnull, None),
+}
+
+AGGREGATIONS = {
+    "SUM": "sum",
+    "MAX": "max",
+    "MIN": "min",
+    "ANY": "any",
+    "ALL": "all",
+    "COU": "size",
+    "POP": "first",
+}
+
+
+class Constant:
+    """
+    The value of an expression that is known when it is compiled
+    """
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Fused:
+    """
+    An element-wise operation that has not been emitted yet.
+    Element-wise operations over each other are emitted together, as one fused block.
+    """
+
+    def __init__(self, code: str, operands: list):
+        self.code = code
+        self.operands = operands
+        # The variable holding the result, once the operation has been emitted
+        self.variable: str | None = None
+
+
+Operand = Constant | str | Fused
+
+
+def arrays(index: pd.Index, *series) -> list[np.ndarray] | None:
+    """
+    Returns the values of Series that a fused block can compute over directly,
+    i.e. numeric or boolean NumPy arrays aligned with the table
+
+    Args:
+        index (pd.Index): The index of the table
+        *series: The Series the fused block reads
+
+    Returns:
+        list[np.ndarray] | None: The values of each Series, or None if any Series cannot be computed over directly
+    """
+    for s in series:
+        if not isinstance(s, pd.Series) or not isinstance(s.dtype, np.dtype):
+            return None
+        if s.dtype.kind not in "biuf":
+            return None
+        if s.index is not index and not s.index.equals(index):
+            return None
+    return [s.to_numpy() for s in series]
+
+
+def ufunc(f: np.ufunc, reusable: list[np.ndarray], *operands) -> np.ndarray:
+    """
+    Applies a ufunc, writing its result into the first reusable array of the result's dtype
+
+    Args:
+        f (np.ufunc): The ufunc
+        reusable (list[np.ndarray]): The intermediate results that are not used after this one
+        *operands: The arrays and scalars the ufunc is applied to
+
+    Returns:
+        np.ndarray: The result
+    """
+    empty = [o[:0] if isinstance(o, np.ndarray) else o for o in operands]
+    dtype = f(*empty).dtype
+    out = next((r for r in reusable if r.dtype == dtype), None)
+    return f(*operands, out=out)
+
+
+def key_of(value) -> Hashable:
+    if isinstance(value, list):
+        return tuple(key_of(v) for v in value)
+    if isinstance(value, Exp):
+        return expression_key(value)
+    try:
+        hash(value)
+    except TypeError:
+        return id(value)
+    return type(value).__name__, value
+
+
+def expression_key(exp: Exp) -> Hashable:
+    """
+    Returns a key that is equal for expressions with the same structure,
+    which is how common subexpressions are found
+
+    Args:
+        exp (Exp): The expression
+
+    Returns:
+        Hashable: The key
+    """
+    return (type(exp).__name__,) + tuple(
+        (name, key_of(value))
+        for name, value in sorted(vars(exp).items())
+        if name != "exp_type"
+    )
+
+
+class ExpCompiler:
+    """
+    Compiles an expression into the source of a single function over a table.
+    Constant subexpressions are folded, and subexpressions that occur more than once are
+    evaluated once. Every intermediate result is freed as soon as it is last used.
+    Element-wise operations over each other are fused: over numeric and boolean columns they are
+    computed with NumPy ufuncs, which write into the intermediate results that are no longer needed
+    rather than allocating new ones. Over other columns, e.g. of strings or with nullable dtypes,
+    they are computed one by one with pandas, as the interpreter does.
+    Expressions the compiler does not know are evaluated by the interpreter.
+    """
+
+    def __init__(self):
+        self.statements: list[tuple[list[str], list[str]]] = []
+        self.namespace = {
+            "np": np,
+            "pd": pd,
+            "aggregate": aggregate,
+            "arrays": arrays,
+            "ufunc": ufunc,
+        }
+        self.operands: dict[Hashable, Operand] = {}
+        self.variables = 0
+
+    def bind(self, value) -> str:
+        """
+        Makes a value available to the compiled function
+
+        Args:
+            value: The value
+
+        Returns:
+            str: The name the function refers to the value by
+        """
+        name = f"c{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+    def variable(self) -> str:
+        name = f"v{self.variables}"
+        self.variables += 1
+        return name
+
+    def reference(self, operand: Operand) -> str:
+        if isinstance(operand, Constant):
+            return self.bind(operand.value)
+        if isinstance(operand, Fused):
+            return self.fuse(operand)
+        return operand
+
+    def emit(self, template: str, operands: list[Operand]) -> str:
+        """
+        Adds a statement assigning a new variable
+
+        Args:
+            template (str): The right hand side, with a placeholder for each operand
+            operands (list[Operand]): The operands
+
+        Returns:
+            str: The name of the new variable
+        """
+        references = [self.reference(o) for o in operands]
+        target = self.variable()
+        variables = [
+            r for o, r in zip(operands, references) if not isinstance(o, Constant)
+        ]
+        self.statements += [([f"{target} = {template.format(*references)}"], variables)]
+        return target
+
+    def fuse(self, root: Fused) -> str:
+        """
+        Adds a block computing an element-wise operation and the element-wise operations it is over.
+        The block computes them with ufuncs if the Series it reads are NumPy arrays aligned with the
+        table, and with pandas otherwise.
+
+        Args:
+            root (Fused): The operation
+
+        Returns:
+            str: The name of the variable holding its result
+        """
+        if root.variable is not None:
+            return root.variable
+        nodes: list[Fused] = []
+        leaves: dict[str, int] = {}
+
+        def collect(operand: Operand):
+            if isinstance(operand, Fused) and operand.variable is None:
+                if all(operand is not n for n in nodes):
+                    for o in operand.operands:
+                        collect(o)
+                    nodes.append(operand)
+            elif not isinstance(operand, Constant):
+                name = self.reference(operand)
+                leaves.setdefault(name, len(leaves))
+
+        collect(root)
+        last_uses = {}
+        for i, node in enumerate(nodes):
+            for o in node.operands:
+                last_uses[id(o)] = i
+
+        constants: dict[int, str] = {}
+
+        def operand_source(operand: Operand, names: dict[int, str], fused: bool) -> str:
+            if isinstance(operand, Constant):
+                if id(operand) not in constants:
+                    constants[id(operand)] = self.bind(operand.value)
+                return constants[id(operand)]
+            if isinstance(operand, Fused) and operand.variable is None:
+                return names[id(operand)]
+            name = self.reference(operand)
+            return f"x[{leaves[name]}]" if fused else name
+
+        def lines(target: str, fused: bool) -> list[str]:
+            names: dict[int, str] = {}
+            body = []
+            for i, node in enumerate(nodes):
+                if node is root:
+                    names[id(node)] = target
+                else:
+                    names[id(node)] = f"r{i}" if fused else self.variable()
+                args = [operand_source(o, names, fused) for o in node.operands]
+                dead = [
+                    names[id(o)]
+                    for o in dict.fromkeys(node.operands)
+                    if isinstance(o, Fused) and id(o) in names and last_uses[id(o)] == i
+                ]
+                symbol, _, function = (BINARY | UNARY)[node.code]
+                if fused and function is not None:
+                    source = (
+                        f"ufunc({function}, [{', '.join(dead)}], {', '.join(args)})"
+                    )
+                elif node.code in BINARY:
+                    source = f"{args[0]} {symbol} {args[1]}"
+                else:
+                    source = symbol.format(*args)
+                body += [f"{names[id(node)]} = {source}"]
+                if len(dead) > 0:
+                    body += [f"del {', '.join(dead)}"]
+            return body
+
+        target = self.variable()
+        block = [f"x = arrays(t.index, {', '.join(leaves)})", "if x is None:"]
+        block += [f"    {line}" for line in lines(target, False)]
+        block += ["else:", '    with np.errstate(all="ignore"):']
+        block += [f"        {line}" for line in lines("r", True)]
+        block += [f"    {target} = pd.Series(r, index=t.index)", "    del r"]
+        block += ["del x"]
+        self.statements += [(block, list(leaves))]
+        root.variable = target
+        return target
+
+    def column(self, column) -> str:
+        key = ("column", key_of(column))
+        if key not in self.operands:
+            self.operands[key] = self.emit("t[{}]", [Constant(column)])
+        return typing.cast(str, self.operands[key])
+
+    def visit(self, exp: Exp) -> Operand:
+        key = expression_key(exp)
+        if key not in self.operands:
+            self.operands[key] = self.compile_expression(exp)
+        return self.operands[key]
+
+    def compile_expression(self, exp: Exp) -> Operand:
+        code = exp.code
+        if code == "CNT":
+            return Constant(getattr(exp, "constant"))
+        if code == "COL":
+            return self.column(getattr(exp, "column"))
+        if code in BINARY:
+            operands = [
+                self.visit(getattr(exp, "lexp")),
+                self.visit(getattr(exp, "rexp")),
+            ]
+            return self.apply(code, operands)
+        if code in UNARY:
+            return self.apply(code, [self.visit(getattr(exp, "exp"))])
+        if code in AGGREGATIONS:
+            arguments = [getattr(exp, name) for name in ["keys", "hids", "column"]]
+            return self.emit(
+                f'aggregate(t, {{}}, {{}}, {{}}, "{AGGREGATIONS[code]}")',
+                [Constant(a) for a in arguments],
+            )
+        if code == "EXT":
+            column = self.column(getattr(exp, "column"))
+            fexp = self.visit(getattr(exp, "fexp"))
+            return self.emit("{}.where({}.notna(), {})", [column, column, fexp])
+        if code == "MSK":
+            column = self.column(getattr(exp, "column"))
+            bexp = self.visit(getattr(exp, "bexp"))
+            return self.emit(
+                "{}.where(pd.notna({}) & {}, np.nan)", [column, bexp, bexp]
+            )
+        return self.emit("{}(t)", [Constant(exp_interpreter(exp))])
+
+    def apply(self, code: str, operands: list[Operand]) -> Operand:
+        if all(isinstance(o, Constant) for o in operands):
+            fold = (BINARY | UNARY)[code][1]
+            try:
+                return Constant(
+                    fold(*[typing.cast(Constant, o).value for o in operands])
+                )
+            except Exception:
+                # The error is raised when the expression is evaluated, as it is by the interpreter
+                pass
+        return Fused(code, operands)
+
+    def source(self, result: Operand) -> str:
+        """
+        Returns the source of the compiled function
+
+        Args:
+            result (Operand): The operand the function returns
+
+        Returns:
+            str: The source
+        """
+        if isinstance(result, Constant):
+            returned = f"pd.Series({self.bind(result.value)}, index=t.index)"
+        else:
+            returned = self.reference(result)
+        last_uses = {}
+        for i, (_, variables) in enumerate(self.statements):
+            for v in variables:
+                last_uses[v] = i
+        lines = ["def kernel(t):"]
+        for i, (body, _) in enumerate(self.statements):
+            lines += [f"    {line}" for line in body]
+            dead = sorted(v for v, j in last_uses.items() if j == i and v != returned)
+            if len(dead) > 0:
+                lines += [f"    del {', '.join(dead)}"]
+        lines += [f"    return {returned}"]
+        return "\n".join(lines)
+
+
+def exp_compiler(exp: Exp) -> Callable[[pd.DataFrame], pd.Series]:
+    """
+    Compiles an expression into a function evaluating it over a table.
+    The function computes the same values as the interpreter, but performs every
+    operation of the expression in one function body.
+
+    Args:
+        exp (Exp): The expression
+
+    Returns:
+        Callable[[pd.DataFrame], pd.Series]: The function
+    """
+    compiler = ExpCompiler()
+    result = compiler.visit(exp)
+    source = compiler.source(result)
+    namespace = compiler.namespace
+    exec(compile(source, f"<kernel {exp}>", "exec"), namespace)
+    kernel = namespace["kernel"]
+    kernel.source = source
+    return kernel
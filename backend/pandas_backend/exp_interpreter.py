@@ -9,19 +9,49 @@ from exp.exp import *
 from exp.sexp import *
 
 
-def aggregate(t: pd.DataFrame, keys, hids, col, op):
+def aggregate(t: pd.DataFrame, keys, hids, col, op: str):
+    """
+    Aggregates a column over the rows that share the same keys
+
+    Args:
+        t (pd.DataFrame): The table
+        keys: The columns to group by
+        hids: The hidden keys, which with the keys identify the rows that are aggregated
+        col: The column to aggregate
+        op (str): The grouped reduction, one of "sum", "max", "min", "size", "any", "all" or "first"
+
+    Returns:
+        pd.Series: The aggregate of the group of each row of the table
+    """
     if len(keys) > 0:
         df = t.drop_duplicates(keys + hids).dropna()
-        bs = t[[c for c in t.columns if c != col]]
-        return bs.join(
-            df.groupby(keys)[col].agg(list).apply(op).reset_index().set_index(keys),
-            on=keys,
-        )[col]
+        grouped = getattr(df.groupby(keys, sort=False)[col], op)()
+        if len(keys) == 1:
+            index = pd.Index(t[keys[0]])
+        else:
+            index = pd.MultiIndex.from_frame(t[keys])
+        return pd.Series(grouped.reindex(index).to_numpy(), index=t.index, name=col)
     else:
         # TODO
         return col
 
 
+def negate(value):
+    """
+    Negates a boolean Series, or a boolean constant.
+    ~ is the bitwise complement of a Python bool, so ~True is -2, and constants are negated with not instead.
+
+    Args:
+        value: The Series or constant
+
+    Returns:
+        The negation
+    """
+    if isinstance(value, bool):
+        return not value
+    return ~value
+
+
 def exp_interpreter(exp: Exp):
     if isinstance(exp, Aexp):
         return aexp_interpreter(exp)
@@ -36,13 +66,13 @@ def exp_interpreter(exp: Exp):
                 keys = pop.keys
                 col = pop.column
                 hids = pop.hids
-                return lambda t: aggregate(t, keys, hids, col, lambda x: x[0])
+                return lambda t: aggregate(t, keys, hids, col, "first")
             case "COU":
                 cou = typing.cast(CountExp, exp)
                 keys = cou.keys
                 col = cou.column
                 hids = cou.hids
-                return lambda t: aggregate(t, keys, hids, col, len)
+                return lambda t: aggregate(t, keys, hids, col, "size")
             case "EXT":
                 ext = typing.cast(ExtendExp, exp)
                 keys = ext.keys
@@ -102,19 +132,19 @@ def aexp_interpreter(exp: Aexp):
             keys = som.keys
             col = som.column
             hids = som.hids
-            return lambda t: aggregate(t, keys, hids, col, np.sum)
+            return lambda t: aggregate(t, keys, hids, col, "sum")
         case "MAX":
             mux = typing.cast(MaxAexp, exp)
             keys = mux.keys
             col = mux.column
             hids = mux.hids
-            return lambda t: aggregate(t, keys, hids, col, np.max)
+            return lambda t: aggregate(t, keys, hids, col, "max")
         case "MIN":
             mni = typing.cast(MaxAexp, exp)
             keys = mni.keys
             hids = mni.hids
             col = mni.column
-            return lambda t: aggregate(t, keys, hids, col, np.min)
+            return lambda t: aggregate(t, keys, hids, col, "min")
 
 
 def bexp_interpreter(exp: Bexp):
@@ -142,7 +172,7 @@ def bexp_interpreter(exp: Bexp):
         case "NOT":
             nt = typing.cast(NotBexp, exp)
             sexp = exp_interpreter(nt.exp)
-            return lambda t: ~sexp(t)
+            return lambda t: negate(sexp(t))
         case "AND":
             an = typing.cast(AndBexp, exp)
             lexp = exp_interpreter(an.lexp)
@@ -158,13 +188,13 @@ def bexp_interpreter(exp: Bexp):
             keys = ani.keys
             hids = ani.hids
             col = ani.column
-            return lambda t: aggregate(t, keys, hids, col, np.any)
+            return lambda t: aggregate(t, keys, hids, col, "any")
         case "ALL":
             oll = typing.cast(AllBexp, exp)
             keys = oll.keys
             hids = oll.hids
             col = oll.column
-            return lambda t: aggregate(t, keys, hids, col, np.all)
+            return lambda t: aggregate(t, keys, hids, col, "all")
 
 
 def sexp_interpreter(exp: Sexp):
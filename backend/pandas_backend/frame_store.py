@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import itertools
+import os
+import pickle
+import uuid
+import weakref
+from collections.abc import Hashable, Iterable, Iterator, Mapping, MutableMapping
+
+import pandas as pd
+
+from backend.pandas_backend.dictionary import StringDictionary
+
+METADATA_KEY = b"frame store"
+
+# The stores that map files written by save_frames, whose files must outlive later saves
+_borrowing_stores: weakref.WeakValueDictionary[int, FrameStore] = (
+    weakref.WeakValueDictionary()
+)
+
+
+def arrow_errors() -> tuple[type[Exception], ...]:
+    """
+    Returns the errors pyarrow raises for frames it cannot represent.
+    pyarrow is only imported once frames are written to files, so that backends that keep
+    their frames in memory do not require it.
+
+    Returns:
+        tuple[type[Exception], ...]: The errors
+    """
+    import pyarrow as pa
+
+    return pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError
+
+
+def write_frame(
+    df: pd.DataFrame, path: str, dictionary: StringDictionary | None = None
+) -> None:
+    """
+    Writes a frame to an Arrow IPC file.
+    Arrow only names columns with strings, and infers the types of columns of Python objects,
+    so the column labels and the dtypes of the frame are pickled into the schema metadata.
+    Columns encoded with the dictionary are written as their codes, and their dtype is recorded as None.
+    The file is written beside the path and then moved to it, so a file that is already
+    at the path, and may be mapped, is replaced rather than overwritten.
+
+    Args:
+        df (pd.DataFrame): The frame
+        path (str): The path of the file
+        dictionary (StringDictionary | None): The dictionary the columns of strings are encoded with
+    """
+    import pyarrow as pa
+
+    dtypes = list(df.dtypes)
+    named = df.set_axis([str(i) for i in range(len(df.columns))], axis=1, copy=False)
+    for i in range(len(df.columns)):
+        if dictionary is not None and dictionary.is_encoded(df.iloc[:, i]):
+            named.isetitem(i, df.iloc[:, i].cat.codes)
+            dtypes[i] = None
+    table = pa.Table.from_pandas(named, preserve_index=True)
+    metadata = pickle.dumps((list(df.columns), dtypes, df.index.dtype))
+    table = table.replace_schema_metadata(
+        table.schema.metadata | {METADATA_KEY: metadata}
+    )
+    with pa.OSFile(f"{path}.tmp", "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(f"{path}.tmp", path)
+
+
+def read_frame(path: str, dictionary: StringDictionary | None = None) -> pd.DataFrame:
+    """
+    Maps a frame written by write_frame into memory.
+    Numeric columns without missing values are read-only views of the mapped file, so their
+    pages are only read when they are used, and are shared by every process that maps the file.
+
+    Args:
+        path (str): The path of the file
+        dictionary (StringDictionary | None): The dictionary the frame was written with, or one it has grown into
+
+    Returns:
+        pd.DataFrame: The frame
+    """
+    import pyarrow as pa
+
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    labels, dtypes, index_dtype = pickle.loads(table.schema.metadata[METADATA_KEY])
+    df = table.to_pandas(split_blocks=True)
+    df = df.set_axis(labels, axis=1, copy=False)
+    for i, dtype in enumerate(dtypes):
+        if dtype is None:
+            codes = df.iloc[:, i]
+            df.isetitem(i, dictionary.from_codes(codes.to_numpy(), codes))
+        elif df.dtypes.iloc[i] != dtype:
+            df.isetitem(i, df.iloc[:, i].astype(dtype))
+    if df.index.dtype != index_dtype:
+        df.index = df.index.astype(index_dtype)
+    return df
+
+
+def save_frames(
+    frames: Mapping[Hashable, pd.DataFrame],
+    directory: str,
+    dictionary: StringDictionary | None = None,
+) -> dict[Hashable, str | pd.DataFrame]:
+    """
+    Writes frames to Arrow IPC files in a directory, which is created if it does not exist, and requires pyarrow.
+    Every file is given a new name, so files that were saved to the directory before are left as they are,
+    and frames a FrameStore maps from files in the directory are not written again.
+    remove_replaced_frames removes the files of earlier saves once they are no longer referred to.
+
+    Args:
+        frames (Mapping[Hashable, pd.DataFrame]): The frames
+        directory (str): The directory
+        dictionary (StringDictionary | None): The dictionary the columns of strings are encoded with
+
+    Returns:
+        dict[Hashable, str | pd.DataFrame]: The path of the file of each frame, or the frame itself if Arrow cannot represent it
+    """
+    os.makedirs(directory, exist_ok=True)
+    saved = {}
+    for key in frames:
+        if isinstance(frames, FrameStore) and key in frames.paths:
+            path = frames.paths[key]
+            directories = os.path.dirname(os.path.abspath(path)), os.path.abspath(
+                directory
+            )
+            if path in frames.borrowed and directories[0] == directories[1]:
+                saved[key] = path
+                continue
+        df = frames[key]
+        path = os.path.join(directory, f"{uuid.uuid4()}.arrow")
+        try:
+            write_frame(df, path, dictionary)
+            saved[key] = path
+        except arrow_errors():
+            saved[key] = df
+    return saved
+
+
+def remove_replaced_frames(
+    directory: str, replaced: Iterable[str], saved: Iterable[str]
+) -> None:
+    """
+    Removes the files of an earlier save to a directory that a later save no longer refers to.
+    Other files in the directory, and files that stores in this process still map frames from,
+    e.g. those of a schema loaded from the directory, are left as they are.
+
+    Args:
+        directory (str): The directory
+        replaced (Iterable[str]): The names or paths of the files the earlier save wrote
+        saved (Iterable[str]): The names or paths of the files the later save refers to
+    """
+    keep = {os.path.basename(path) for path in saved}
+    borrowed = {
+        os.path.abspath(path)
+        for store in list(_borrowing_stores.values())
+        for path in store.borrowed
+    }
+    for name in {os.path.basename(path) for path in replaced} - keep:
+        path = os.path.join(directory, name)
+        if os.path.abspath(path) not in borrowed and os.path.exists(path):
+            os.remove(path)
+
+
+class FrameStore(MutableMapping):
+    """
+    A mapping from keys to frames, which are kept in Arrow IPC files in a directory.
+    Frames are written when they are stored, and mapped into memory when they are first looked up,
+    so frames that are never looked up take up no memory.
+    Frames that Arrow cannot represent, e.g. of arbitrary Python objects, are kept in memory instead.
+    Writing and mapping the files requires pyarrow, which a store without a directory never imports.
+    """
+
+    def __init__(
+        self,
+        directory: str | None,
+        saved: dict[Hashable, str | pd.DataFrame] | None = None,
+        dictionary: StringDictionary | None = None,
+    ):
+        """
+        Creates a new FrameStore
+
+        Args:
+            directory (str | None): The directory the files are kept in, which is created if it does not exist.
+                If None, frames that are stored are kept in memory
+            saved (dict[Hashable, str | pd.DataFrame] | None): Frames written by save_frames, which the store
+                starts with. Their files are mapped like the store's own, but are never removed by it
+            dictionary (StringDictionary | None): The dictionary the columns of strings are encoded with,
+                whose codes are written in place of the strings
+        """
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.paths: dict[Hashable, str] = {}
+        self.frames: dict[Hashable, pd.DataFrame] = {}
+        self.borrowed: set[str] = set()
+        self.dictionary = dictionary
+        for key, saved_frame in (saved or {}).items():
+            if isinstance(saved_frame, str):
+                self.paths[key] = saved_frame
+                self.borrowed.add(saved_frame)
+            else:
+                self.frames[key] = saved_frame
+        if len(self.borrowed) > 0:
+            _borrowing_stores[id(self)] = self
+
+    def __setitem__(self, key: Hashable, df: pd.DataFrame) -> None:
+        self.discard(key)
+        if self.directory is None:
+            self.frames[key] = df
+            return
+        # Files are named uniquely, so stores sharing a directory never replace each other's files
+        path = os.path.join(self.directory, f"{uuid.uuid4()}.arrow")
+        try:
+            write_frame(df, path, self.dictionary)
+        except arrow_errors():
+            if os.path.exists(f"{path}.tmp"):
+                os.remove(f"{path}.tmp")
+            self.frames[key] = df
+            return
+        self.paths[key] = path
+
+    def __getitem__(self, key: Hashable) -> pd.DataFrame:
+        if key not in self.frames:
+            if key not in self.paths:
+                raise KeyError(key)
+            self.frames[key] = read_frame(self.paths[key], self.dictionary)
+        return self.frames[key]
+
+    def __delitem__(self, key: Hashable) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self.discard(key)
+
+    def __contains__(self, key) -> bool:
+        return key in self.paths or key in self.frames
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(dict.fromkeys(itertools.chain(self.paths, self.frames)))
+
+    def __len__(self) -> int:
+        return len(self.paths.keys() | self.frames.keys())
+
+    def discard(self, key: Hashable) -> None:
+        """
+        Removes the frame stored under a key, and its file, if there is one
+
+        Args:
+            key (Hashable): The key
+        """
+        self.frames.pop(key, None)
+        path = self.paths.pop(key, None)
+        if path is not None and path not in self.borrowed:
+            os.remove(path)
+
+    def release(self) -> None:
+        """Unmaps the frames that have been looked up, so that they are mapped again when next looked up"""
+        for key in self.paths:
+            self.frames.pop(key, None)
@@ -1,10 +1,14 @@
 import operator
 import typing
-from functools import reduce
+from collections.abc import Iterator
 
 import numpy as np
 import pandas as pd
 
+from backend.pandas_backend.deduplicate import deduplicate
+from backend.pandas_backend.dictionary import decode_column
+from backend.pandas_backend.key_space import KeySpace, cross
+from backend.pandas_backend.profiler import Profile
 from schema.node import SchemaNode
 from schema.edge import SchemaEdge
 from representation.representation import *
@@ -25,8 +29,10 @@ class StackPointer:
 interp = tuple[list, StackPointer]
 
 
-def cartesian_product(df1: pd.DataFrame, df2: pd.DataFrame) -> pd.DataFrame:
-    return df1.merge(df2, how="cross").drop_duplicates()
+def rows(table: pd.DataFrame | KeySpace) -> pd.DataFrame:
+    if isinstance(table, KeySpace):
+        return table.materialize()
+    return table
 
 
 def get(derivation_step: Get, backend, stack, sp) -> interp:
@@ -38,26 +44,32 @@ def get(derivation_step: Get, backend, stack, sp) -> interp:
     elif len(nodes) == 1:
         df = backend.get_domain_from_atomic_node(nodes[0], names[0])
     else:
-        domains = [
-            backend.get_domain_from_atomic_node(node, name)
-            for node, name in zip(nodes, names)
-        ]
-        df = reduce(cartesian_product, domains)
+        # The cross product of the domains is only made when a later step needs its rows
+        df = KeySpace(
+            [
+                backend.get_domain_from_atomic_node(node, name)
+                for node, name in zip(nodes, names)
+            ]
+        )
     return stack + [df], sp
 
 
 def stt(derivation_step: StartTraversal, backend, stack, sp) -> interp:
     table = stack[-1]
-    base = table.copy()
     first_cols = [c.name for c in derivation_step.start_columns]
-    df: pd.DataFrame = base[first_cols]
+    if isinstance(table, KeySpace):
+        # The traversal only needs the distinct rows of its start columns
+        df = table.project(first_cols).materialize()[first_cols]
+    else:
+        base = table.copy()
+        df: pd.DataFrame = base[first_cols]
     for i, col in enumerate(first_cols):
         df[i] = df[col]
     return stack + [df], sp
 
 
 def trv(derivation_step: Traverse, backend, stack, sp) -> interp:
-    table = stack[-1]
+    table = rows(stack[-1])
 
     start_nodes = derivation_step.edge.from_nodes
     end_nodes = derivation_step.edge.to_nodes
@@ -83,7 +95,7 @@ def trv(derivation_step: Traverse, backend, stack, sp) -> interp:
 
 
 def prj(derivation_step: Project, _, stack, sp) -> interp:
-    table = stack[-1]
+    table = rows(stack[-1])
     indices = derivation_step.indices
     if len(indices) == 0:
         return stack[:-1] + [pd.DataFrame()], sp
@@ -109,7 +121,7 @@ def prj(derivation_step: Project, _, stack, sp) -> interp:
 
 
 def exp(derivation_step: Expand, backend, stack, sp) -> interp:
-    table = stack[-1]
+    table = rows(stack[-1])
     end_node = derivation_step.end_node
     end_nodes = SchemaNode.get_constituents(end_node)
     indices = derivation_step.indices
@@ -144,7 +156,7 @@ def ent(derivation_step: EndTraversal, _, stack, sp) -> interp:
     to_drop = [i for i, b in enumerate(should_merge) if not b]
     renaming = {i: n for (i, n) in enumerate(end_cols) if should_merge[i]}
 
-    x = stack[-1]
+    x = rows(stack[-1])
     y = stack[-2]
     x = x.drop(to_drop, axis=1).rename(renaming, axis=1)
     common = [col for col in list(x.columns) if col in set(y.columns)]
@@ -154,11 +166,15 @@ def ent(derivation_step: EndTraversal, _, stack, sp) -> interp:
         elif len(x.columns) == 0:
             res = pd.DataFrame()
         else:
-            res = pd.merge(x, y, how="cross")
+            # The rows of the cross product are only made when a later step needs them
+            return stack[:-2] + [cross(x, y)], sp
     else:
-        res = pd.merge(x, y, on=common, how="outer")
+        merged = y.merge(x) if isinstance(y, KeySpace) else None
+        if merged is not None:
+            return stack[:-2] + [merged], sp
+        res = pd.merge(x, rows(y), on=common, how="outer")
 
-    res = res.loc[res.astype(str).drop_duplicates().index]
+    res = deduplicate(res)
 
     # TODO: Pass through table
     return stack[:-2] + [res], sp
@@ -167,17 +183,20 @@ def ent(derivation_step: EndTraversal, _, stack, sp) -> interp:
 def rnm(derivation_step: Rename, _, stack, sp) -> interp:
     mapping = derivation_step.mapping
     table = stack[-1]
+    if isinstance(table, KeySpace):
+        return stack[:-1] + [table.rename(mapping)], sp
     return stack[:-1] + [table.rename(mapping, axis=1)], sp
 
 
 def srt(derivation_step: Sort, _, stack, sp) -> interp:
-    table = stack[-1]
+    table = rows(stack[-1])
     columns = derivation_step.columns
-    return stack[:-1] + [table.sort_values(by=columns)], sp
+    # Encoded columns are sorted by the strings they encode, rather than by their codes
+    return stack[:-1] + [table.sort_values(by=columns, key=decode_column)], sp
 
 
 def flt(derivation_step: Filter, _, stack, sp) -> interp:
-    table = stack[-1]
+    table = rows(stack[-1])
     col = derivation_step.column
     df = table[(table[col.name].notnull())]
 
@@ -214,16 +233,29 @@ def mer(step, _, stack, sp) -> interp:
         elif len(y.columns) == 0:
             res = x
         else:
-            res = pd.merge(x, y, how="cross")
+            # The rows of the cross product are only made when a later step needs them
+            return stack[:-2] + [cross(x, y)], sp
+        if isinstance(res, KeySpace):
+            return stack[:-2] + [res], sp
     else:
-        res = pd.merge(x, y, on=common, how="outer")
-    res = res.loc[res.astype(str).drop_duplicates().index]
+        merged = None
+        if isinstance(y, KeySpace) and isinstance(x, pd.DataFrame):
+            merged = y.merge(x)
+        if merged is not None:
+            return stack[:-2] + [merged], sp
+        res = pd.merge(rows(x), rows(y), on=common, how="outer")
+    res = deduplicate(res)
     return stack[:-2] + [res], sp
 
 
 def drp(step: Drop, _, stack, sp) -> interp:
     table: pd.DataFrame = stack[-1]
     to_drop = set([c.name for c in step.columns])
+    if isinstance(table, KeySpace):
+        kept = [col for col in table.columns if col not in to_drop]
+        if len(kept) > 0:
+            return stack[:-1] + [table.project(kept)], sp
+        table = table.materialize()
     df = table[[col for col in table if col not in to_drop]].drop_duplicates()
     return stack[:-1] + [df], sp
 
@@ -283,11 +315,38 @@ def step(next_step: RepresentationStep, backend, stack: list, sp) -> interp:
             return srt(next_step, backend, stack, sp)
 
 
+def run(
+    steps: list[RepresentationStep],
+    backend,
+    stack: list = None,
+    sp=None,
+    profile: Profile | None = None,
+) -> Iterator[interp]:
+    """
+    Interprets a list of steps one at a time, starting from the given interpreter state
+
+    Args:
+        steps (list[RepresentationStep]): The steps to interpret
+        backend: The backend holding the data
+        stack (list): The stack to start from. Defaults to the empty stack
+        sp (StackPointer): The stack pointer to start from
+        profile (Profile | None): If given, every step is measured, and its measurements are added to it
+
+    Returns:
+        Iterator[interp]: The interpreter state after each step
+    """
+    if stack is None:
+        stack = []
+    for s in steps:
+        if profile is None:
+            stack, sp = step(s, backend, stack, sp)
+        else:
+            stack, sp = profile.record(s, step, backend, stack, sp)
+        yield stack, sp
+
+
 def interpret(steps: list[RepresentationStep], backend) -> pd.DataFrame:
     stack = []
-    sp = None
-    for s in steps:
-        # print(s)
-        stack, sp = step(s, backend, stack, sp)
-        # print(stack)
+    for stack, _ in run(steps, backend):
+        pass
     return stack[0]
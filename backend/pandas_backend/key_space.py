@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import operator
+from functools import reduce
+
+import pandas as pd
+
+from backend.pandas_backend.deduplicate import deduplicate
+
+
+def cartesian_product(df1: pd.DataFrame, df2: pd.DataFrame) -> pd.DataFrame:
+    return df1.merge(df2, how="cross").drop_duplicates()
+
+
+class KeySpace:
+    """
+    The cross product of frames with distinct rows, e.g. of the domains of the keys of a table,
+    kept as its factors rather than as its rows.
+    Steps that only need some of its columns, or that merge a frame into the columns of its
+    first factor, work on the factors, so its rows are only made when a step needs them.
+    Its rows are ordered as those of reduce(cartesian_product, factors).
+    """
+
+    def __init__(self, factors: list[pd.DataFrame]):
+        """
+        Creates a new KeySpace
+
+        Args:
+            factors (list[pd.DataFrame]): The factors, with distinct rows and no columns in common
+        """
+        self.factors = factors
+
+    @property
+    def columns(self) -> pd.Index:
+        return pd.Index([c for f in self.factors for c in f.columns])
+
+    def __len__(self) -> int:
+        return reduce(operator.mul, [len(f) for f in self.factors], 1)
+
+    def memory_usage(self) -> int:
+        return sum(
+            int(f.memory_usage(index=True, deep=False).sum()) for f in self.factors
+        )
+
+    def materialize(self) -> pd.DataFrame:
+        """
+        Makes the rows of the cross product
+
+        Returns:
+            pd.DataFrame: The rows
+        """
+        return reduce(cartesian_product, self.factors)
+
+    def rename(self, mapping: dict) -> KeySpace:
+        return KeySpace([f.rename(mapping, axis=1) for f in self.factors])
+
+    def project(self, columns: list) -> KeySpace:
+        """
+        Keeps some of the columns of the cross product, and drops the rows that are then duplicated
+
+        Args:
+            columns (list): The columns to keep, at least one of which must be in the cross product
+
+        Returns:
+            KeySpace: The distinct rows of the columns, in the order the columns have in the factors
+        """
+        if len(self) == 0:
+            return KeySpace([self.materialize()[columns].drop_duplicates()])
+        keep = set(columns)
+        factors = [f[[c for c in f.columns if c in keep]] for f in self.factors]
+        return KeySpace([f.drop_duplicates() for f in factors if len(f.columns) > 0])
+
+    def merge(self, df: pd.DataFrame) -> KeySpace | None:
+        """
+        Merges a frame into the cross product, as an outer merge on their common columns followed
+        by deduplication would, keeping the rows and their order.
+        The factors up to the last one with a common column are combined into one, and the frame
+        is merged into it, provided every row of the frame matches one of its rows.
+        The factors after it are left as they are.
+
+        Args:
+            df (pd.DataFrame): The frame, with at least one column in common with the cross product
+
+        Returns:
+            KeySpace | None: The merged cross product, or None if its rows have to be made to merge the frame
+        """
+        if len(self) == 0:
+            return None
+        common = [c for c in df.columns if c in set(self.columns)]
+        last = max(
+            i
+            for i, f in enumerate(self.factors)
+            if not set(f.columns).isdisjoint(common)
+        )
+        if last == len(self.factors) - 1:
+            return None
+        first = reduce(cartesian_product, self.factors[: last + 1])
+        merged = pd.merge(df, first, on=common, how="outer", indicator=True)
+        if (merged["_merge"] == "left_only").any():
+            return None
+        merged = merged.drop(columns="_merge")
+        return KeySpace([deduplicate(merged)] + self.factors[last + 1 :])
+
+
+def cross(df1: pd.DataFrame | KeySpace, df2: pd.DataFrame | KeySpace) -> KeySpace:
+    """
+    Makes the cross product of two frames or cross products, without making its rows.
+    The rows of the frames are deduplicated, as those of their cross product would be.
+
+    Args:
+        df1 (pd.DataFrame | KeySpace): The frame whose rows are the outer loop of the product
+        df2 (pd.DataFrame | KeySpace): The frame whose rows are the inner loop of the product
+
+    Returns:
+        KeySpace: The cross product
+    """
+    return KeySpace(
+        [
+            f
+            for df in [df1, df2]
+            for f in (df.factors if isinstance(df, KeySpace) else [deduplicate(df)])
+        ]
+    )
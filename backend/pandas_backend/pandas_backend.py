@@ -1,18 +1,35 @@
+from __future__ import annotations
+
+import os
 import typing
+from collections import OrderedDict
+from collections.abc import Hashable
 
 import pandas as pd
 
 from backend.backend import Backend
-from backend.pandas_backend.exp_interpreter import exp_interpreter
+from backend.pandas_backend.deduplicate import deduplicate
+from backend.pandas_backend.dictionary import StringDictionary, decode
+from backend.pandas_backend.execution_trace import ExecutionTrace
+from backend.pandas_backend.exp_compiler import exp_compiler
+from backend.pandas_backend.frame_store import (
+    FrameStore,
+    read_frame,
+    remove_replaced_frames,
+    save_frames,
+)
 from backend.pandas_backend.helpers import (
     copy_data,
     get_cols_of_node,
     determine_cardinality,
 )
-from backend.pandas_backend.interpreter import interpret
+from backend.pandas_backend.interpreter import run
 from backend.pandas_backend.pandas_populated_table import PandasPopulatedTable
+from backend.pandas_backend.plan_cache import PlanCache
+from backend.pandas_backend.profiler import Profile
 from backend.pandas_backend.relation import DataRelation
 from backend.pandas_backend.transform_interpreter import transform_interpreter
+from representation.helpers.fingerprint_representation import fingerprint_prefixes
 from representation.mapping import Mapping
 from schema.edge import SchemaEdge, reverse_cardinality
 from schema.node import SchemaNode, AtomicNode, SchemaClass
@@ -21,38 +38,132 @@ from exp.exp import Exp
 
 
 def interpret_function(function: Exp):
-    return exp_interpreter(function)
+    return exp_compiler(function)
 
 
 def generate_hidden_keys(edge: SchemaEdge, data: pd.DataFrame):
     from_node = edge.from_node
     n = len(SchemaNode.get_constituents(from_node))
-    data = data.copy()
-    if not edge.is_functional():
-        j = 0
-        for i in range(n, len(data.columns)):
-            data[-j - 1] = data[i]
-            j += 1
-    return data
+    if edge.is_functional():
+        return data
+    # The hidden keys are the end columns under new labels, so the frame is rebuilt around
+    # the same arrays rather than copied
+    columns = {c: data[c] for c in data.columns}
+    columns |= {-j - 1: data[i] for j, i in enumerate(range(n, len(data.columns)))}
+    return pd.DataFrame(columns, copy=False)
+
+
+def reverse_relation(data: pd.DataFrame, n: int, m: int) -> pd.DataFrame:
+    """
+    Relabels the columns of a relation so that it goes from its end node to its start node.
+    Only the labels change, so the relation shares its data with the one it reverses.
+
+    Args:
+        data (pd.DataFrame): The relation, with n columns for the start node followed by m columns for the end node
+        n (int): The number of constituents of the start node
+        m (int): The number of constituents of the end node
+
+    Returns:
+        pd.DataFrame: The reversed relation, whose columns 0 to m - 1 are the end node
+    """
+    return data.rename(
+        columns={i: i + m for i in range(n)} | {j: j - n for j in range(n, n + m)},
+        copy=False,
+    )
 
 
 class PandasBackend(Backend):
 
-    def __init__(self):
-        self.node_data = {}
-        self.edge_data = {}
+    def __init__(
+        self,
+        incremental: bool = True,
+        cache_budget: int = 512 * 2**20,
+        storage_dir: str | None = None,
+        profile: bool = False,
+        max_traces: int = 16,
+    ):
+        """
+        Creates a new PandasBackend
+
+        Args:
+            incremental (bool): If True, execution resumes from the cached interpreter
+                state of the longest prefix of the representation that has already been run
+            cache_budget (int): The number of bytes the cached interpreter states may take up
+            storage_dir (str | None): If given, the domains of nodes and the relations of edges are
+                kept in Arrow IPC files in this directory, and are memory-mapped when first read
+            profile (bool): If True, every representation step that is interpreted is measured,
+                and the measurements are kept on the populated table
+            max_traces (int): The number of recently executed tables whose interpreter states are kept,
+                so that tables derived from them resume from their states even after the plan cache evicts them.
+                The states are charged to the cache budget, and the oldest traces are dropped to stay within it
+        """
+        self.dictionary = StringDictionary()
+        if storage_dir is None:
+            self.node_data = {}
+            self.edge_data = {}
+        else:
+            self.node_data = FrameStore(
+                os.path.join(storage_dir, "nodes"), dictionary=self.dictionary
+            )
+            self.edge_data = FrameStore(
+                os.path.join(storage_dir, "edges"), dictionary=self.dictionary
+            )
+        self.reversed_edge_data = {}
         self.edge_funs = {}
-        self.derived_tables = {}
+        self.closures = {}
+        self.closure_results = {}
         self.clones = {}
-
-    def map_atomic_node_to_domain(self, node, domain: pd.DataFrame | pd.Series) -> None:
+        self.incremental = incremental
+        self.profile = profile
+        self.plan_cache = PlanCache(cache_budget)
+        self.traces: OrderedDict[str, ExecutionTrace] = OrderedDict()
+        self.max_traces = max_traces
+        self.reads: set[Hashable] | None = None
+
+    def record_read(self, key: Hashable) -> None:
+        """
+        Records that the representation step being interpreted reads the data of a node or edge
+
+        Args:
+            key (Hashable): The node or edge, tagged with "node" or "edge"
+        """
+        if self.reads is not None:
+            self.reads.add(key)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Drops the cached interpreter states that were computed from the data of a node or edge
+
+        Args:
+            key (Hashable): The node or edge, tagged with "node" or "edge"
+        """
+        self.plan_cache.invalidate(key)
+        for trace in self.traces.values():
+            self.plan_cache.release(trace.size)
+            trace.invalidate(key)
+            self.plan_cache.reserve(trace.size)
+
+    def map_atomic_node_to_domain(
+        self, node, domain: pd.DataFrame | pd.Series, prepared: bool = False
+    ) -> None:
+        """
+        Maps an atomic node to the values in its domain
+
+        Args:
+            node (AtomicNode): The node
+            domain (pd.DataFrame | pd.Series): The values
+            prepared (bool): If True, the values have no missing values or duplicates,
+                and are not shared with the caller, so they are stored without being copied
+        """
         if isinstance(domain, pd.Series):
             domain = pd.DataFrame(domain)
         cs = SchemaNode.get_constituents(node)
         assert len(cs) == 1
-        domain = copy_data(domain).dropna().drop_duplicates()
+        self.invalidate(("node", node))
+        if not prepared:
+            domain = copy_data(domain).dropna().drop_duplicates()
         self.clones[node] = node
-        self.node_data[node] = domain
+        self.node_data[node] = self.dictionary.encode_frame(domain)
 
     def get_domain_size(self, node: SchemaNode):
         cs = SchemaNode.get_constituents(node)
@@ -70,20 +181,88 @@ class PandasBackend(Backend):
         lookup = node
         while self.clones[lookup] != lookup:
             lookup = self.clones[node]
-        copy = copy_data(self.node_data[lookup])
+        self.record_read(("node", lookup))
+        copy = self.dictionary.refresh(copy_data(self.node_data[lookup]))
         copy.columns = [with_name]
         return copy
 
     def clone(self, node: SchemaNode, new_node: SchemaNode):
         self.clones[new_node] = node
 
-    def map_edge_to_data_relation(self, edge: SchemaEdge, relation: pd.DataFrame):
+    def map_edge_to_data_relation(
+        self, edge: SchemaEdge, relation: pd.DataFrame, prepared: bool = False
+    ):
+        """
+        Maps an edge to the relation between the values of its nodes
+
+        Args:
+            edge (SchemaEdge): The edge
+            relation (pd.DataFrame): The relation, with the columns of the from node first
+            prepared (bool): If True, the relation has no missing values,
+                and is not shared with the caller, so it is stored without being copied
+        """
         f_node_c = SchemaNode.get_constituents(edge.from_node)
         t_node_c = SchemaNode.get_constituents(edge.to_node)
         assert len(f_node_c + t_node_c) == len(relation.columns)
-        df = copy_data(relation.dropna())
+        rev = SchemaEdge(edge.to_node, edge.from_node)
+        self.invalidate(("edge", edge))
+        self.invalidate(("edge", rev))
+        # Relations are never modified in place once stored, so traversals can share their data
+        df = relation if prepared else copy_data(relation.dropna())
         df.columns = list(range(len(df.columns)))
-        self.edge_data[edge] = copy_data(df)
+        df = self.dictionary.encode_frame(df)
+        self.edge_data[edge] = df
+        if isinstance(self.edge_data, FrameStore):
+            # Reversing the relation would read it back, so it is reversed when it is traversed
+            self.reversed_edge_data.pop(edge, None)
+        else:
+            self.reversed_edge_data[edge] = reverse_relation(
+                df, len(f_node_c), len(t_node_c)
+            )
+
+    def append_to_data_relation(self, edge: SchemaEdge, rows: pd.DataFrame) -> None:
+        """
+        Appends rows to the relation an edge is mapped to.
+        Traversals of an edge mapped to a closure only read the rows of the keys they evaluate,
+        which appending leaves unchanged, so they are only invalidated for edges that are not.
+
+        Args:
+            edge (SchemaEdge): The edge
+            rows (pd.DataFrame): The rows, with the columns of the from node first, already encoded
+        """
+        f_node_c = SchemaNode.get_constituents(edge.from_node)
+        t_node_c = SchemaNode.get_constituents(edge.to_node)
+        rev = SchemaEdge(edge.to_node, edge.from_node)
+        if edge not in self.edge_funs and rev not in self.edge_funs:
+            self.invalidate(("edge", edge))
+            self.invalidate(("edge", rev))
+        rows = rows.dropna().set_axis(list(range(len(rows.columns))), axis=1)
+        df = self.dictionary.concat([self.edge_data[edge], rows])
+        self.edge_data[edge] = df
+        if isinstance(self.edge_data, FrameStore):
+            self.reversed_edge_data.pop(edge, None)
+        else:
+            self.reversed_edge_data[edge] = reverse_relation(
+                df, len(f_node_c), len(t_node_c)
+            )
+
+    def append_to_domain(self, node, values: pd.DataFrame) -> None:
+        """
+        Adds the values that are not yet in the domain of an atomic node to it
+
+        Args:
+            node (AtomicNode): The node
+            values (pd.DataFrame): The values, already encoded
+        """
+        values = values.dropna().drop_duplicates()
+        domain = self.dictionary.refresh(self.node_data[node])
+        values.columns = domain.columns
+        values = values.merge(domain, how="left", indicator=True)
+        values = values[values["_merge"] == "left_only"][domain.columns]
+        if len(values) == 0:
+            return
+        self.invalidate(("node", node))
+        self.node_data[node] = self.dictionary.concat([domain, values])
 
     def map_edge_to_closure(
         self,
@@ -103,17 +282,39 @@ class PandasBackend(Backend):
         rev = SchemaEdge(edge.to_node, target, reverse_cardinality(edge.cardinality))
         fun = interpret_function(function)
 
+        args = list(range(num_args))
+        self.closures[edge] = (function, num_args, rev_target, target_idxs)
+        self.closure_results.pop(edge, None)
+
         def closure(table):
-            df = copy_data(table)
-            series = pd.Series(fun(df))
-            df[num_args] = series
-            data = copy_data(pd.DataFrame(df))
-            self.map_edge_to_data_relation(forward, data[idxs + [num_args]])
-            self.map_edge_to_data_relation(rev, data[[num_args] + idxs])
-            self.map_atomic_node_to_domain(
-                edge.to_node, pd.DataFrame(data[num_args]).drop_duplicates()
+            # The function is only evaluated, and its results only encoded, for keys it has not been evaluated for before
+            computed = self.closure_results.get(edge)
+            arguments = self.dictionary.encode_frame(table[args])
+            keys = deduplicate(arguments)
+            if computed is not None:
+                computed = self.dictionary.refresh(computed)
+                keys = keys.merge(computed[args], on=args, how="left", indicator=True)
+                keys = keys[keys["_merge"] == "left_only"][args]
+            if len(keys) > 0 or computed is None:
+                keys = keys.reset_index(drop=True)
+                keys[num_args] = fun(decode(keys))
+                new = self.dictionary.encode_frame(keys)
+                if computed is None:
+                    computed = new
+                    self.map_edge_to_data_relation(forward, new[idxs + [num_args]])
+                    self.map_edge_to_data_relation(rev, new[[num_args] + idxs])
+                    self.map_atomic_node_to_domain(
+                        edge.to_node, pd.DataFrame(new[num_args])
+                    )
+                else:
+                    computed = self.dictionary.concat([computed, new])
+                    self.append_to_data_relation(forward, new[idxs + [num_args]])
+                    self.append_to_data_relation(rev, new[[num_args] + idxs])
+                    self.append_to_domain(edge.to_node, pd.DataFrame(new[num_args]))
+            self.closure_results[edge] = computed
+            return pd.merge(
+                self.dictionary.refresh(arguments), computed, on=args, how="left"
             )
-            return df[list(range(num_args + 1))]
 
         #
         # elif isinstance(function, AggregationFunction):
@@ -140,6 +341,8 @@ class PandasBackend(Backend):
         # else:
         #     raise Exception()
 
+        self.invalidate(("edge", edge))
+        self.invalidate(("edge", SchemaEdge(edge.to_node, edge.from_node)))
         self.edge_funs[edge] = closure
 
     # def get_base_relation(self, edge: SchemaEdge):
@@ -155,9 +358,11 @@ class PandasBackend(Backend):
         hks = mapping.hidden_keys
         # function edges
         if edge in self.edge_funs:
+            self.record_read(("edge", edge))
             data = self.edge_funs[edge](table)
 
         elif rev in self.edge_funs:
+            self.record_read(("edge", rev))
             data = self.edge_funs[rev](table)
             data = data.rename({j: -j for j in range(n, n + m)}, axis=1)
             data = data.rename({i: i + m for i in range(n)}, axis=1)
@@ -165,16 +370,19 @@ class PandasBackend(Backend):
 
         # data edges
         elif edge in self.edge_data:
-            data = copy_data(self.edge_data[edge])
+            self.record_read(("edge", edge))
+            data = self.edge_data[edge]
 
         elif rev in self.edge_data:
-            data = copy_data(self.edge_data[rev])
-            data = data.rename({j: -j for j in range(n, n + m)}, axis=1)
-            data = data.rename({i: i + m for i in range(n)}, axis=1)
-            data = data.rename({j: (-j) - n for j in range(-n - m + 1, -n + 1)}, axis=1)
+            self.record_read(("edge", rev))
+            if rev in self.reversed_edge_data:
+                data = self.reversed_edge_data[rev]
+            else:
+                data = reverse_relation(self.edge_data[rev], m, n)
         else:
             assert False
 
+        data = self.dictionary.refresh(data)
         data = generate_hidden_keys(edge, data)
 
         data, hks = transform_interpreter(
@@ -183,15 +391,18 @@ class PandasBackend(Backend):
             mapping.transform,
             lambda n, name: self.get_domain_from_atomic_node(n, name),
         )
-        data = data.rename({-i - 1: hk.name for (i, hk) in enumerate(hks)}, axis=1)
+        data = data.rename(
+            {-i - 1: hk.name for (i, hk) in enumerate(hks)}, axis=1, copy=False
+        )
         return data
 
     def extend_domain(self, node: AtomicNode, domain_node: SchemaClass):
         domain = self.get_domain_from_atomic_node(domain_node, domain_node.name)
         domain = copy_data(domain)
         domain.columns = self.node_data[node].columns
-        self.node_data[node] = (
-            pd.concat([self.node_data[node], domain])
+        self.invalidate(("node", node))
+        self.node_data[node] = self.dictionary.encode_frame(
+            self.dictionary.concat([self.node_data[node], domain])
             .drop_duplicates()
             .reset_index(drop=True)
         )
@@ -205,13 +416,199 @@ class PandasBackend(Backend):
             val_cols = get_cols_of_node(mapping.data, start_node)
             return determine_cardinality(mapping.data, key_cols, val_cols)
 
+    def snapshot(self, directory: str) -> dict:
+        """
+        Writes the domains of nodes, the relations of edges and the results of closures to Arrow IPC files
+        in a directory, and returns the rest of the state of the backend, from which from_snapshot rebuilds it
+
+        Args:
+            directory (str): The directory
+
+        Returns:
+            dict: The state of the backend, which refers to the files by name, relative to the directory
+        """
+        state = {
+            "incremental": self.incremental,
+            "cache_budget": self.plan_cache.budget,
+            "max_traces": self.max_traces,
+            "profile": self.profile,
+            "clones": self.clones,
+            "dictionary": self.dictionary,
+            "closures": self.closures,
+        }
+        for kind in ["node_data", "edge_data", "closure_results"]:
+            saved = save_frames(
+                getattr(self, kind), os.path.join(directory, kind), self.dictionary
+            )
+            state[kind] = {
+                k: os.path.basename(v) if isinstance(v, str) else v
+                for k, v in saved.items()
+            }
+        return state
+
+    @staticmethod
+    def remove_replaced_files(
+        directory: str, replaced: dict | None, state: dict | None
+    ) -> None:
+        """
+        Removes the files an earlier snapshot to a directory wrote that a later snapshot to it does not refer to
+
+        Args:
+            directory (str): The directory
+            replaced (dict | None): The state of the earlier snapshot, or None if no backend was snapshotted
+            state (dict | None): The state of the later snapshot, or None if no backend was snapshotted
+        """
+        for kind in ["node_data", "edge_data", "closure_results"]:
+            old = {} if replaced is None else replaced[kind]
+            new = {} if state is None else state[kind]
+            remove_replaced_frames(
+                os.path.join(directory, kind),
+                [v for v in old.values() if isinstance(v, str)],
+                [v for v in new.values() if isinstance(v, str)],
+            )
+
+    @classmethod
+    def from_snapshot(
+        cls, directory: str, state: dict, storage_dir: str | None = None
+    ) -> PandasBackend:
+        """
+        Rebuilds a backend from the state returned by snapshot.
+        Domains and relations are memory-mapped from the files in the directory when they are first read,
+        and the closures are mapped to their edges again, with the results they had computed.
+
+        Args:
+            directory (str): The directory the backend was snapshotted to
+            state (dict): The state returned by snapshot
+            storage_dir (str | None): If given, domains and relations stored after the backend is
+                rebuilt are kept in Arrow IPC files in this directory, rather than in memory
+
+        Returns:
+            PandasBackend: The backend
+        """
+        backend = PandasBackend(
+            state["incremental"],
+            state["cache_budget"],
+            profile=state.get("profile", False),
+            max_traces=state.get("max_traces", 16),
+        )
+        backend.dictionary = state["dictionary"]
+        saved = {}
+        for kind in ["node_data", "edge_data", "closure_results"]:
+            saved[kind] = {
+                k: os.path.join(directory, kind, v) if isinstance(v, str) else v
+                for k, v in state[kind].items()
+            }
+        for kind, subdirectory in [("node_data", "nodes"), ("edge_data", "edges")]:
+            storage = (
+                None if storage_dir is None else os.path.join(storage_dir, subdirectory)
+            )
+            setattr(backend, kind, FrameStore(storage, saved[kind], backend.dictionary))
+        backend.clones = state["clones"]
+        for edge, closure in state["closures"].items():
+            backend.map_edge_to_closure(edge, *closure)
+        for edge, result in saved["closure_results"].items():
+            backend.closure_results[edge] = (
+                read_frame(result, backend.dictionary)
+                if isinstance(result, str)
+                else result
+            )
+        return backend
+
+    def resume(
+        self, derived_from, digests: list[str]
+    ) -> tuple[int, tuple, frozenset[Hashable]]:
+        """
+        Finds the longest prefix of a representation whose interpreter state is kept,
+        either in the plan cache or in the trace of the table it was derived from
+
+        Args:
+            derived_from: The id of the table the representation was derived from
+            digests (list[str]): The digests of each prefix of the representation
+
+        Returns:
+            tuple[int, tuple, frozenset[Hashable]]: The length of the prefix, the (stack, stack pointer)
+                pair after it, and the nodes and edges it read
+        """
+        trace = self.traces.get(derived_from)
+        shared = 0 if trace is None else trace.longest_common_prefix(digests)
+        while shared > 0 and trace.states[shared - 1] is None:
+            shared -= 1
+        cached, entry = self.plan_cache.longest_prefix(digests, shared)
+        if entry is not None:
+            return cached, entry.state, entry.dependencies
+        if shared > 0:
+            return shared, trace.states[shared - 1], trace.dependencies[shared - 1]
+        return 0, ([], None), frozenset()
+
+    def keep_trace(self, table_id, trace: ExecutionTrace) -> None:
+        """
+        Keeps the trace of a table, charging its states to the cache budget.
+        The oldest traces are dropped while there are more than max_traces of them,
+        or while their states take up more than the whole budget.
+
+        Args:
+            table_id: The id of the table
+            trace (ExecutionTrace): The trace of its execution
+        """
+        if table_id in self.traces:
+            self.plan_cache.release(self.traces.pop(table_id).size)
+        if trace.size <= self.plan_cache.budget:
+            self.traces[table_id] = trace
+            self.plan_cache.reserve(trace.size)
+        while self.traces and (
+            len(self.traces) > self.max_traces
+            or self.plan_cache.reserved > self.plan_cache.budget
+        ):
+            _, evicted = self.traces.popitem(last=False)
+            self.plan_cache.release(evicted.size)
+
     def execute_query(
         self, table_id, derived_from, derivation_steps: list[RepresentationStep]
     ) -> tuple[PandasPopulatedTable, Backend]:
 
         last = typing.cast(End, derivation_steps[-1])
-
-        table = interpret(derivation_steps[:-1], self)
-        populated = PandasPopulatedTable(table)
+        steps = derivation_steps[:-1]
+
+        digests = fingerprint_prefixes(steps)
+        start = 0
+        stack, sp = [], None
+        dependencies = frozenset()
+        if self.incremental:
+            start, (stack, sp), dependencies = self.resume(derived_from, digests)
+        # The trace keeps the states of the resumed prefix that the trace of the parent has
+        parent = self.traces.get(derived_from)
+        shared = 0 if parent is None else parent.longest_common_prefix(digests[:start])
+        states = (parent.states[:shared] if shared else []) + [None] * (start - shared)
+        read = (parent.dependencies[:shared] if shared else []) + [None] * (
+            start - shared
+        )
+        if start > 0:
+            states[-1], read[-1] = (stack, sp), dependencies
+
+        profile = None
+        if self.profile:
+            profile = Profile(table_id)
+            profile.record_cached(steps[:start])
+
+        self.reads = set()
+        try:
+            for digest, state in zip(
+                digests[start:], run(steps[start:], self, stack, sp, profile)
+            ):
+                stack, sp = state
+                dependencies = dependencies | self.reads
+                self.reads.clear()
+                states += [state]
+                read += [dependencies]
+                if self.incremental:
+                    self.plan_cache.put(digest, state, dependencies)
+        finally:
+            self.reads = None
+
+        if self.incremental:
+            self.keep_trace(table_id, ExecutionTrace(digests, states, read))
+
+        populated = PandasPopulatedTable(stack[0])
+        populated.profile = profile
         populated.display(last.left, last.right, self)
         return populated, self
@@ -3,10 +3,18 @@ from __future__ import annotations
 import operator
 from functools import reduce
 
-import numpy as np
 import pandas as pd
 
-from backend.pandas_backend.exp_interpreter import exp_interpreter
+from backend.pandas_backend.deduplicate import deduplicate
+from backend.pandas_backend.dictionary import decode
+from backend.pandas_backend.display import (
+    display_column,
+    display_frame,
+    display_window,
+    window_bounds,
+)
+from backend.pandas_backend.key_space import KeySpace
+from backend.pandas_backend.exp_compiler import exp_compiler
 from exp.exp import Exp
 from frontend.derivation.derivation_node import ColumnNode
 from representation.domain import Domain
@@ -14,23 +22,52 @@ from backend.populated_table import PopulatedTable
 
 
 class PandasPopulatedTable(PopulatedTable):
-
-    def __init__(self, raw_table: pd.DataFrame):
-        self.raw_table = raw_table.copy()
+    """
+    A populated table whose raw table is a pandas data frame.
+    The raw table and the displayed frame are never modified once they are made, so they are
+    shared, rather than copied, with the backend's plan cache and with copies of the table.
+    Displaying a copy replaces its displayed frame without touching the one it shares.
+    """
+
+    def __init__(self, raw_table: pd.DataFrame | KeySpace):
+        """
+        Creates a new PandasPopulatedTable
+
+        Args:
+            raw_table (pd.DataFrame | KeySpace): The result of the derivation, which is not copied
+        """
+        # The rows of a key space are only made when they are first needed
+        self.key_space = raw_table if isinstance(raw_table, KeySpace) else None
+        self._raw_table = None if self.key_space is not None else raw_table
+        # The displayed frame is only built when it is first needed, as a window of it often suffices
+        self.display_columns = None
         self.to_display = None
-        self.dropped_keys_count = 0
+        self.num_rows = None
+        self.keys_count = 0
         self.dropped_vals_count = 0
 
     @classmethod
     def create_from_table(cls, table: PandasPopulatedTable) -> PandasPopulatedTable:
-        populated = PandasPopulatedTable(table.raw_table)
-        populated.to_display = table.to_display.copy()
-        populated.dropped_keys_count = table.dropped_keys_count
+        populated = PandasPopulatedTable(
+            table.key_space if table._raw_table is None else table._raw_table
+        )
+        populated.display_columns = table.display_columns
+        populated.to_display = table.to_display
+        populated.num_rows = table.num_rows
+        populated.keys_count = table.keys_count
         populated.dropped_vals_count = table.dropped_vals_count
+        populated.profile = table.profile
         return populated
 
+    @property
+    def raw_table(self) -> pd.DataFrame:
+        if self._raw_table is None:
+            self._raw_table = self.key_space.materialize()
+        return self._raw_table
+
     def get_raw_table(self):
-        return self.raw_table
+        # The raw table is shared, so callers are given a copy they may modify
+        return decode(self.raw_table).copy()
 
     def display(
         self, left: list[ColumnNode], right: list[ColumnNode], backend: "PandasBackend"
@@ -47,79 +84,96 @@ class PandasPopulatedTable(PopulatedTable):
         keys = keys + to_add
         values = right
 
+        self.to_display = None
+        self.num_rows = None
+        self.dropped_vals_count = 0
         if len(values) == 0:
-            keys_count = reduce(
+            self.keys_count = reduce(
                 operator.mul,
                 [backend.get_domain_size(c.get_schema_node()) for c in left],
             )
+            self.display_columns = None
             self.to_display = pd.DataFrame()
-            self.dropped_keys_count = keys_count
-            self.dropped_vals_count = 0
+            self.num_rows = 0
         else:
             keys_str = [k.get_name() for k in keys]
             vals_str = [v.get_name() for v in values]
-            app = self.raw_table
-            app = app.loc[app.astype(str).drop_duplicates().index]
-            df = app[keys_str].reset_index(drop=True)
-            df = df.loc[df.astype(str).drop_duplicates().index]
-            columns_with_hidden_keys_str = []
-            columns_with_hidden_keys = []
-
-            for i, val in enumerate(values):
-                hidden_dependencies = [
-                    v.name for v in val.get_hidden_keys() if v.name not in set(hidden)
-                ]
-
-                if len(hidden_dependencies) > 0:
-                    to_add = app[keys_str + [val.get_name()]]
-                    to_add = to_add.loc[to_add.dropna().index]
-                    to_add = to_add.groupby(keys_str)[val.get_name()].agg(list)
-                    columns_with_hidden_keys_str += [val.get_name()]
-                    columns_with_hidden_keys += [val]
-                else:
-                    to_add = app[keys_str + [val.get_name()]]
-                df = pd.merge(df, to_add, on=keys_str, how="outer")
-                df = df.loc[df.astype(str).drop_duplicates().index]
-
-            df[columns_with_hidden_keys_str] = df[columns_with_hidden_keys_str].map(
-                lambda d: (
-                    d
-                    if isinstance(d, list) and not np.all(pd.isnull(np.array(d)))
-                    else np.nan
-                )
-            )
-            if len(values) > 0:
-                df2 = df.dropna(subset=vals_str, how="all")
-            else:
-                df2 = df
-            df3 = df2.dropna(subset=keys_str, how="any")
-
-            df3[columns_with_hidden_keys_str] = df3[columns_with_hidden_keys_str].map(
-                lambda d: (
-                    d
-                    if isinstance(d, list) and not np.all(pd.isnull(np.array(d)))
-                    else []
-                )
-            )
-
-            df3 = df3.loc[df3.astype(str).drop_duplicates().index].set_index(keys_str)
-            keys_count = reduce(
+            # Values that depend on keys hidden from the table are displayed as lists
+            hidden_names = {h.name for hid in hidden for h in hid}
+            listed = {
+                val.get_name()
+                for val in values
+                if any(v.name not in hidden_names for v in val.get_hidden_keys())
+            }
+            self.keys_count = reduce(
                 operator.mul,
                 [backend.get_domain_size(c.get_schema_node()) for c in keys],
                 1,
             )
-            dropped_keys_cnt = keys_count - len(df3)
-            self.to_display = df3
-            self.dropped_keys_count = dropped_keys_cnt
-            self.dropped_vals_count = 0
+            self.display_columns = (keys_str, vals_str, listed)
         return self
 
     def get_table_to_display(self):
-        assert self.to_display is not None
+        assert self.display_columns is not None or self.to_display is not None
+        if self.to_display is None:
+            keys, values, listed = self.display_columns
+            # Rows are deduplicated by their codes, and only the distinct rows are decoded
+            app = decode(deduplicate(self.raw_table)[keys + values])
+            self.to_display = display_frame(app, keys, values, listed)
+            self.num_rows = len(self.to_display)
+        return self.to_display
+
+    def get_displayed_table(self) -> pd.DataFrame | None:
         return self.to_display
 
+    def get_window(self, offset: int, limit: int | None) -> pd.DataFrame:
+        """
+        Returns a window of the displayed frame.
+        Unless the frame has already been built, only the rows of the window are built.
+
+        Args:
+            offset (int): The first row of the window, counted from the end if negative
+            limit (int | None): The most rows the window has, or None for every row from the first on
+
+        Returns:
+            pd.DataFrame: The rows of the window
+        """
+        if self.to_display is None:
+            df, self.num_rows = display_window(
+                self.raw_table, *self.display_columns, offset, limit
+            )
+            return df
+        start, stop = window_bounds(len(self.to_display), offset, limit)
+        return self.to_display.iloc[start:stop]
+
+    def get_num_rows(self) -> int:
+        if self.num_rows is None:
+            self.get_window(0, 0)
+        return self.num_rows
+
+    def display_column(self, value: str, keys: list[str]) -> pd.DataFrame | None:
+        """
+        Builds the displayed frame of one of the value columns from the displayed frame,
+        if it has already been built with the same keys
+
+        Args:
+            value (str): The name of the value column
+            keys (list[str]): The names of the key columns the column is displayed by
+
+        Returns:
+            pd.DataFrame | None: The values of the column indexed by the keys, or None if the
+                displayed frame has not been built with those keys
+        """
+        if (
+            self.to_display is None
+            or value not in self.to_display.columns
+            or list(self.to_display.index.names) != keys
+        ):
+            return None
+        return display_column(self.to_display, value)
+
     def get_num_dropped_keys(self):
-        return self.dropped_keys_count
+        return self.keys_count - self.get_num_rows()
 
     def get_num_dropped_vals(self):
         return self.dropped_vals_count
@@ -127,10 +181,10 @@ class PandasPopulatedTable(PopulatedTable):
     def evaluate_exp(
         self, exp: Exp, start: list[Domain], modified_keys: list[int]
     ) -> pd.DataFrame:
-        df = self.raw_table[[k.name for k in start]]
+        df = decode(self.raw_table[[k.name for k in start]])
         df = df.rename({k.name: i for i, k in enumerate(start)}, axis=1)
         n = len(start)
-        val = pd.DataFrame(exp_interpreter(exp)(df))
+        val = pd.DataFrame(exp_compiler(exp)(df))
         assert len(val.columns) == 1
         val = val.rename(columns={val.columns[0]: n})
         df = df.join(val)
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Hashable
+
+import pandas as pd
+
+from backend.pandas_backend.key_space import KeySpace
+
+
+class PlanCacheEntry:
+    """
+    An interpreter state cached under the digest of the representation prefix that produced it
+    """
+
+    def __init__(self, state: tuple, size: int, dependencies: frozenset[Hashable]):
+        """
+        Creates a new PlanCacheEntry
+
+        Args:
+            state (tuple): The (stack, stack pointer) pair after the prefix
+            size (int): The number of bytes charged to the entry
+            dependencies (frozenset[Hashable]): The nodes and edges whose data was read by the prefix
+        """
+        self.state = state
+        self.size = size
+        self.dependencies = dependencies
+
+
+class PlanCache:
+    """
+    A content-addressed, least-recently-used cache of interpreter states.
+    Entries are keyed by the digest of a representation prefix, so that tables
+    sharing a prefix (e.g. siblings derived from the same table) share its result.
+    States kept outside the cache (e.g. in execution traces) may reserve part of the budget,
+    which the entries then make room for.
+    """
+
+    def __init__(self, budget: int = 512 * 2**20):
+        """
+        Creates a new, empty PlanCache
+
+        Args:
+            budget (int): The number of bytes the cached frames may take up
+        """
+        self.budget = budget
+        self.size = 0
+        self.reserved = 0
+        self.entries: OrderedDict[str, PlanCacheEntry] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def size_of(cls, state: tuple) -> int:
+        """
+        Estimates the number of bytes a state adds to the cache.
+        Frames lower in the stack are shared with the entries of shorter prefixes,
+        so only the frame at the top of the stack is charged.
+
+        Args:
+            state (tuple): The (stack, stack pointer) pair
+
+        Returns:
+            int: The number of bytes charged for the state
+        """
+        stack, _ = state
+        if len(stack) > 0 and isinstance(stack[-1], KeySpace):
+            return stack[-1].memory_usage()
+        if len(stack) == 0 or not isinstance(stack[-1], pd.DataFrame):
+            return 0
+        return int(stack[-1].memory_usage(index=True, deep=False).sum())
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, digest: str) -> tuple | None:
+        """
+        Looks up the state for a prefix, marking it as recently used
+
+        Args:
+            digest (str): The digest of the prefix
+
+        Returns:
+            tuple | None: The (stack, stack pointer) pair, or None if it is not cached
+        """
+        if digest not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(digest)
+        return self.entries[digest].state
+
+    def longest_prefix(
+        self, digests: list[str], shortest: int = 0
+    ) -> tuple[int, PlanCacheEntry | None]:
+        """
+        Finds the longest prefix whose state is cached, marking it as recently used.
+        A lookup that finds no prefix longer than the shortest one is counted as a miss.
+
+        Args:
+            digests (list[str]): The digests of each prefix of a representation
+            shortest (int): The length of a prefix whose state is already known
+
+        Returns:
+            tuple[int, PlanCacheEntry | None]: The length of the longest cached prefix and its entry,
+                or 0 and None if no prefix longer than the shortest one is cached
+        """
+        for i in range(len(digests), shortest, -1):
+            if digests[i - 1] in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(digests[i - 1])
+                return i, self.entries[digests[i - 1]]
+        self.misses += 1
+        return 0, None
+
+    def longest_prefix(
+        self, digests: list[str], shortest: int = 0
+    ) -> tuple[int, PlanCacheEntry | None]:
+        """
+        Finds the longest prefix whose state is cached, marking it as recently used.
+        A lookup that finds no prefix longer than the shortest one is counted as a miss.
+
+        Args:
+            digests (list[str]): The digests of each prefix of a representation
+            shortest (int): The length of a prefix whose state is already known
+
+        Returns:
+            tuple[int, PlanCacheEntry | None]: The length of the longest cached prefix and its entry,
+                or 0 and None if no prefix longer than the shortest one is cached
+        """
+        for i in range(len(digests), shortest, -1):
+            if digests[i - 1] in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(digests[i - 1])
+                return i, self.entries[digests[i - 1]]
+        self.misses += 1
+        return 0, None
+
+    def get_dependencies(self, digest: str) -> frozenset[Hashable]:
+        """
+        Returns the nodes and edges read by a cached prefix
+
+        Args:
+            digest (str): The digest of the prefix
+
+        Returns:
+            frozenset[Hashable]: The dependencies of the prefix
+        """
+        return self.entries[digest].dependencies
+
+    def put(self, digest: str, state: tuple, dependencies: frozenset[Hashable]):
+        """
+        Caches the state for a prefix, evicting least recently used entries to stay within budget.
+        States larger than the whole budget are not cached.
+
+        Args:
+            digest (str): The digest of the prefix
+            state (tuple): The (stack, stack pointer) pair after the prefix
+            dependencies (frozenset[Hashable]): The nodes and edges whose data was read by the prefix
+        """
+        size = PlanCache.size_of(state)
+        if size + self.reserved > self.budget:
+            return
+        self.discard(digest)
+        self.entries[digest] = PlanCacheEntry(state, size, dependencies)
+        self.size += size
+        self.evict()
+
+    def reserve(self, size: int) -> None:
+        """
+        Charges states kept outside the cache to its budget, evicting least recently used entries
+        to make room for them
+
+        Args:
+            size (int): The number of bytes the states take up
+        """
+        self.reserved += size
+        self.evict()
+
+    def release(self, size: int) -> None:
+        """
+        Returns the part of the budget reserved by states kept outside the cache
+
+        Args:
+            size (int): The number of bytes that were reserved for the states
+        """
+        self.reserved -= size
+
+    def evict(self) -> None:
+        """Evicts least recently used entries until the entries and the reserved states fit the budget"""
+        while self.entries and self.size + self.reserved > self.budget:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= evicted.size
+
+    def discard(self, digest: str) -> None:
+        """
+        Removes the entry for a prefix, if there is one
+
+        Args:
+            digest (str): The digest of the prefix
+        """
+        if digest in self.entries:
+            self.size -= self.entries.pop(digest).size
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Removes every entry whose prefix read the data of a node or edge
+
+        Args:
+            key (Hashable): The node or edge whose data has changed
+        """
+        stale = [d for d, e in self.entries.items() if key in e.dependencies]
+        for digest in stale:
+            self.discard(digest)
+
+    def clear(self) -> None:
+        """Removes every entry"""
+        self.entries.clear()
+        self.size = 0
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Callable
+
+import pandas as pd
+
+from backend.pandas_backend.key_space import KeySpace
+from representation.representation import RepresentationStep
+
+
+def shape(table) -> tuple[int, int]:
+    """
+    Returns the number of rows and columns of a frame on the interpreter's stack
+
+    Args:
+        table (pd.DataFrame | KeySpace | None): The frame, or None if the stack is empty
+
+    Returns:
+        tuple[int, int]: The number of rows and columns, counting the rows of a key space without making them
+    """
+    if table is None:
+        return 0, 0
+    return len(table), len(table.columns)
+
+
+def stack_size(stack: list) -> int:
+    """
+    Estimates the number of bytes held by the frames on the interpreter's stack.
+    Frames are counted once, however many times they are on the stack.
+
+    Args:
+        stack (list): The stack
+
+    Returns:
+        int: The number of bytes
+    """
+    frames = {id(f): f for f in stack}.values()
+    return sum(
+        (
+            f.memory_usage()
+            if isinstance(f, KeySpace)
+            else int(f.memory_usage(index=True, deep=False).sum())
+        )
+        for f in frames
+        if isinstance(f, (pd.DataFrame, KeySpace))
+    )
+
+
+class StepProfile:
+    """
+    The measurements of one representation step, taken as the interpreter ran it.
+    Steps whose result was resumed from the plan cache are not run, and have no measurements.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        step: str,
+        cached: bool = False,
+        seconds: float | None = None,
+        rows: tuple[int, int] | None = None,
+        columns: tuple[int, int] | None = None,
+        memory_delta: int | None = None,
+    ):
+        """
+        Creates a new StepProfile
+
+        Args:
+            name (str): The name of the kind of step, e.g. GET or MER
+            step (str): The step, as it prints
+            cached (bool): True if the result of the step was resumed from the plan cache
+            seconds (float | None): The wall time the step took
+            rows (tuple[int, int] | None): The rows of the frame at the top of the stack before and after the step
+            columns (tuple[int, int] | None): The columns of the frame at the top of the stack before and after the step
+            memory_delta (int | None): The change in the bytes held by the frames on the stack
+        """
+        self.name = name
+        self.step = step
+        self.cached = cached
+        self.seconds = seconds
+        self.rows = rows
+        self.columns = columns
+        self.memory_delta = memory_delta
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "step": self.step,
+            "cached": self.cached,
+            "seconds": self.seconds,
+            "rows_in": None if self.rows is None else self.rows[0],
+            "rows_out": None if self.rows is None else self.rows[1],
+            "columns_in": None if self.columns is None else self.columns[0],
+            "columns_out": None if self.columns is None else self.columns[1],
+            "memory_delta": self.memory_delta,
+        }
+
+
+class Profile:
+    """
+    The measurements of the representation steps of one execution of a table, in the order they ran
+    """
+
+    def __init__(self, table_id: str, steps: list[StepProfile] | None = None):
+        """
+        Creates a new Profile
+
+        Args:
+            table_id (str): The id of the table that was executed
+            steps (list[StepProfile] | None): The measurements of the steps
+        """
+        self.table_id = table_id
+        self.steps = [] if steps is None else steps
+
+    def record(
+        self, step: RepresentationStep, interpret: Callable, backend, stack: list, sp
+    ) -> tuple:
+        """
+        Interprets a step, measuring it
+
+        Args:
+            step (RepresentationStep): The step
+            interpret (Callable): The function that interprets a step
+            backend: The backend holding the data
+            stack (list): The stack before the step
+            sp: The stack pointer before the step
+
+        Returns:
+            tuple: The (stack, stack pointer) pair after the step
+        """
+        rows_in, columns_in = shape(stack[-1] if len(stack) > 0 else None)
+        size = stack_size(stack)
+        start = time.perf_counter()
+        state = interpret(step, backend, stack, sp)
+        seconds = time.perf_counter() - start
+        rows_out, columns_out = shape(state[0][-1] if len(state[0]) > 0 else None)
+        self.steps.append(
+            StepProfile(
+                step.name,
+                str(step),
+                seconds=seconds,
+                rows=(rows_in, rows_out),
+                columns=(columns_in, columns_out),
+                memory_delta=stack_size(state[0]) - size,
+            )
+        )
+        return state
+
+    def record_cached(self, steps: list[RepresentationStep]) -> None:
+        """
+        Records steps whose result was resumed from the plan cache, without measurements
+
+        Args:
+            steps (list[RepresentationStep]): The steps
+        """
+        self.steps += [StepProfile(s.name, str(s), cached=True) for s in steps]
+
+    @property
+    def seconds(self) -> float:
+        return sum(s.seconds for s in self.steps if s.seconds is not None)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Tabulates the measurements, one row per step
+
+        Returns:
+            pd.DataFrame: The measurements
+        """
+        columns = list(StepProfile("", "").to_dict())
+        df = pd.DataFrame([s.to_dict() for s in self.steps], columns=columns)
+        counts = ["rows_in", "rows_out", "columns_in", "columns_out", "memory_delta"]
+        return df.astype({c: "Int64" for c in counts} | {"seconds": float})
+
+    def to_json(self, **kwargs) -> str:
+        """
+        Serialises the measurements as JSON
+
+        Args:
+            **kwargs: Arguments passed on to json.dumps, e.g. indent
+
+        Returns:
+            str: An object with the id of the table, the total seconds, and the measurements of every step
+        """
+        return json.dumps(
+            {
+                "table_id": self.table_id,
+                "seconds": self.seconds,
+                "steps": [s.to_dict() for s in self.steps],
+            },
+            **kwargs,
+        )
+
+    def to_folded(self) -> str:
+        """
+        Exports the measurements as folded stacks, which flamegraph.pl, speedscope and inferno read.
+        Every step that ran is a frame under the table, named by its position and kind,
+        and weighted by its wall time in microseconds.
+
+        Returns:
+            str: One line per step that ran
+        """
+        return "\n".join(
+            f"table {self.table_id};{i} {s.name} {round(s.seconds * 1e6)}"
+            for i, s in enumerate(self.steps)
+            if s.seconds is not None
+        )
+
+    def __repr__(self):
+        return f"{self.to_frame()}\n{self.seconds:.6f}s in {len(self.steps)} steps"
+
+    def __str__(self):
+        return self.__repr__()
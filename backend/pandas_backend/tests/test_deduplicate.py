@@ -0,0 +1,61 @@
+import expecttest
+import numpy as np
+import pandas as pd
+
+from backend.pandas_backend.deduplicate import deduplicate
+
+
+class TestDeduplicate(expecttest.TestCase):
+
+    def test_deduplicate_keepsFirstOccurrenceOfEachRow(self):
+        df = pd.DataFrame({"a": [1, 2, 1, 3], "b": ["x", "y", "x", "x"]})
+        self.assertExpectedInline(
+            str(deduplicate(df)),
+            """\
+   a  b
+0  1  x
+1  2  y
+3  3  x""",
+        )
+
+    def test_deduplicate_treatsMissingValuesAsEqual(self):
+        df = pd.DataFrame({"a": [1.0, np.nan, np.nan], "b": ["x", None, None]})
+        self.assertExpectedInline(
+            str(deduplicate(df)),
+            """\
+     a     b
+0  1.0     x
+1  NaN  None""",
+        )
+
+    def test_deduplicate_handlesListCells(self):
+        df = pd.DataFrame(
+            {
+                "a": [1, 1, 1, 2],
+                "b": [[1.0, np.nan], [1.0, float("nan")], [1.0], np.nan],
+            }
+        )
+        self.assertExpectedInline(
+            str(deduplicate(df)),
+            """\
+   a           b
+0  1  [1.0, nan]
+2  1       [1.0]
+3  2         NaN""",
+        )
+
+    def test_deduplicate_matchesStringDeduplication(self):
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame(
+            {
+                "a": rng.integers(0, 5, 200),
+                "b": rng.choice(["x", "y", None], 200),
+                "c": [list(rng.integers(0, 2, 2)) for _ in range(200)],
+            }
+        )
+        expected = df.loc[df.astype(str).drop_duplicates().index]
+        self.assertTrue(expected.equals(deduplicate(df)))
+
+    def test_deduplicate_leavesFramesWithoutColumnsUnchanged(self):
+        df = pd.DataFrame(index=range(3))
+        self.assertEqual(3, len(deduplicate(df)))
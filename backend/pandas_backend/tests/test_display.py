@@ -0,0 +1,59 @@
+import expecttest
+import numpy as np
+import pandas as pd
+
+from backend.pandas_backend.display import display_frame, display_window
+
+
+class TestDisplay(expecttest.TestCase):
+
+    def test_displayFrame_groupsValuesByKey(self):
+        df = pd.DataFrame(
+            {
+                "k": [2, 1, 2, np.nan, 3, 1],
+                "h": [0, 0, 1, 0, 0, 1],
+                "v": ["b", "a", "b", "z", np.nan, "a"],
+                "w": [20, 10, 21, 0, np.nan, np.nan],
+            }
+        )
+        self.assertExpectedInline(
+            str(display_frame(df, ["k"], ["v", "w"], {"w"})),
+            """\
+     v             w
+k                   
+2.0  b  [20.0, 21.0]
+1.0  a        [10.0]""",
+        )
+
+    def test_displayFrame_combinesSeveralValuesOfAKey(self):
+        df = pd.DataFrame(
+            {"k": [1, 2, 1, 1], "v": [1, 2, 1, 3], "w": ["x", "y", "z", "x"]}
+        )
+        self.assertExpectedInline(
+            str(display_frame(df, ["k"], ["v", "w"], set())),
+            """\
+   v  w
+k      
+1  1  x
+1  1  z
+1  3  x
+1  3  z
+2  2  y""",
+        )
+
+    def test_displayWindow_buildsOnlyTheRowsOfTheWindow(self):
+        df = pd.DataFrame(
+            {
+                "k": [1, 2, 1, 1, 3, np.nan, 4, 2],
+                "v": [1, 2, 1, 3, np.nan, 5, 4, 2],
+                "w": ["x", "y", "z", "x", np.nan, "q", "u", "y"],
+            }
+        )
+        full = display_frame(df, ["k"], ["v", "w"], set())
+        for offset, limit in [(0, 2), (3, 2), (-3, 2), (4, None), (9, 1)]:
+            window, total = display_window(df, ["k"], ["v", "w"], set(), offset, limit)
+            self.assertEqual(len(full), total)
+            stop = None if limit is None else offset + limit
+            pd.testing.assert_frame_equal(
+                full.iloc[offset:stop], window, check_index_type=False
+            )
@@ -0,0 +1,120 @@
+import tracemalloc
+
+import expecttest
+import numpy as np
+import pandas as pd
+
+from backend.pandas_backend.exp_compiler import exp_compiler
+from backend.pandas_backend.exp_interpreter import exp_interpreter
+from exp.aexp import AddAexp, ColumnAexp, ConstAexp, DivAexp, MulAexp, SubAexp
+from exp.bexp import AndBexp, ConstBexp, LessThanBexp, NABexp, NotBexp
+from exp.exp import MaskExp
+from schema.base_types import BaseType
+
+
+class TestExpCompiler(expecttest.TestCase):
+
+    def initialise(self):
+        t = pd.DataFrame(np.random.default_rng(0).random((8, 4)))
+        t.iloc[2, 0] = np.nan
+        a, b, c, d = [ColumnAexp(i) for i in range(4)]
+        # (a + b) * c < d + 2 * 3 and not (a + b is missing)
+        exp = AndBexp(
+            LessThanBexp(
+                MulAexp(AddAexp(a, b), c),
+                AddAexp(d, MulAexp(ConstAexp(2), ConstAexp(3))),
+            ),
+            NotBexp(NABexp(AddAexp(a, b))),
+        )
+        return t, exp
+
+    def test_expCompiler_foldsConstantsAndSharesSubexpressions(self):
+        _, exp = self.initialise()
+        kernel = exp_compiler(exp)
+        self.assertEqual(kernel.__globals__["c9"], 6)
+        self.assertExpectedInline(
+            kernel.source,
+            """\
+def kernel(t):
+    v0 = t[c5]
+    v1 = t[c6]
+    v2 = t[c7]
+    v3 = t[c8]
+    x = arrays(t.index, v0, v1, v2, v3)
+    if x is None:
+        v5 = v0 + v1
+        v6 = v5 * v2
+        v7 = v3 + c9
+        v8 = v6 < v7
+        del v6, v7
+        v9 = pd.isnull(v5)
+        del v5
+        v10 = ~v9
+        del v9
+        v4 = v8 & v10
+        del v8, v10
+    else:
+        with np.errstate(all="ignore"):
+            r0 = ufunc(np.add, [], x[0], x[1])
+            r1 = ufunc(np.multiply, [], r0, x[2])
+            r2 = ufunc(np.add, [], x[3], c9)
+            r3 = ufunc(np.less, [r1, r2], r1, r2)
+            del r1, r2
+            r4 = pd.isnull(r0)
+            del r0
+            r5 = ufunc(np.invert, [r4], r4)
+            del r4
+            r = ufunc(np.bitwise_and, [r3, r5], r3, r5)
+            del r3, r5
+        v4 = pd.Series(r, index=t.index)
+        del r
+    del x
+    del v0, v1, v2, v3
+    return v4""",
+        )
+
+    def test_expCompiler_matchesInterpreter(self):
+        t, exp = self.initialise()
+        for e in [exp, MaskExp([0], 1, exp, BaseType.FLOAT)]:
+            self.assertTrue(exp_compiler(e)(t).equals(exp_interpreter(e)(t)))
+
+    def test_expCompiler_broadcastsConstantExpressions(self):
+        t, _ = self.initialise()
+        result = exp_compiler(AddAexp(ConstAexp(1), ConstAexp(2)))(t)
+        self.assertEqual(list(result), [3] * len(t))
+
+    def test_expCompiler_writesFusedOperationsIntoOneBuffer(self):
+        n = 1_000_000
+        t = pd.DataFrame(np.random.default_rng(0).random((n, 4)))
+        a, b, c, d = [ColumnAexp(i) for i in range(4)]
+        # ((a + b) * c - d) / 2
+        exp = DivAexp(SubAexp(MulAexp(AddAexp(a, b), c), d), ConstAexp(2))
+        kernel = exp_compiler(exp)
+        interpreted = exp_interpreter(exp)
+
+        def peak(f):
+            tracemalloc.start()
+            result = f(t)
+            _, peak_size = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return result, peak_size
+
+        compiled_result, compiled_peak = peak(kernel)
+        interpreted_result, interpreted_peak = peak(interpreted)
+        self.assertTrue(compiled_result.equals(interpreted_result))
+        # The fused operations only allocate the result, where the interpreter holds two arrays at once
+        self.assertLess(compiled_peak, 1.5 * n * 8)
+        self.assertGreater(interpreted_peak, 1.9 * n * 8)
+
+    def test_expCompiler_fallsBackToPandasForNullableColumns(self):
+        t, exp = self.initialise()
+        t = t.astype({1: "Float64"})
+        t.iloc[3, 1] = pd.NA
+        self.assertTrue(exp_compiler(exp)(t).equals(exp_interpreter(exp)(t)))
+
+    def test_expCompiler_negatesConstantsAsInterpreterDoes(self):
+        t, _ = self.initialise()
+        for constant in [True, False]:
+            exp = NotBexp(ConstBexp(constant))
+            self.assertEqual(exp_interpreter(exp)(t), not constant)
+            self.assertEqual(list(exp_compiler(exp)(t)), [not constant] * len(t))
@@ -0,0 +1,62 @@
+import expecttest
+import numpy as np
+import pandas as pd
+
+from backend.pandas_backend.exp_interpreter import exp_interpreter
+from exp.aexp import MaxAexp, SumAexp
+from exp.bexp import AnyBexp
+from exp.exp import CountExp, PopExp
+from schema.base_types import BaseType
+
+
+class TestExpInterpreter(expecttest.TestCase):
+
+    def initialise(self):
+        # columns: key, hidden key, value, flag
+        return pd.DataFrame(
+            {
+                0: [1, 1, 1, 2, 2, 3, np.nan],
+                1: ["a", "a", "b", "a", "b", "a", "a"],
+                2: [1.0, 1.0, 2.0, 4.0, np.nan, np.nan, 8.0],
+                3: [False, False, True, False, False, True, True],
+            }
+        )
+
+    def test_aggregate_deduplicatesOnHiddenKeysAndSkipsMissingValues(self):
+        t = self.initialise()
+        df = pd.DataFrame(
+            {
+                "sum": exp_interpreter(SumAexp([0], [1], 2))(t),
+                "max": exp_interpreter(MaxAexp([0], [1], 2))(t),
+                "count": exp_interpreter(CountExp([0], [1], 2, BaseType.FLOAT))(t),
+                "pop": exp_interpreter(PopExp([0], [1], 2, BaseType.FLOAT))(t),
+                "any": exp_interpreter(AnyBexp([0], [1], 3))(t),
+            }
+        )
+        self.assertExpectedInline(
+            str(df),
+            """\
+   sum  max  count  pop    any
+0  3.0  2.0    2.0  1.0   True
+1  3.0  2.0    2.0  1.0   True
+2  3.0  2.0    2.0  1.0   True
+3  4.0  4.0    1.0  4.0  False
+4  4.0  4.0    1.0  4.0  False
+5  NaN  NaN    NaN  NaN    NaN
+6  NaN  NaN    NaN  NaN    NaN""",
+        )
+
+    def test_aggregate_groupsByMultipleKeys(self):
+        t = self.initialise()
+        self.assertExpectedInline(
+            str(exp_interpreter(SumAexp([0, 3], [1], 2))(t)),
+            """\
+0    1.0
+1    1.0
+2    2.0
+3    4.0
+4    4.0
+5    NaN
+6    NaN
+Name: 2, dtype: float64""",
+        )
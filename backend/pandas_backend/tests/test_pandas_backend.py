@@ -0,0 +1,439 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+import expecttest
+import numpy as np
+import pandas as pd
+
+from backend.pandas_backend.key_space import KeySpace
+from backend.pandas_backend.pandas_backend import PandasBackend
+from exp.aexp import AddAexp, ColumnAexp, ConstAexp
+from exp.bexp import EqualityBexp
+from exp.sexp import ColumnSexp, ConstSexp
+from representation.mapping import Mapping
+from schema.base_types import BaseType
+from schema.edge import SchemaEdge
+from schema.node import AtomicNode, SchemaNode
+from schema.schema import Schema
+
+
+class TestPandasBackend(expecttest.TestCase):
+
+    def initialise(self):
+        trips_df = pd.DataFrame(
+            {
+                "trip_id": [1, 2, 3, 4],
+                "hr": [7, 7, 8, 9],
+                "destination": ["Zoo", "CBD", "Zoo", "Uni"],
+            }
+        ).set_index("trip_id")
+        s = Schema()
+        trips = s.insert_dataframe(trips_df)
+        return s, trips
+
+    def test_executeQuery_siblingTablesShareCachedPrefix(self):
+        s, trips = self.initialise()
+        t1 = s.get(trip_id=trips["trip_id"])
+        t1.infer(["trip_id"], trips["hr"])
+        hits = s.backend.plan_cache.hits
+        t1.infer(["trip_id"], trips["destination"])
+        self.assertGreater(s.backend.plan_cache.hits, hits)
+
+    def test_executeQuery_incrementalMatchesFullExecution(self):
+        results = []
+        for incremental in [True, False]:
+            s, trips = self.initialise()
+            s.backend.incremental = incremental
+            t = (
+                s.get(trip_id=trips["trip_id"])
+                .infer(["trip_id"], trips["hr"])
+                .infer(["trip_id"], trips["destination"])
+                .hide("hr")
+            )
+            results += [str(t)]
+        self.assertEqual(results[0], results[1])
+        self.assertExpectedInline(
+            results[0],
+            """\
+[trip_id || destination]
+        destination
+trip_id            
+1               Zoo
+2               CBD
+3               Zoo
+4               Uni
+
+""",
+        )
+
+    def test_executeQuery_doesNotReuseStatesAfterDataChanges(self):
+        s, trips = self.initialise()
+        t1 = s.get(trip_id=trips["trip_id"])
+        self.assertGreater(len(s.backend.plan_cache), 0)
+        s.backend.map_atomic_node_to_domain(
+            trips["trip_id"], pd.DataFrame({"trip_id": [1, 2]})
+        )
+        for entry in s.backend.plan_cache.entries.values():
+            self.assertNotIn(("node", trips["trip_id"]), entry.dependencies)
+        t2 = t1.infer(["trip_id"], trips["hr"])
+        self.assertExpectedInline(
+            str(t2),
+            """\
+[trip_id || hr]
+         hr
+trip_id    
+1.0       7
+2.0       7
+
+""",
+        )
+
+    def test_executeQuery_resumesFromParentTraceAfterEviction(self):
+        s, trips = self.initialise()
+        s.backend.profile = True
+        t1 = s.get(trip_id=trips["trip_id"]).infer(["trip_id"], trips["hr"])
+        s.backend.plan_cache.clear()
+        t2 = t1.infer(["trip_id"], trips["destination"])
+        s.backend.plan_cache.clear()
+        self.assertEqual(0, len(s.backend.plan_cache))
+        trace = s.backend.traces[t1.table_id]
+        shared = trace.longest_common_prefix(s.backend.traces[t2.table_id].digests)
+        self.assertGreater(shared, 0)
+        self.assertEqual(shared, sum(step.cached for step in t2.profile().steps))
+        s.backend.map_atomic_node_to_domain(
+            trips["trip_id"], pd.DataFrame({"trip_id": [1, 2]})
+        )
+        self.assertLess(len(s.backend.traces[t2.table_id]), shared)
+        for dependencies in s.backend.traces[t2.table_id].dependencies:
+            self.assertNotIn(("node", trips["trip_id"]), dependencies)
+
+    def test_executeQuery_chargesTracesToCacheBudget(self):
+        s, trips = self.initialise()
+        s.backend.plan_cache.budget = 0
+        s.get(trip_id=trips["trip_id"]).infer(["trip_id"], trips["hr"])
+        self.assertEqual(0, len(s.backend.traces))
+        self.assertEqual(0, s.backend.plan_cache.reserved)
+        s.backend.plan_cache.budget = 1000
+        t = s.get(trip_id=trips["trip_id"])
+        t.infer(["trip_id"], trips["hr"]).infer(["trip_id"], trips["destination"])
+        self.assertEqual(
+            s.backend.plan_cache.reserved,
+            sum(trace.size for trace in s.backend.traces.values()),
+        )
+        self.assertLessEqual(
+            s.backend.plan_cache.size + s.backend.plan_cache.reserved, 1000
+        )
+
+    def test_planCache_countsMissWhenNoPrefixIsCached(self):
+        s, trips = self.initialise()
+        s.backend.plan_cache.clear()
+        misses = s.backend.plan_cache.misses
+        hits = s.backend.plan_cache.hits
+        s.get(trip_id=trips["trip_id"])
+        self.assertEqual(s.backend.plan_cache.misses, misses + 1)
+        self.assertEqual(s.backend.plan_cache.hits, hits)
+        s.get(trip_id=trips["trip_id"])
+        self.assertEqual(s.backend.plan_cache.misses, misses + 1)
+        self.assertEqual(s.backend.plan_cache.hits, hits + 1)
+
+    def test_planCache_staysWithinBudget(self):
+        s, trips = self.initialise()
+        s.backend.plan_cache.budget = 200
+        s.get(trip_id=trips["trip_id"]).infer(["trip_id"], trips["hr"])
+        self.assertLessEqual(s.backend.plan_cache.size, 200)
+        self.assertEqual(
+            s.backend.plan_cache.size,
+            sum(e.size for e in s.backend.plan_cache.entries.values()),
+        )
+
+    def test_getRelationFromMapping_sharesDataWithStoredRelation(self):
+        s, trips = self.initialise()
+        edge = SchemaEdge(trips["trip_id"], trips["hr"])
+        stored = s.backend.edge_data[edge]
+        for e in [edge, SchemaEdge(trips["hr"], trips["trip_id"])]:
+            relation = s.backend.get_relation_from_mapping(Mapping(e), None)
+            for c in relation.columns:
+                self.assertTrue(
+                    any(
+                        np.shares_memory(relation[c].to_numpy(), stored[i].to_numpy())
+                        for i in stored.columns
+                    )
+                )
+        reversed_relation = s.backend.reversed_edge_data[edge]
+        self.assertEqual(list(reversed_relation.columns), [1, 0])
+        self.assertTrue(stored[1].equals(reversed_relation[0]))
+
+    def test_reversedRelation_ofMultiConstituentEdge_matchesTraversalBothWays(self):
+        bonus_df = pd.DataFrame(
+            {
+                "trip_id": [1, 1, 2, 3],
+                "cardnum": [10, 11, 10, 12],
+                "bonus": [5, 6, 5, 7],
+            }
+        ).set_index(["trip_id", "cardnum"])
+        tables = []
+        with tempfile.TemporaryDirectory() as directory:
+            # In memory the relation is reversed when it is stored, and in files when it is traversed
+            for backend in [PandasBackend(), PandasBackend(storage_dir=directory)]:
+                s = Schema(backend=backend)
+                bonus = s.insert_dataframe(bonus_df)
+                key = SchemaNode.product([bonus["trip_id"], bonus["cardnum"]])
+                edge = SchemaEdge(key, bonus["bonus"])
+                rev = SchemaEdge(bonus["bonus"], key)
+                self.assertEqual(edge in backend.reversed_edge_data, len(tables) == 0)
+                stored = backend.edge_data[edge]
+                forward = backend.get_relation_from_mapping(Mapping(edge), None)
+                backward = backend.get_relation_from_mapping(Mapping(rev), None)
+                self.assertEqual(
+                    forward[[0, 1, 2]].to_numpy().tolist(), stored.to_numpy().tolist()
+                )
+                # The end node has one constituent, so it is the first column when reversed
+                self.assertEqual(
+                    backward[[0, 1, 2]].to_numpy().tolist(),
+                    stored[[2, 0, 1]].to_numpy().tolist(),
+                )
+                t = s.get(bonus=bonus["bonus"]).infer(["bonus"], bonus["cardnum"])
+                tables += [str(t)]
+        self.assertEqual(tables[0], tables[1])
+        self.assertExpectedInline(
+            tables[0],
+            """\
+[bonus || cardnum]
+            cardnum
+bonus              
+5.0    [10.0, 10.0]
+6.0          [11.0]
+7.0          [12.0]
+
+""",
+        )
+
+    def test_storageDir_mapsDataWhenFirstTraversed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            s = Schema(backend=PandasBackend(storage_dir=directory))
+            trips = s.insert_dataframe(
+                pd.DataFrame({"trip_id": [1, 2, 3, 4], "hr": [7, 7, 8, 9]}).set_index(
+                    "trip_id"
+                )
+            )
+            edge = SchemaEdge(trips["trip_id"], trips["hr"])
+            self.assertEqual(len(s.backend.edge_data.frames), 0)
+            t = s.get(hr=trips["hr"]).infer(["hr"], trips["trip_id"])
+            self.assertIn(edge, s.backend.edge_data.frames)
+            self.assertFalse(s.backend.edge_data[edge][0].to_numpy().flags.writeable)
+            self.assertExpectedInline(
+                str(t),
+                """\
+[hr || trip_id]
+   trip_id
+hr        
+7   [1, 2]
+8      [3]
+9      [4]
+
+""",
+            )
+
+    def test_inMemoryBackend_doesNotRequirePyarrow(self):
+        script = """
+import sys
+sys.modules["pyarrow"] = None
+import pandas as pd
+from schema.schema import Schema
+s = Schema()
+trips = s.insert_dataframe(pd.DataFrame({"trip_id": [1, 2], "hr": [7, 8]}).set_index("trip_id"))
+str(s.get(hr=trips["hr"]).infer(["hr"], trips["trip_id"]))
+"""
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            capture_output=True,
+            text=True,
+            env=os.environ | {"PYTHONPATH": os.pathsep.join(sys.path)},
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_storageDir_isSharedByBackendsWithoutReplacingFiles(self):
+        with tempfile.TemporaryDirectory() as directory:
+            schemas, tables = [], []
+            for destinations in [["Zoo", "CBD"], ["Uni", "Beach", "Zoo"]]:
+                s = Schema(backend=PandasBackend(storage_dir=directory))
+                trips = s.insert_dataframe(
+                    pd.DataFrame(
+                        {"trip_id": range(len(destinations)), "to": destinations}
+                    ).set_index("trip_id")
+                )
+                schemas += [s]
+                tables += [(trips["trip_id"], trips["to"])]
+            for s, (trip_id, to) in zip(schemas, tables):
+                t = s.get(trip_id=trip_id).infer(["trip_id"], to)
+                tables += [list(t.populated_table.get_table_to_display()["to"])]
+        self.assertEqual(tables[2:], [["Zoo", "CBD"], ["Uni", "Beach", "Zoo"]])
+
+    def test_stringDomains_areEncodedWithOneDictionary(self):
+        with tempfile.TemporaryDirectory() as directory:
+            s = Schema(backend=PandasBackend(storage_dir=directory))
+            people = s.insert_dataframe(
+                pd.DataFrame(
+                    {"name": ["bo", "al", "cy"], "city": ["x", "y", "x"]}
+                ).set_index("name")
+            )
+            cities = s.insert_dataframe(
+                pd.DataFrame({"city": ["y", "z"], "country": ["b", "a"]}).set_index(
+                    "city"
+                )
+            )
+            s.blend(people["city"], cities["city"], s.create_class("City"))
+            backend = s.backend
+            dtypes = {
+                *(df.dtypes.iloc[0] for df in backend.node_data.values()),
+                *(df.dtypes.iloc[1] for df in backend.edge_data.values()),
+            }
+            self.assertEqual(dtypes, {backend.dictionary.dtype})
+            self.assertEqual(len(backend.dictionary), 8)
+            backend.edge_data.release()
+            t = (
+                s.get(name=people["name"])
+                .infer(["name"], people["city"])
+                .infer(["city"], cities["country"])
+                .sort(["name"])
+            )
+            self.assertExpectedInline(
+                str(t),
+                """\
+[name || city country]
+     city country
+name             
+al      y       b
+bo      x     NaN
+cy      x     NaN
+
+""",
+            )
+
+    def test_get_keepsCrossProductOfDomainsSymbolic(self):
+        s = Schema()
+        nodes = {}
+        for name in ["a", "b", "c"]:
+            df = pd.DataFrame({name: range(100_000), f"{name}_val": 1}).set_index(name)
+            nodes |= s.insert_dataframe(df)
+        t = s.get(a=nodes["a"], b=nodes["b"], c=nodes["c"])
+        self.assertIsInstance(t.populated_table.key_space, KeySpace)
+        self.assertExpectedInline(
+            str(t),
+            """\
+[a b c || ]
+Empty DataFrame
+Columns: []
+Index: []
+1000000000000000 keys hidden
+
+""",
+        )
+
+        keys = s.insert_dataframe(pd.DataFrame({"k": [1, 2]}).set_index("k"))
+        js = s.insert_dataframe(pd.DataFrame({"j": [7, 8], "w": [0, 1]}).set_index("j"))
+        t = s.get(k=keys["k"], j=js["j"]).infer(["j"], js["w"])
+        self.assertEqual(len(t.populated_table.key_space.factors), 2)
+        self.assertExpectedInline(
+            str(t),
+            """\
+[k j || w]
+     w
+k j   
+1 7  0
+2 7  0
+1 8  1
+2 8  1
+
+""",
+        )
+
+    def test_mapEdgeToClosure_onlyEvaluatesNewKeys(self):
+        s, trips = self.initialise()
+        next_hr = AtomicNode("next_hr", BaseType.FLOAT)
+        edge = SchemaEdge(trips["hr"], next_hr)
+        s.backend.map_edge_to_closure(edge, AddAexp(ColumnAexp(0), ConstAexp(1)), 1)
+        closure = s.backend.edge_funs[edge]
+        closure(pd.DataFrame({0: [7, 7, 8]}))
+        self.assertEqual(len(s.backend.closure_results[edge]), 2)
+        computed = s.backend.closure_results[edge]
+        closure(pd.DataFrame({0: [8, 7]}))
+        self.assertIs(s.backend.closure_results[edge], computed)
+        result = closure(pd.DataFrame({0: [9, 7]}))
+        self.assertExpectedInline(
+            str(result),
+            """\
+   0   1
+0  9  10
+1  7   8""",
+        )
+        self.assertExpectedInline(
+            str(s.backend.edge_data[edge]),
+            """\
+   0   1
+0  7   8
+1  8   9
+2  9  10""",
+        )
+
+    def test_mapEdgeToClosure_appendsResultsOfNewKeys(self):
+        s, trips = self.initialise()
+        is_zoo = AtomicNode("is_zoo", BaseType.BOOL)
+        edge = SchemaEdge(trips["destination"], is_zoo)
+        function = EqualityBexp(ColumnSexp(0), ConstSexp("Zoo"))
+        s.backend.map_edge_to_closure(edge, function, 1)
+        closure = s.backend.edge_funs[edge]
+        closure(pd.DataFrame({0: ["Zoo"]}))
+        state = ([pd.DataFrame({0: [1]})], None)
+        s.backend.plan_cache.put("traversal", state, frozenset({("edge", edge)}))
+        closure(pd.DataFrame({0: ["CBD", "Uni", "Zoo"]}))
+        self.assertIn("traversal", s.backend.plan_cache)
+        computed = s.backend.closure_results[edge]
+        self.assertTrue(s.backend.dictionary.is_current(computed[0]))
+        self.assertTrue(s.backend.dictionary.is_current(s.backend.edge_data[edge][0]))
+        self.assertExpectedInline(
+            str(s.backend.edge_data[edge]),
+            """\
+     0      1
+0  Zoo   True
+1  CBD  False
+2  Uni  False""",
+        )
+        self.assertExpectedInline(
+            str(s.backend.edge_data[SchemaEdge(is_zoo, trips["destination"])]),
+            """\
+       0    1
+0   True  Zoo
+1  False  CBD
+2  False  Uni""",
+        )
+        self.assertExpectedInline(
+            str(s.backend.node_data[is_zoo]),
+            """\
+       1
+0   True
+1  False""",
+        )
+
+    def test_mapEdgeToClosure_mergesOnEncodedStringKeys(self):
+        s, trips = self.initialise()
+        is_zoo = AtomicNode("is_zoo", BaseType.BOOL)
+        edge = SchemaEdge(trips["destination"], is_zoo)
+        function = EqualityBexp(ColumnSexp(0), ConstSexp("Zoo"))
+        s.backend.map_edge_to_closure(edge, function, 1)
+        destinations = s.backend.node_data[trips["destination"]]
+        self.assertTrue(s.backend.dictionary.is_current(destinations.iloc[:, 0]))
+        table = destinations.set_axis([0], axis=1).reset_index(drop=True)
+        result = s.backend.edge_funs[edge](pd.concat([table, table.iloc[[0]]]))
+        self.assertTrue(s.backend.dictionary.is_current(result[0]))
+        self.assertExpectedInline(
+            str(result),
+            """\
+     0      1
+0  Zoo   True
+1  CBD  False
+2  Uni  False
+3  Zoo   True""",
+        )
@@ -12,7 +12,7 @@ def step(transform: Transform, get_fn):
             hidden_key: Domain = cur.hidden_key
 
             def curry(t: pd.DataFrame, hks: list[Domain]):
-                t_new = t.copy()
+                t_new = t.copy(deep=False)
                 tot = len(t_new.columns) - len(hks)
                 t_new = t_new[[c for c in t_new.columns if c != idx]]
                 t_new = t_new.rename({i: i - 1 for i in range(idx + 1, tot)}, axis=1)
@@ -34,7 +34,7 @@ def step(transform: Transform, get_fn):
             n: int = unc.n
 
             def uncurry(t: pd.DataFrame, hks: list[Domain]):
-                t_new = t.copy()
+                t_new = t.copy(deep=False)
                 t_new = t_new[[c for c in t_new.columns if c != idx]]
                 tot = len(t.columns) - len(hks)
                 t_new = t_new.rename({i: i + 1 for i in range(n, tot)}, axis=1)
@@ -56,7 +56,7 @@ def step(transform: Transform, get_fn):
             domain = get_fn(to_get, n)
 
             def carry(t: pd.DataFrame, hks: list[Domain]):
-                t_new = t.copy()
+                t_new = t.copy(deep=False)
                 t_new = t_new.rename({i: i + 1 for i in range(n, n + m)}, axis=1)
                 t_new = pd.merge(t_new, domain, how="cross")
                 t_new[n + m + 1] = t_new[n]
@@ -72,7 +72,7 @@ def step(transform: Transform, get_fn):
             drop_to = drp.drop_to
 
             def drop(t: pd.DataFrame, hks: list[Domain]):
-                t_new = t.copy()
+                t_new = t.copy(deep=False)
                 tot = len(t_new.columns) - len(hks)
                 t_new = t_new[
                     [c for c in t_new.columns if c not in {drop_to, drop_from}]
@@ -98,7 +98,7 @@ def step(transform: Transform, get_fn):
             to_exclude = inv.to_exclude
 
             def invert(t: pd.DataFrame, _: list[Domain]):
-                t_new = t.copy()
+                t_new = t.copy(deep=False)
                 t_new = t_new[[c for c in t.columns if c >= 0]].drop_duplicates()
                 t_new = t_new.rename({j: -j for j in range(n, n + m)}, axis=1)
                 t_new = t_new.rename({i: i + m for i in range(n)}, axis=1)
@@ -4,6 +4,8 @@ from representation.domain import Domain
 
 
 class PopulatedTable(abc.ABC):
+    # The measurements of the execution that populated the table, if it was profiled
+    profile = None
 
     @abc.abstractmethod
     def display(self, left, right, backend):
@@ -13,6 +15,22 @@ class PopulatedTable(abc.ABC):
     def get_table_to_display(self):
         pass
 
+    @abc.abstractmethod
+    def get_displayed_table(self):
+        pass
+
+    @abc.abstractmethod
+    def get_window(self, offset: int, limit: int | None):
+        pass
+
+    @abc.abstractmethod
+    def get_num_rows(self) -> int:
+        pass
+
+    @abc.abstractmethod
+    def display_column(self, value: str, keys: list[str]):
+        pass
+
     @abc.abstractmethod
     def get_raw_table(self):
         pass
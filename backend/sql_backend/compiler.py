@@ -0,0 +1,217 @@
+import typing
+from functools import reduce
+
+from backend.pandas_backend.interpreter import StackPointer
+from backend.sql_backend.sql_frame import Query, SQLFrame
+from representation.representation import *
+from schema.node import SchemaNode
+
+compiled = tuple[list[SQLFrame], StackPointer]
+
+
+def cartesian_product(df1: SQLFrame, df2: SQLFrame) -> SQLFrame:
+    return df1.cross(df2).drop_duplicates()
+
+
+def get(derivation_step: Get, backend, query: Query, stack, sp) -> compiled:
+    columns = derivation_step.columns
+    nodes = [c.node for c in columns]
+    names = [c.name for c in columns]
+    if len(nodes) == 0:
+        df = SQLFrame.empty(query)
+    elif len(nodes) == 1:
+        df = backend.get_domain_frame(query, nodes[0], names[0])
+    else:
+        domains = [
+            backend.get_domain_frame(query, node, name)
+            for node, name in zip(nodes, names)
+        ]
+        df = reduce(cartesian_product, domains)
+    return stack + [df], sp
+
+
+def stt(derivation_step: StartTraversal, backend, query: Query, stack, sp) -> compiled:
+    table = stack[-1]
+    first_cols = [c.name for c in derivation_step.start_columns]
+    df = table.select(first_cols)
+    for i, col in enumerate(first_cols):
+        df = df.assign(i, col)
+    return stack + [df], sp
+
+
+def trv(derivation_step: Traverse, backend, query: Query, stack, sp) -> compiled:
+    table = stack[-1]
+
+    start_nodes = derivation_step.edge.from_nodes
+    end_nodes = derivation_step.edge.to_nodes
+
+    relation = backend.get_relation_frame(query, derivation_step.edge)
+
+    to_join = list(range(len(start_nodes)))
+
+    df = table.merge(relation, on=to_join, how="right").drop(to_join).drop_duplicates()
+    df = df.rename(
+        {
+            k: k - len(start_nodes)
+            for k in range(len(start_nodes), len(start_nodes) + len(end_nodes))
+        }
+    )
+
+    return stack[:-1] + [df], sp
+
+
+def prj(derivation_step: Project, backend, query: Query, stack, sp) -> compiled:
+    table = stack[-1]
+    indices = derivation_step.indices
+    if len(indices) == 0:
+        return stack[:-1] + [SQLFrame.empty(query)], sp
+    start_nodes = SchemaNode.get_constituents(derivation_step.start_node)
+    end_nodes = SchemaNode.get_constituents(derivation_step.end_node)
+    i = 0
+    j = 0
+    df = table
+    renaming = {j: i for i, j in enumerate(indices)}
+    while j < len(end_nodes):
+        if indices[j] == i:
+            renaming |= {i: j}
+            i += 1
+            j += 1
+        else:
+            df = df.drop([i])
+            i += 1
+    df = df.drop(list(range(i, len(start_nodes))))
+    df = df.rename(renaming)
+    return stack[:-1] + [df], sp
+
+
+def exp(derivation_step: Expand, backend, query: Query, stack, sp) -> compiled:
+    table = stack[-1]
+    end_nodes = SchemaNode.get_constituents(derivation_step.end_node)
+    indices = derivation_step.indices
+
+    idxs = [i for i in range(len(end_nodes)) if i not in set(indices)]
+
+    exists = set(indices)
+    df = table.rename({i: j for i, j in enumerate(indices)})
+
+    for j in range(len(end_nodes)):
+        if j not in exists:
+            df = df.cross(backend.get_domain_frame(query, end_nodes[j], j))
+
+    hidden_keys = derivation_step.hidden_keys
+    if len(hidden_keys) > 0:
+        for i, idx in enumerate(idxs):
+            df = df.assign(hidden_keys[i].name, idx)
+
+    return stack[:-1] + [df], sp
+
+
+def ent(derivation_step: EndTraversal, backend, query: Query, stack, sp) -> compiled:
+    cols = stack[-1].columns
+    end_cols = [c.name for c in derivation_step.end_columns]
+    should_merge = [c not in set(cols) for c in end_cols]
+    to_drop = [i for i, b in enumerate(should_merge) if not b]
+    renaming = {i: n for (i, n) in enumerate(end_cols) if should_merge[i]}
+
+    x = stack[-1].drop(to_drop).rename(renaming)
+    y = stack[-2]
+    common = [col for col in x.columns if col in y]
+    if len(common) == 0:
+        if len(y.columns) == 0:
+            res = x
+        elif len(x.columns) == 0:
+            res = SQLFrame.empty(query)
+        else:
+            res = x.cross(y)
+    else:
+        res = x.merge(y, on=common, how="outer")
+
+    return stack[:-2] + [res.drop_duplicates()], sp
+
+
+def mer(step, backend, query: Query, stack, sp) -> compiled:
+    x = stack[-1]
+    y = stack[-2]
+    common = [col for col in x.columns if col in y]
+    if len(common) == 0:
+        if len(x.columns) == 0:
+            res = y
+        elif len(y.columns) == 0:
+            res = x
+        else:
+            res = x.cross(y)
+    else:
+        res = x.merge(y, on=common, how="outer")
+    return stack[:-2] + [res.drop_duplicates()], sp
+
+
+def drp(step: Drop, backend, query: Query, stack, sp) -> compiled:
+    table = stack[-1]
+    to_drop = set([c.name for c in step.columns])
+    df = table.select([c for c in table.columns if c not in to_drop]).drop_duplicates()
+    return stack[:-1] + [df], sp
+
+
+def step(next_step: RepresentationStep, backend, query: Query, stack, sp) -> compiled:
+    match next_step.name:
+        case "GET":
+            return get(typing.cast(Get, next_step), backend, query, stack, sp)
+        case "PSH":
+            return stack + [stack[-1]], sp
+        case "POP":
+            return stack[:-1], sp
+        case "CAL":
+            return stack + [stack[-1]], StackPointer(len(stack) - 1, sp)
+        case "RET":
+            return stack[:-2] + [stack[-1]], sp.prev
+        case "RST":
+            return stack + [stack[sp.idx]], sp
+        case "MER":
+            return mer(next_step, backend, query, stack, sp)
+        case "DRP":
+            return drp(typing.cast(Drop, next_step), backend, query, stack, sp)
+        case "STT":
+            next_step = typing.cast(StartTraversal, next_step)
+            return stt(next_step, backend, query, stack, sp)
+        case "TRV":
+            return trv(typing.cast(Traverse, next_step), backend, query, stack, sp)
+        case "EQU":
+            return stack, sp
+        case "PRJ":
+            return prj(typing.cast(Project, next_step), backend, query, stack, sp)
+        case "EXP":
+            return exp(typing.cast(Expand, next_step), backend, query, stack, sp)
+        case "RNM":
+            mapping = typing.cast(Rename, next_step).mapping
+            return stack[:-1] + [stack[-1].rename(mapping)], sp
+        case "ENT":
+            next_step = typing.cast(EndTraversal, next_step)
+            return ent(next_step, backend, query, stack, sp)
+        case "FLT":
+            column = typing.cast(Filter, next_step).column
+            return stack[:-1] + [stack[-1].notnull(column.name)], sp
+        case "SRT":
+            columns = typing.cast(Sort, next_step).columns
+            return stack[:-1] + [stack[-1].sort_rows(columns)], sp
+
+
+def compile_representation(
+    steps: list[RepresentationStep], backend, query: Query
+) -> SQLFrame:
+    """
+    Compiles a list of steps into the common table expressions of a query.
+    Each step is compiled exactly as the pandas interpreter would run it, except that the
+    frames on the stack are symbolic.
+
+    Args:
+        steps (list[RepresentationStep]): The steps to compile
+        backend: The backend holding the data
+        query (Query): The query to add the common table expressions to
+
+    Returns:
+        SQLFrame: The frame at the bottom of the stack once every step has been compiled
+    """
+    stack, sp = [], None
+    for s in steps:
+        stack, sp = step(s, backend, query, stack, sp)
+    return stack[0]
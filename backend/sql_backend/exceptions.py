@@ -0,0 +1,5 @@
+class CannotMapEdgeToClosureIfSchemaBackedBySQLBackendException(Exception):
+    def __init__(self, edge):
+        super().__init__(
+            f"Cannot map edge {edge} to a closure if schema is backed by SQL backend"
+        )
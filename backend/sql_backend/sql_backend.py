@@ -0,0 +1,330 @@
+import abc
+import typing
+
+import numpy as np
+import pandas as pd
+
+from backend.backend import Backend
+from backend.pandas_backend.pandas_populated_table import PandasPopulatedTable
+from backend.populated_table import PopulatedTable
+from backend.sql_backend.compiler import compile_representation
+from backend.sql_backend.exceptions import (
+    CannotMapEdgeToClosureIfSchemaBackedBySQLBackendException,
+)
+from backend.sql_backend.sql_frame import Query, SQLFrame, quote
+from backend.sql_backend.transform_compiler import transform_compiler
+from representation.mapping import Mapping
+from representation.representation import RepresentationStep, End
+from schema.base_types import BaseType
+from schema.edge import SchemaEdge
+from schema.node import SchemaNode, AtomicNode, SchemaClass
+
+
+def generate_hidden_keys(edge: SchemaEdge, data: SQLFrame) -> SQLFrame:
+    n = len(SchemaNode.get_constituents(edge.from_node))
+    if not edge.is_functional():
+        j = 0
+        for i in range(n, len(data.columns)):
+            data = data.assign(-j - 1, i)
+            j += 1
+    return data
+
+
+class SQLBackend(Backend):
+    """
+    A backend that stores the domain of every node and the relation of every edge as a table
+    in a database. A derivation is compiled into a single query, made up of a chain of common
+    table expressions, so that joins and deduplication run in the database engine.
+    Only the result of the query is fetched into memory.
+    """
+
+    def __init__(self):
+        self.node_tables = {}
+        self.edge_tables = {}
+        self.clones = {}
+        self.num_tables = 0
+
+    @abc.abstractmethod
+    def null_safe_eq(self, x: str, y: str) -> str:
+        """
+        Returns the condition for two expressions being equal, where NULL is equal to NULL
+
+        Args:
+            x (str): The first expression
+            y (str): The second expression
+
+        Returns:
+            str: The condition
+        """
+        raise NotImplemented()
+
+    @abc.abstractmethod
+    def execute_statement(self, sql: str) -> None:
+        raise NotImplemented()
+
+    @abc.abstractmethod
+    def read_query(self, sql: str) -> pd.DataFrame:
+        raise NotImplemented()
+
+    @abc.abstractmethod
+    def write_table(self, table: str, data: pd.DataFrame) -> None:
+        """
+        Replaces the contents of a table with a data frame
+
+        Args:
+            table (str): The name of the table
+            data (pd.DataFrame): The data, whose column names are the columns of the table
+        """
+        raise NotImplemented()
+
+    def register_table(self, table: str, data: pd.DataFrame) -> None:
+        """
+        Makes a data frame readable as a table of the database, until it is unregistered.
+        By default the frame is written to a new table, which is dropped when it is unregistered
+
+        Args:
+            table (str): The name the frame is read by
+            data (pd.DataFrame): The data, whose column names are the columns of the table
+        """
+        self.write_table(table, data)
+
+    def unregister_table(self, table: str) -> None:
+        """
+        Stops a data frame registered with register_table from being readable as a table
+
+        Args:
+            table (str): The name the frame is read by
+        """
+        self.execute_statement(f"DROP TABLE IF EXISTS {quote(table)}")
+
+    def new_table(self, prefix: str) -> str:
+        self.num_tables += 1
+        return f"{prefix}_{self.num_tables}"
+
+    def lookup(self, node: SchemaNode) -> SchemaNode:
+        assert node in self.clones
+        lookup = node
+        while self.clones[lookup] != lookup:
+            lookup = self.clones[node]
+        return lookup
+
+    def sample_table(self, table: str, size: int = 1000) -> pd.DataFrame:
+        """
+        Fetches the first rows of a table in the database, from which the types of its columns are determined
+
+        Args:
+            table (str): The name of the table
+            size (int): The number of rows to fetch
+
+        Returns:
+            pd.DataFrame: The rows
+        """
+        return self.read_query(f"SELECT * FROM {quote(table)} LIMIT {int(size)}")
+
+    def find_duplicate_keys(self, table: str, keys: list[str]) -> pd.DataFrame:
+        """
+        Finds the keys that identify more than one row of a table in the database
+
+        Args:
+            table (str): The name of the table
+            keys (list[str]): The key columns
+
+        Returns:
+            pd.DataFrame: Each duplicated key, once
+        """
+        columns = ", ".join(quote(k) for k in keys)
+        return self.read_query(
+            f"SELECT {columns} FROM {quote(table)} GROUP BY {columns} HAVING COUNT(*) > 1"
+        )
+
+    def map_atomic_node_to_domain(self, node, domain: pd.DataFrame | pd.Series) -> None:
+        if isinstance(domain, pd.Series):
+            domain = pd.DataFrame(domain)
+        cs = SchemaNode.get_constituents(node)
+        assert len(cs) == 1
+        domain = domain.dropna().drop_duplicates()
+        domain.columns = ["v"]
+        if node not in self.node_tables:
+            self.node_tables[node] = self.new_table("node")
+        self.clones[node] = node
+        self.write_table(self.node_tables[node], domain)
+
+    def map_atomic_node_to_column(self, node: AtomicNode, table: str, column: str):
+        """
+        Maps a node to the distinct values of a column of a table in the database
+
+        Args:
+            node (AtomicNode): The node
+            table (str): The name of the table
+            column (str): The name of the column
+        """
+        if node not in self.node_tables:
+            self.node_tables[node] = self.new_table("node")
+        self.clones[node] = node
+        name = quote(self.node_tables[node])
+        self.execute_statement(f"DROP TABLE IF EXISTS {name}")
+        self.execute_statement(
+            f"CREATE TABLE {name} AS SELECT DISTINCT {quote(column)} AS v "
+            f"FROM {quote(table)} WHERE {quote(column)} IS NOT NULL"
+        )
+
+    def get_domain_size(self, node: SchemaNode) -> int:
+        cs = SchemaNode.get_constituents(node)
+        assert len(cs) == 1
+        table = quote(self.node_tables[self.lookup(node)])
+        return int(self.read_query(f"SELECT COUNT(*) FROM {table}").iloc[0, 0])
+
+    def get_domain_from_atomic_node(self, node: SchemaNode, with_name):
+        cs = SchemaNode.get_constituents(node)
+        assert len(cs) == 1
+        table = quote(self.node_tables[self.lookup(node)])
+        domain = self.read_query(f"SELECT v FROM {table}")
+        domain.columns = [with_name]
+        return domain
+
+    def get_domain_frame(self, query: Query, node: SchemaNode, with_name) -> SQLFrame:
+        cs = SchemaNode.get_constituents(node)
+        assert len(cs) == 1
+        table = self.node_tables[self.lookup(node)]
+        return SQLFrame.from_table(query, table, [(with_name, "v")])
+
+    def clone(self, node: SchemaNode, new_node: SchemaNode):
+        self.clones[new_node] = node
+
+    def map_edge_to_data_relation(self, edge: SchemaEdge, relation: pd.DataFrame):
+        f_node_c = SchemaNode.get_constituents(edge.from_node)
+        t_node_c = SchemaNode.get_constituents(edge.to_node)
+        assert len(f_node_c + t_node_c) == len(relation.columns)
+        df = relation.dropna()
+        df.columns = [f"c{i}" for i in range(len(df.columns))]
+        if edge not in self.edge_tables:
+            self.edge_tables[edge] = self.new_table("edge")
+        self.write_table(self.edge_tables[edge], df)
+
+    def map_edge_to_columns(self, edge: SchemaEdge, table: str, columns: list[str]):
+        """
+        Maps an edge to the distinct rows of some columns of a table in the database
+
+        Args:
+            edge (SchemaEdge): The edge
+            table (str): The name of the table
+            columns (list[str]): The columns of the start node, followed by the columns of the end node
+        """
+        f_node_c = SchemaNode.get_constituents(edge.from_node)
+        t_node_c = SchemaNode.get_constituents(edge.to_node)
+        assert len(f_node_c + t_node_c) == len(columns)
+        if edge not in self.edge_tables:
+            self.edge_tables[edge] = self.new_table("edge")
+        name = quote(self.edge_tables[edge])
+        projection = ", ".join(f"{quote(c)} AS c{i}" for i, c in enumerate(columns))
+        condition = " AND ".join(f"{quote(c)} IS NOT NULL" for c in columns)
+        self.execute_statement(f"DROP TABLE IF EXISTS {name}")
+        self.execute_statement(
+            f"CREATE TABLE {name} AS SELECT DISTINCT {projection} "
+            f"FROM {quote(table)} WHERE {condition}"
+        )
+
+    def map_edge_to_closure(self, edge: SchemaEdge, function, num_args: int):
+        # A closure is evaluated in Python over the keys it is applied to,
+        # so it cannot be part of the single query a derivation is compiled into
+        raise CannotMapEdgeToClosureIfSchemaBackedBySQLBackendException(edge)
+
+    def get_relation_frame(self, query: Query, mapping: Mapping) -> SQLFrame:
+        edge = mapping.edge
+        rev = SchemaEdge(edge.to_node, edge.from_node)
+
+        n = len(SchemaNode.get_constituents(edge.from_node))
+        m = len(SchemaNode.get_constituents(edge.to_node))
+
+        hks = mapping.hidden_keys
+        if edge in self.edge_tables:
+            table = self.edge_tables[edge]
+            data = SQLFrame.from_table(
+                query, table, [(i, f"c{i}") for i in range(n + m)]
+            )
+        elif rev in self.edge_tables:
+            table = self.edge_tables[rev]
+            data = SQLFrame.from_table(
+                query, table, [(i, f"c{i}") for i in range(n + m)]
+            )
+            data = data.rename({j: -j for j in range(n, n + m)})
+            data = data.rename({i: i + m for i in range(n)})
+            data = data.rename({j: (-j) - n for j in range(-n - m + 1, -n + 1)})
+        else:
+            assert False
+
+        data = generate_hidden_keys(edge, data)
+
+        data, hks = transform_compiler(
+            data,
+            hks,
+            mapping.transform,
+            lambda n, name: self.get_domain_frame(query, n, name),
+        )
+        data = data.rename({-i - 1: hk.name for (i, hk) in enumerate(hks)})
+        return data
+
+    def extend_domain(self, node: AtomicNode, domain_node: SchemaClass):
+        table = quote(self.node_tables[node])
+        domain = quote(self.node_tables[self.lookup(domain_node)])
+        self.execute_statement(
+            f"INSERT INTO {table} SELECT v FROM {domain} EXCEPT SELECT v FROM {table}"
+        )
+
+    def to_sql(self, derivation_steps: list[RepresentationStep]) -> str:
+        """
+        Compiles a derivation into a single query
+
+        Args:
+            derivation_steps (list[RepresentationStep]): The derivation, ending with an End step
+
+        Returns:
+            str: The query
+        """
+        query = Query(self.null_safe_eq)
+        frame = compile_representation(derivation_steps[:-1], self, query)
+        sql, _ = query.to_sql(frame)
+        return sql
+
+    def populate(self, query: Query, frame: SQLFrame, last: End) -> PopulatedTable:
+        """
+        Runs a compiled query and holds its result in a populated table
+
+        Args:
+            query (Query): The compiled query
+            frame (SQLFrame): The frame at the end of the query
+            last (End): The last step of the derivation, naming the columns of the table
+
+        Returns:
+            PopulatedTable: The populated table, before it is displayed
+        """
+        if frame.source is None:
+            df = pd.DataFrame()
+        else:
+            sql, labels = query.to_sql(frame)
+            df = self.read_query(sql)
+            df.columns = labels
+            for c in df.columns[df.dtypes == object]:
+                df[c] = df[c].where(df[c].notnull(), np.nan)
+
+        # Booleans may be stored as 0 and 1, so they are restored for columns of boolean nodes
+        for column in last.left + last.right:
+            node = column.get_schema_node()
+            name = column.get_name()
+            if node.node_type != BaseType.BOOL or name not in df.columns:
+                continue
+            if set(df[name].dropna().unique()).issubset({0, 1}):
+                df[name] = df[name].map(bool, na_action="ignore")
+
+        return PandasPopulatedTable(df)
+
+    def execute_query(
+        self, table_id, derived_from, derivation_steps: list[RepresentationStep]
+    ) -> tuple[PopulatedTable, Backend]:
+        last = typing.cast(End, derivation_steps[-1])
+
+        query = Query(self.null_safe_eq)
+        frame = compile_representation(derivation_steps[:-1], self, query)
+        populated = self.populate(query, frame, last)
+        populated.display(last.left, last.right, self)
+        return populated, self
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+from typing import Callable
+
+Label = int | str
+
+
+def quote(name: str) -> str:
+    """
+    Quotes an SQL identifier
+
+    Args:
+        name (str): The identifier
+
+    Returns:
+        str: The quoted identifier
+    """
+    return '"' + name.replace('"', '""') + '"'
+
+
+def identifier(label: Label) -> str:
+    """
+    Returns the SQL identifier of a column label.
+    The interpreter labels columns both with names and with integers, so the two are prefixed
+    differently to keep them apart. Some databases match identifiers case-insensitively,
+    so upper case letters are escaped.
+
+    Args:
+        label (Label): The column label
+
+    Returns:
+        str: The quoted identifier
+    """
+    if isinstance(label, str):
+        escaped = "".join(
+            "^" + c.lower() if c.isupper() or c == "^" else c for c in label
+        )
+        return quote(f"${escaped}")
+    return quote(f"#{label}")
+
+
+class Query:
+    """
+    A query being compiled, made up of a chain of common table expressions
+    """
+
+    def __init__(self, null_safe_eq: Callable[[str, str], str]):
+        """
+        Creates a new Query with no common table expressions
+
+        Args:
+            null_safe_eq (Callable[[str, str], str]): Builds the dialect's condition for
+                two expressions being equal, where NULL is equal to NULL
+        """
+        self.ctes: list[str] = []
+        self.null_safe_eq = null_safe_eq
+
+    def add(self, select: str) -> str:
+        """
+        Adds a common table expression to the query
+
+        Args:
+            select (str): The SELECT statement defining the expression
+
+        Returns:
+            str: The name of the expression
+        """
+        name = f"t{len(self.ctes)}"
+        self.ctes += [f"{name} AS ({select})"]
+        return name
+
+    def to_sql(self, frame: SQLFrame) -> tuple[str, list[Label]]:
+        """
+        Returns the query selecting the columns of a frame
+
+        Args:
+            frame (SQLFrame): The frame at the end of the query
+
+        Returns:
+            tuple[str, list[Label]]: The SQL, and the label of each column it selects
+        """
+        labels = frame.columns
+        if frame.source is None:
+            return "SELECT NULL WHERE 0 = 1", []
+        projection = ", ".join(
+            f"{expr} AS {quote(f'c{i}')}" for i, (_, expr) in enumerate(frame.exprs)
+        )
+        sql = f"SELECT {projection} FROM {frame.source}"
+        if frame.order is not None:
+            sql += " ORDER BY " + ", ".join(frame[c] for c in frame.order)
+        if len(self.ctes) > 0:
+            sql = "WITH " + ",\n".join(self.ctes) + "\n" + sql
+        return sql, labels
+
+
+class SQLFrame:
+    """
+    A symbolic data frame.
+    It mirrors the pandas operations used by the interpreter, but instead of computing a result,
+    it adds common table expressions to a Query.
+    Projections and renamings only relabel the columns of the source, so they emit no SQL.
+    A frame without a source is the empty frame, which has no columns and no rows.
+    """
+
+    def __init__(
+        self,
+        query: Query,
+        source: str | None,
+        exprs: list[tuple[Label, str]],
+        order: list[Label] | None = None,
+    ):
+        """
+        Creates a new SQLFrame
+
+        Args:
+            query (Query): The query the frame belongs to
+            source (str | None): The table or common table expression the frame selects from
+            exprs (list[tuple[Label, str]]): The label of each column, and the column of the source it selects
+            order (list[Label] | None): The columns the frame is sorted by, if any
+        """
+        self.query = query
+        self.source = source
+        self.exprs = exprs
+        self.order = order
+
+    @classmethod
+    def empty(cls, query: Query) -> SQLFrame:
+        return SQLFrame(query, None, [])
+
+    @classmethod
+    def from_table(
+        cls, query: Query, table: str, columns: list[tuple[Label, str]]
+    ) -> SQLFrame:
+        """
+        Creates a frame selecting from a table in the database
+
+        Args:
+            query (Query): The query the frame belongs to
+            table (str): The name of the table
+            columns (list[tuple[Label, str]]): The label of each column, and the name of the column in the table
+
+        Returns:
+            SQLFrame: The frame
+        """
+        return SQLFrame(query, quote(table), [(l, quote(c)) for (l, c) in columns])
+
+    @property
+    def columns(self) -> list[Label]:
+        return [label for (label, _) in self.exprs]
+
+    def __getitem__(self, label: Label) -> str:
+        for l, expr in self.exprs:
+            if l == label:
+                return expr
+        raise KeyError(label)
+
+    def __contains__(self, label: Label) -> bool:
+        return label in set(self.columns)
+
+    def with_exprs(self, exprs: list[tuple[Label, str]]) -> SQLFrame:
+        return SQLFrame(self.query, self.source, exprs)
+
+    def select(self, labels: list[Label]) -> SQLFrame:
+        return self.with_exprs([(label, self[label]) for label in labels])
+
+    def drop(self, labels: list[Label]) -> SQLFrame:
+        to_drop = set(labels)
+        return self.with_exprs([(l, e) for (l, e) in self.exprs if l not in to_drop])
+
+    def rename(self, mapping: dict) -> SQLFrame:
+        exprs = [(mapping.get(l, l), e) for (l, e) in self.exprs]
+        order = None
+        if self.order is not None:
+            order = [mapping.get(l, l) for l in self.order]
+        return SQLFrame(self.query, self.source, exprs, order)
+
+    def assign(self, label: Label, to: Label) -> SQLFrame:
+        """
+        Mirrors df[label] = df[to]: the column is replaced if it exists, and appended otherwise
+
+        Args:
+            label (Label): The column to assign
+            to (Label): The column whose values are assigned
+
+        Returns:
+            SQLFrame: The new frame
+        """
+        expr = self[to]
+        if label in self:
+            return self.with_exprs(
+                [(l, expr if l == label else e) for (l, e) in self.exprs]
+            )
+        return self.with_exprs(self.exprs + [(label, expr)])
+
+    def sort_columns(self) -> SQLFrame:
+        return self.with_exprs(sorted(self.exprs, key=lambda p: p[0]))
+
+    def sort_rows(self, by: Label | list[Label]) -> SQLFrame:
+        labels = by if isinstance(by, list) else [by]
+        return SQLFrame(self.query, self.source, self.exprs, labels)
+
+    def projection(self, alias: str | None = None) -> list[str]:
+        prefix = "" if alias is None else f"{alias}."
+        return [f"{prefix}{e} AS {identifier(l)}" for (l, e) in self.exprs]
+
+    def materialise(
+        self,
+        distinct: bool = False,
+        where: str | None = None,
+        extra: list[str] | None = None,
+    ) -> SQLFrame:
+        """
+        Emits a common table expression selecting the columns of the frame
+
+        Args:
+            distinct (bool): If True, duplicate rows are dropped
+            where (str | None): A condition the rows must satisfy
+            extra (list[str] | None): Additional columns, each given as "expression AS identifier"
+
+        Returns:
+            SQLFrame: A frame selecting every column of the new expression
+        """
+        if self.source is None:
+            return self
+        projection = self.projection() + (extra or [])
+        sql = "SELECT " + ("DISTINCT " if distinct else "") + ", ".join(projection)
+        sql += f" FROM {self.source}"
+        if where is not None:
+            sql += f" WHERE {where}"
+        name = self.query.add(sql)
+        return SQLFrame(self.query, name, [(l, identifier(l)) for l in self.columns])
+
+    def drop_duplicates(self) -> SQLFrame:
+        return self.materialise(distinct=True)
+
+    def notnull(self, label: Label) -> SQLFrame:
+        frame = self.materialise(where=f"{self[label]} IS NOT NULL")
+        return SQLFrame(frame.query, frame.source, frame.exprs, self.order)
+
+    def reset_index(self) -> SQLFrame:
+        """
+        Mirrors df.reset_index(), numbering the rows in a new column named "index"
+
+        Returns:
+            SQLFrame: The new frame
+        """
+        frame = self.materialise(
+            extra=[f"ROW_NUMBER() OVER () - 1 AS {identifier('index')}"]
+        )
+        return frame.select(["index"] + self.columns)
+
+    def cross(self, other: SQLFrame) -> SQLFrame:
+        """
+        Mirrors pd.merge(self, other, how="cross")
+
+        Args:
+            other (SQLFrame): The right frame
+
+        Returns:
+            SQLFrame: The cartesian product of the frames
+        """
+        projection = self.projection("l") + other.projection("r")
+        name = self.query.add(
+            f"SELECT {', '.join(projection)} FROM {self.source} AS l CROSS JOIN {other.source} AS r"
+        )
+        return SQLFrame(
+            self.query, name, [(l, identifier(l)) for l in self.columns + other.columns]
+        )
+
+    def merge(self, other: SQLFrame, on: list[Label], how: str) -> SQLFrame:
+        """
+        Mirrors pd.merge(self, other, on=on, how=how).
+        As in pandas, missing keys match each other, and the keys of the result take
+        their values from whichever side has them.
+
+        Args:
+            other (SQLFrame): The right frame
+            on (list[Label]): The columns to join on
+            how (str): One of "inner", "left", "right" or "outer"
+
+        Returns:
+            SQLFrame: The joined frame, with the columns of the left frame followed by the
+            remaining columns of the right frame
+        """
+        keys = set(on)
+        projection = []
+        for label, expr in self.exprs:
+            if label not in keys or how in {"inner", "left"}:
+                projection += [f"l.{expr} AS {identifier(label)}"]
+            elif how == "right":
+                projection += [f"r.{other[label]} AS {identifier(label)}"]
+            else:
+                projection += [
+                    f"COALESCE(l.{expr}, r.{other[label]}) AS {identifier(label)}"
+                ]
+        rest = [(l, e) for (l, e) in other.exprs if l not in keys]
+        projection += [f"r.{e} AS {identifier(l)}" for (l, e) in rest]
+        condition = " AND ".join(
+            self.query.null_safe_eq(f"l.{self[k]}", f"r.{other[k]}") for k in on
+        )
+        join = {
+            "inner": "INNER JOIN",
+            "left": "LEFT JOIN",
+            "right": "RIGHT JOIN",
+            "outer": "FULL OUTER JOIN",
+        }[how]
+        name = self.query.add(
+            f"SELECT {', '.join(projection)} FROM {self.source} AS l "
+            f"{join} {other.source} AS r ON {condition}"
+        )
+        return SQLFrame(
+            self.query,
+            name,
+            [(l, identifier(l)) for l in self.columns + [l for (l, _) in rest]],
+        )
@@ -0,0 +1,63 @@
+import sqlite3
+
+import pandas as pd
+
+from backend.sql_backend.sql_backend import SQLBackend
+from backend.sql_backend.sql_frame import quote
+
+
+def to_sqlite_value(value):
+    """
+    Converts a value to one sqlite3 can bind to a parameter.
+    SQLite has no type for timestamps, so they are given as ISO 8601 strings.
+
+    Args:
+        value: The value
+
+    Returns:
+        The value, or its ISO 8601 string if it is a timestamp
+    """
+    return value.isoformat() if isinstance(value, pd.Timestamp) else value
+
+
+class SQLiteBackend(SQLBackend):
+    """
+    A SQLBackend that stores its tables in a SQLite database
+    """
+
+    def __init__(self, database: str = ":memory:"):
+        """
+        Creates a new SQLiteBackend
+
+        Args:
+            database (str): The path of the database file. Defaults to a new in-memory database
+        """
+        super().__init__()
+        self.connection = sqlite3.connect(database)
+
+    def null_safe_eq(self, x: str, y: str) -> str:
+        return f"{x} IS {y}"
+
+    def execute_statement(self, sql: str) -> None:
+        self.connection.execute(sql)
+        self.connection.commit()
+
+    def read_query(self, sql: str) -> pd.DataFrame:
+        return pd.read_sql_query(sql, self.connection)
+
+    def write_table(self, table: str, data: pd.DataFrame) -> None:
+        # Columns are declared without a type, so that SQLite stores every value as it is given
+        columns = ", ".join(quote(str(c)) for c in data.columns)
+        placeholders = ", ".join("?" for _ in data.columns)
+        rows = data.astype(object).where(data.notnull(), None)
+        for i, dtype in enumerate(data.dtypes):
+            # Timestamps are converted here rather than by an adapter, which sqlite3 would register globally
+            if dtype == object or pd.api.types.is_datetime64_any_dtype(dtype):
+                rows.isetitem(i, rows.iloc[:, i].map(to_sqlite_value))
+        rows = rows.to_numpy().tolist()
+        self.connection.execute(f"DROP TABLE IF EXISTS {quote(table)}")
+        self.connection.execute(f"CREATE TABLE {quote(table)} ({columns})")
+        self.connection.executemany(
+            f"INSERT INTO {quote(table)} VALUES ({placeholders})", rows
+        )
+        self.connection.commit()
@@ -0,0 +1,125 @@
+import sqlite3
+
+import expecttest
+import pandas as pd
+
+from backend.pandas_backend.exceptions import KeyDuplicationException
+from backend.sql_backend.exceptions import (
+    CannotMapEdgeToClosureIfSchemaBackedBySQLBackendException,
+)
+from backend.sql_backend.sqlite_backend import SQLiteBackend
+from schema.exceptions import (
+    CannotInsertSQLTableIfSchemaNotBackedBySQLBackendException,
+)
+from exp.aexp import ColumnAexp
+from schema.base_types import BaseType
+from schema.edge import SchemaEdge
+from schema.node import AtomicNode
+from schema.schema import Schema
+
+
+class TestSQLiteBackend(expecttest.TestCase):
+
+    def initialise(self):
+        trips_df = pd.DataFrame(
+            {
+                "trip_id": [1, 2, 3, 4],
+                "hr": [7, 7, 8, 9],
+                "destination": ["Zoo", "CBD", "Zoo", None],
+            }
+        )
+        backend = SQLiteBackend()
+        trips_df.to_sql("trips", backend.connection, index=False)
+        s = Schema(backend=backend)
+        trips = s.insert_sql_table("trips", ["trip_id"])
+        return s, trips
+
+    def test_insertSQLTable_createsNodesForEveryColumn(self):
+        s, trips = self.initialise()
+        self.assertEqual(["trip_id", "hr", "destination"], list(trips.keys()))
+        self.assertEqual(4, s.backend.get_domain_size(trips["trip_id"]))
+        self.assertEqual(2, s.backend.get_domain_size(trips["destination"]))
+
+    def test_insertSQLTable_raisesExceptionIfKeysAreDuplicated(self):
+        backend = SQLiteBackend()
+        pd.DataFrame({"a": [1, 1], "b": [2, 3]}).to_sql(
+            "t", backend.connection, index=False
+        )
+        s = Schema(backend=backend)
+        self.assertRaises(
+            KeyDuplicationException, lambda: s.insert_sql_table("t", ["a"])
+        )
+
+    def test_insertSQLTable_raisesExceptionIfBackendNotSQLBackend(self):
+        s = Schema()
+        s.insert_dataframe(pd.DataFrame({"a": [1], "b": [2]}).set_index("a"))
+        self.assertRaises(
+            CannotInsertSQLTableIfSchemaNotBackedBySQLBackendException,
+            lambda: s.insert_sql_table("t", ["a"]),
+        )
+
+    def test_mapEdgeToClosure_raisesException(self):
+        s, trips = self.initialise()
+        next_hr = AtomicNode("next_hr", BaseType.FLOAT)
+        trips["hr"].id_prefix = 0
+        next_hr.id_prefix = 0
+        edge = SchemaEdge(trips["hr"], next_hr)
+        self.assertExpectedRaisesInline(
+            CannotMapEdgeToClosureIfSchemaBackedBySQLBackendException,
+            lambda: s.backend.map_edge_to_closure(edge, ColumnAexp(0) + 1, 1),
+            """Cannot map edge hr --- next_hr to a closure if schema is backed by SQL backend""",
+        )
+
+    def test_executeQuery_compilesToSingleQuery(self):
+        s, trips = self.initialise()
+        t = s.get(trip_id=trips["trip_id"]).infer(["trip_id"], trips["hr"])
+        sql = s.backend.to_sql(t.intermediate_representation)
+        self.assertTrue(sql.startswith("WITH "))
+        self.assertNotIn(";", sql)
+
+    def test_executeQuery_matchesPandasBackend(self):
+        s, trips = self.initialise()
+        pandas_schema = Schema()
+        pandas_trips = pandas_schema.insert_dataframe(
+            s.backend.read_query("SELECT * FROM trips").set_index("trip_id")
+        )
+        results = []
+        for schema, table in [(s, trips), (pandas_schema, pandas_trips)]:
+            t = (
+                schema.get(trip_id=table["trip_id"])
+                .infer(["trip_id"], table["hr"])
+                .infer(["trip_id"], table["destination"])
+            )
+            t = t.mutate(late=t["hr"] > 7).hide("hr")
+            results += [str(t.sort("trip_id"))]
+        self.assertEqual(results[1], results[0])
+        self.assertExpectedInline(
+            results[0],
+            """\
+[trip_id || destination late]
+        destination   late
+trip_id                   
+1               Zoo  False
+2               CBD  False
+3               Zoo   True
+4               NaN   True
+
+""",
+        )
+
+    def test_writeTable_storesTimestampsWithoutGlobalAdapter(self):
+        backend = SQLiteBackend()
+        backend.write_table(
+            "t",
+            pd.DataFrame(
+                {"a": [1, 2], "at": pd.to_datetime(["2023-01-01 09:50", None])}
+            ),
+        )
+        self.assertNotIn((pd.Timestamp, sqlite3.PrepareProtocol), sqlite3.adapters)
+        self.assertExpectedInline(
+            str(backend.read_query("SELECT * FROM t")),
+            """\
+   a                   at
+0  1  2023-01-01T09:50:00
+1  2                 None""",
+        )
@@ -0,0 +1,116 @@
+from backend.sql_backend.sql_frame import SQLFrame
+from representation.transform import *
+
+
+def step(t: Transform, get_fn):
+    match t.name:
+        case "CUR":
+            assert isinstance(t, Curry)
+            idx: int = t.to_curry
+            hidden_key: Domain = t.hidden_key
+
+            def curry(f: SQLFrame, hks: list[Domain]):
+                tot = len(f.columns) - len(hks)
+                f_new = f.select([c for c in f.columns if c != idx])
+                f_new = f_new.rename({i: i - 1 for i in range(idx + 1, tot)})
+                f_new = f_new.rename({i: i - 1 for i in range(-1, -len(hks) - 1, -1)})
+                f_new = f_new.with_exprs(f_new.exprs + [(-1, f[idx])])
+                return f_new.sort_columns(), [hidden_key] + hks
+
+            return curry
+
+        case "UNC":
+            assert isinstance(t, Uncurry)
+            org: int = t.to_uncurry
+            idx = -org - 1
+            n: int = t.n
+
+            def uncurry(f: SQLFrame, hks: list[Domain]):
+                f_new = f.select([c for c in f.columns if c != idx])
+                tot = len(f.columns) - len(hks)
+                f_new = f_new.rename({i: i + 1 for i in range(n, tot)})
+                f_new = f_new.rename({j: j + 1 for j in range(idx, len(hks) - 2, -1)})
+                f_new = f_new.with_exprs(
+                    [(l, e) for (l, e) in f_new.exprs if l != n] + [(n, f[idx])]
+                )
+                return f_new.sort_columns(), [
+                    hk for (i, hk) in enumerate(hks) if i != org
+                ]
+
+            return uncurry
+
+        case "CAR":
+            assert isinstance(t, Carry)
+            to_get = t.to_carry.node
+            n = t.n
+            m = t.m
+
+            def carry(f: SQLFrame, hks: list[Domain]):
+                f_new = f.rename({i: i + 1 for i in range(n, n + m)})
+                f_new = f_new.cross(get_fn(to_get, n))
+                f_new = f_new.assign(n + m + 1, n)
+                return f_new.sort_columns(), hks
+
+            return carry
+
+        case "DRP":
+            assert isinstance(t, Drop)
+            drop_from = t.drop_from
+            drop_to = t.drop_to
+
+            def drop(f: SQLFrame, hks: list[Domain]):
+                tot = len(f.columns) - len(hks)
+                f_new = f.select(
+                    [c for c in f.columns if c not in {drop_to, drop_from}]
+                )
+                f_new = f_new.rename({i: i - 1 for i in range(drop_to + 1, drop_from)})
+                f_new = f_new.rename({i: i - 2 for i in range(drop_from + 1, tot)})
+                f_new = f_new.drop_duplicates()
+                return f_new.sort_columns().reset_index(), hks
+
+            return drop
+
+        case "INV":
+            assert isinstance(t, Invert)
+            n = t.n
+            m = t.m
+            new_hks = t.hidden_keys
+            to_exclude = t.to_exclude
+
+            def invert(f: SQLFrame, _: list[Domain]):
+                f_new = f.select([c for c in f.columns if c >= 0]).drop_duplicates()
+                f_new = f_new.rename({j: -j for j in range(n, n + m)})
+                f_new = f_new.rename({i: i + m for i in range(n)})
+                f_new = f_new.rename({j: (-j) - n for j in range(-n - m + 1, -n + 1)})
+                if len(new_hks) > 0:
+                    j = 0
+                    for i in range(m, n + m):
+                        if i - m in set(to_exclude):
+                            continue
+                        f_new = f_new.assign(-j - 1, i)
+                        j += 1
+                return f_new.sort_columns(), new_hks
+
+            return invert
+    return lambda f, hks: (f, hks)
+
+
+def transform_compiler(
+    f: SQLFrame, hks: list[Domain], transformations: list[Transform], get_fn
+) -> tuple[SQLFrame, list[Domain]]:
+    """
+    Applies a list of transformations to a symbolic relation,
+    exactly as the pandas transform interpreter applies them to a data frame
+
+    Args:
+        f (SQLFrame): The relation
+        hks (list[Domain]): The hidden keys of the relation
+        transformations (list[Transform]): The transformations to apply
+        get_fn: Returns the frame holding the domain of a node, given the node and a column label
+
+    Returns:
+        tuple[SQLFrame, list[Domain]]: The transformed relation and its hidden keys
+    """
+    for t in transformations:
+        f, hks = step(t, get_fn)(f, hks)
+    return f, hks
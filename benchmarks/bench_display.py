@@ -0,0 +1,88 @@
+"""
+Compares building the displayed frame of a table in one grouped pass against
+merging each value column into the keys in turn.
+
+Run with `python -m benchmarks.bench_display [keys] [columns]`.
+"""
+
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from backend.pandas_backend.deduplicate import deduplicate
+from backend.pandas_backend.display import display_frame
+
+
+def display_via_merges(app: pd.DataFrame, keys, values, listed) -> pd.DataFrame:
+    df = deduplicate(app[keys].reset_index(drop=True))
+    for value in values:
+        to_add = app[keys + [value]]
+        if value in listed:
+            to_add = to_add.loc[to_add.dropna().index]
+            to_add = to_add.groupby(keys)[value].agg(list)
+        df = deduplicate(pd.merge(df, to_add, on=keys, how="outer"))
+    lists = [v for v in values if v in listed]
+    df[lists] = df[lists].map(
+        lambda d: (
+            d if isinstance(d, list) and not np.all(pd.isnull(np.array(d))) else np.nan
+        )
+    )
+    df = df.dropna(subset=values, how="all").dropna(subset=keys, how="any")
+    df[lists] = df[lists].map(lambda d: d if isinstance(d, list) else [])
+    return deduplicate(df).set_index(keys)
+
+
+def make_frame(keys: int, columns: int, ambiguous: bool = False) -> pd.DataFrame:
+    """
+    Makes the rows of a table keyed by k, with a hidden key h. Every third
+    value column depends on h, and the others on k alone, unless ambiguous.
+    """
+    rng = np.random.default_rng(0)
+    k = rng.permutation(np.repeat(np.arange(keys, dtype=float), 3))
+    k[rng.random(len(k)) < 0.01] = np.nan
+    data = {"k": k, "h": rng.integers(0, 4, len(k))}
+    for i in range(columns):
+        if i % 3 == 2:
+            values = rng.integers(0, 100, len(k)).astype(float)
+        else:
+            by_key = rng.integers(0, 100, keys + 1).astype(float)
+            values = by_key[np.nan_to_num(k, nan=keys).astype(int)]
+            if ambiguous and i % 3 == 1:
+                values = values + (rng.random(len(k)) < 0.05)
+        values[rng.random(len(k)) < 0.2] = np.nan
+        data[f"v{i}"] = values
+    return deduplicate(pd.DataFrame(data))
+
+
+def main(keys: int = 5_000, columns: int = 12):
+    values = [f"v{i}" for i in range(columns)]
+    listed = {v for i, v in enumerate(values) if i % 3 == 2}
+    for ambiguous in [False, True]:
+        app = make_frame(keys, columns, ambiguous)
+        pd.testing.assert_frame_equal(
+            display_frame(app, ["k"], values, listed),
+            display_via_merges(app, ["k"], values, listed),
+        )
+        old = min(
+            timeit.repeat(
+                lambda: display_via_merges(app, ["k"], values, listed),
+                number=1,
+                repeat=3,
+            )
+        )
+        new = min(
+            timeit.repeat(
+                lambda: display_frame(app, ["k"], values, listed), number=1, repeat=3
+            )
+        )
+        print(
+            f"{columns} columns of {len(app)} rows over {keys} keys"
+            f"{' with several values per key' if ambiguous else ''}: "
+            f"merges {old:.3f}s, grouped {new:.3f}s, speedup {old / new:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,60 @@
+"""
+Compares building the first and last rows of the displayed frame of a table,
+as a truncated repr prints them, against building the whole frame and slicing it.
+
+Run with `python -m benchmarks.bench_window [keys] [columns] [rows]`.
+"""
+
+import sys
+import timeit
+
+import pandas as pd
+
+from backend.pandas_backend.deduplicate import deduplicate
+from backend.pandas_backend.display import display_frame, display_window
+from benchmarks.bench_display import make_frame
+
+
+def window_via_whole_frame(app: pd.DataFrame, keys, values, listed, rows):
+    df = display_frame(deduplicate(app), keys, values, listed)
+    return pd.concat([df.iloc[:rows], df.iloc[-rows:]]), len(df)
+
+
+def window_via_display_window(app: pd.DataFrame, keys, values, listed, rows):
+    head, total = display_window(app, keys, values, listed, 0, rows)
+    tail, _ = display_window(app, keys, values, listed, -rows, rows)
+    return pd.concat([head, tail]), total
+
+
+def main(keys: int = 100_000, columns: int = 12, rows: int = 5):
+    values = [f"v{i}" for i in range(columns)]
+    listed = {v for i, v in enumerate(values) if i % 3 == 2}
+    for ambiguous in [False, True]:
+        app = make_frame(keys, columns, ambiguous)
+        old_df, old_total = window_via_whole_frame(app, ["k"], values, listed, rows)
+        new_df, new_total = window_via_display_window(app, ["k"], values, listed, rows)
+        assert old_total == new_total
+        pd.testing.assert_frame_equal(old_df, new_df)
+        old = min(
+            timeit.repeat(
+                lambda: window_via_whole_frame(app, ["k"], values, listed, rows),
+                number=1,
+                repeat=3,
+            )
+        )
+        new = min(
+            timeit.repeat(
+                lambda: window_via_display_window(app, ["k"], values, listed, rows),
+                number=1,
+                repeat=3,
+            )
+        )
+        print(
+            f"{2 * rows} of {new_total} displayed rows of {columns} columns over {keys} keys"
+            f"{' with several values per key' if ambiguous else ''}: "
+            f"whole frame {old:.3f}s, window {new:.3f}s, speedup {old / new:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
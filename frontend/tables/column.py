@@ -276,6 +276,9 @@ class Column:
         return MaskExp([], self.get_domain(), expr, expr.exp_type)
 
     def __repr__(self):
+        # The column may be displayed lazily, when it is first printed
+        if callable(self.repr):
+            self.repr = self.repr()
         return self.repr
 
     def __str__(self):
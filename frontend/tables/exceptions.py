@@ -55,3 +55,10 @@ class ColumnTypeException(Exception):
 class ColumnWithNameAlreadyExistsInTable(Exception):
     def __init__(self, name):
         super().__init__(f"Column with name {name} already exists in table")
+
+
+class TableNotProfiledException(Exception):
+    def __init__(self):
+        super().__init__(
+            "Table was not profiled: create its schema with Schema(profile=True)"
+        )
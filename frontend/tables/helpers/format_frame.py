@@ -0,0 +1,57 @@
+import pandas as pd
+
+from backend.populated_table import PopulatedTable
+
+
+def to_string_params() -> dict:
+    """
+    Returns the arguments to DataFrame.to_string with which it formats a frame as str does,
+    read from the display options
+
+    Returns:
+        dict: The arguments
+    """
+    line_width = None
+    if pd.get_option("display.expand_frame_repr"):
+        line_width = pd.get_option("display.width")
+    return {
+        "max_rows": pd.get_option("display.max_rows"),
+        "min_rows": pd.get_option("display.min_rows"),
+        "max_cols": pd.get_option("display.max_columns"),
+        "max_colwidth": pd.get_option("display.max_colwidth"),
+        "line_width": line_width,
+    }
+
+
+def format_frame(populated_table: PopulatedTable) -> str:
+    """
+    Formats the displayed frame of a populated table as pandas prints it.
+    When pandas would truncate the frame to its first and last rows, only those rows are
+    built, and the frame they make is printed with the number of rows of the whole frame.
+
+    Args:
+        populated_table (PopulatedTable): The populated table
+
+    Returns:
+        str: The frame, as str would format it
+    """
+    params = to_string_params()
+    max_rows, min_rows = params["max_rows"], params["min_rows"]
+    if populated_table.get_displayed_table() is not None or max_rows is None:
+        return str(populated_table.get_table_to_display())
+    total = populated_table.get_num_rows()
+    half = min(min_rows or max_rows, max_rows) // 2
+    if total <= max_rows or half == 0:
+        return str(populated_table.get_table_to_display())
+    head = populated_table.get_window(0, half)
+    tail = populated_table.get_window(-half, half)
+    # A row between the first and last rows makes pandas truncate the frame, and is left out
+    df = pd.concat([head, head.iloc[-1:], tail])
+    text = df.to_string(
+        **(params | {"max_rows": 2 * half, "min_rows": 2 * half}),
+        show_dimensions=False,
+    )
+    # The frame is truncated, so its dimensions are shown unless they never are
+    if pd.get_option("display.show_dimensions") is False:
+        return text
+    return f"{text}\n\n[{total} rows x {len(df.columns)} columns]"
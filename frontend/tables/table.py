@@ -6,6 +6,7 @@ from enum import Enum
 from typing import Any
 
 import numpy as np
+import pandas as pd
 
 from backend.populated_table import PopulatedTable
 from exp.exp import Exp
@@ -25,11 +26,13 @@ from frontend.tables.exceptions import (
     ColumnsNeedToBeKeysException,
     ColumnsNeedToBeInTableException,
     ColumnsNeedToBeValuesException,
+    TableNotProfiledException,
 )
 from frontend.tables.helpers.carry_keys_through_representation import (
     carry_keys_through_representation,
 )
 from frontend.tables.helpers.flatten import flatten
+from frontend.tables.helpers.format_frame import format_frame
 from representation.representation import (
     RepresentationStep,
     End,
@@ -215,7 +218,21 @@ class Table:
         self.intermediate_representation = intermediate_representation
         self.derivation = derivation
         self.schema = schema
-        self.populated_table: PopulatedTable | None = None
+        self._populated_table: PopulatedTable | None = None
+        self._pending = False
+
+    @property
+    def populated_table(self) -> PopulatedTable | None:
+        """
+        The result of executing the table. If execution has been deferred, it is run now.
+        """
+        self.collect()
+        return self._populated_table
+
+    @populated_table.setter
+    def populated_table(self, populated_table: PopulatedTable | None) -> None:
+        self._populated_table = populated_table
+        self._pending = False
 
     @classmethod
     def construct(cls, columns: list[Domain], schema: "Schema") -> Table:
@@ -270,7 +287,12 @@ class Table:
         )
         new_table.displayed_columns = copy.copy(table.displayed_columns)
         new_table.marker = table.marker
-        new_table.populated_table = table.populated_table.copy()
+        if table._pending:
+            # The new table is populated as the existing one would be, if its data is needed
+            new_table._pending = True
+        elif table._populated_table is not None:
+            # Populated tables are not modified once they are made, so the new table shares it
+            new_table.populated_table = table._populated_table
         return new_table
 
     def __get_existing_column(self, input: existing_column) -> ColumnNode:
@@ -312,7 +334,8 @@ class Table:
         self, with_new_representation: list[RepresentationStep] | None = None
     ) -> None:
         """
-        Executes the intermediate representation to populate the table
+        Computes the intermediate representation of the table and executes it to populate the table.
+        If the schema is lazy, execution is deferred until the result is observed.
 
         Args:
             with_new_representation: a list of new representation steps to append to the existing intermediate representation
@@ -332,9 +355,22 @@ class Table:
         self.intermediate_representation += [End(left, hids, right)]
         print(self.derivation)
 
-        self.populated_table, self.schema = self.schema.execute_query(
-            self.table_id, self.derived_from, self.intermediate_representation
-        )
+        self._pending = True
+        if not self.schema.lazy:
+            self.collect()
+
+    def collect(self) -> Table:
+        """
+        Runs the execution of the table, if it has been deferred
+
+        Returns:
+            The table, now populated
+        """
+        if self._pending:
+            self.populated_table, self.schema = self.schema.execute_query(
+                self.table_id, self.derived_from, self.intermediate_representation
+            )
+        return self
 
     def verify_columns(
         self, columns: list[ColumnNode], requirements: set[ColumnRequirements]
@@ -1188,29 +1224,117 @@ class Table:
         t.execute()
         return t
 
-    def __repr__(self):
-        left, _, right = self.get_columns_as_lists()
+    def __format(
+        self,
+        left: list[ColumnNode],
+        right: list[ColumnNode],
+        frame: str,
+        dropped_keys: int,
+        dropped_vals: int,
+    ) -> str:
         left = " ".join([l.get_name() for l in left])
         right = " ".join([r.get_name() for r in right])
-        dropped_keys = f"\n{self.populated_table.get_num_dropped_keys()} keys hidden"
-        dropped_vals = f"\n{self.populated_table.get_num_dropped_vals()} values hidden"
-        repr = (
-            f"[{left} || {right}]"
-            + "\n"
-            + str(self.populated_table.get_table_to_display())
+        repr = f"[{left} || {right}]" + "\n" + frame
+        if dropped_keys > 0:
+            repr += f"\n{dropped_keys} keys hidden"
+        if dropped_vals > 0:
+            repr += f"\n{dropped_vals} values hidden"
+        return repr
+
+    def __repr__(self):
+        left, _, right = self.get_columns_as_lists()
+        pt = self.populated_table
+        return (
+            self.__format(
+                left,
+                right,
+                format_frame(pt),
+                pt.get_num_dropped_keys(),
+                pt.get_num_dropped_vals(),
+            )
+            + "\n\n"
         )
-        if self.populated_table.get_num_dropped_keys() > 0:
-            repr += dropped_keys
-        if self.populated_table.get_num_dropped_vals() > 0:
-            repr += dropped_vals
-        return repr + "\n\n"
 
     def __str__(self):
         return self.__repr__()
 
-    def __getitem__(self, item):
-        col = self.derivation.find_column_with_name(item)
-        pt = self.populated_table.copy()
+    def window(self, offset: int, limit: int | None) -> pd.DataFrame:
+        """
+        Returns a window of the rows the table displays.
+        Only the rows of the window are built, unless the table has already displayed all of its rows
+
+        Args:
+            offset: the first row of the window, counted from the end if negative
+            limit: the most rows the window has, or None for every row from the first on
+
+        Returns:
+            The rows of the window, indexed by the keys
+        """
+        return self.populated_table.get_window(offset, limit)
+
+    def head(self, n: int = 5) -> pd.DataFrame:
+        """
+        Returns the first rows the table displays
+
+        Args:
+            n: the number of rows
+
+        Returns:
+            The rows, indexed by the keys
+        """
+        return self.window(0, n)
+
+    def tail(self, n: int = 5) -> pd.DataFrame:
+        """
+        Returns the last rows the table displays
+
+        Args:
+            n: the number of rows
+
+        Returns:
+            The rows, indexed by the keys
+        """
+        return self.window(-n, n) if n > 0 else self.window(0, 0)
+
+    def page(self, number: int, size: int = 20) -> pd.DataFrame:
+        """
+        Returns a page of the rows the table displays
+
+        Args:
+            number: the number of the page, from 0
+            size: the number of rows of each page
+
+        Returns:
+            The rows of the page, indexed by the keys
+        """
+        return self.window(number * size, size)
+
+    def profile(self):
+        """
+        Returns the measurements of the representation steps run to populate the table, with their
+        wall time, the rows and columns of their input and output, and the memory they added.
+        The profile is exported with to_json, or with to_folded for flame graphs
+
+        Returns:
+            The profile of the execution of the table
+        """
+        profile = self.populated_table.profile
+        if profile is None:
+            raise TableNotProfiledException()
+        return profile
+
+    def __column_repr(self, col: ColumnNode) -> str:
+        """
+        Displays a column of the table by the keys it depends on.
+        If the table has already displayed all of its rows by the same keys, the column is taken
+        from them; otherwise the column is displayed from the rows of the table.
+
+        Args:
+            col: the column
+
+        Returns:
+            The displayed column
+        """
         keys = col.get_strong_keys()
         nodes = [self.derivation.find_node_with_domains([k]) for k in keys]
 
@@ -1221,17 +1345,30 @@ class Table:
             left = nodes
             right = [col]
 
+        pt = self.populated_table
+        df = None
+        if all(n.is_key_column() for n in left):
+            df = pt.display_column(col.get_name(), [n.get_name() for n in left])
+        if df is not None:
+            displayed = pt.get_displayed_table()
+            dropped_keys = pt.get_num_dropped_keys() + len(displayed) - len(df)
+            return self.__format(
+                left, right, str(df), dropped_keys, pt.get_num_dropped_vals()
+            )
+
+        pt = pt.copy()
         pt.display(left, right, self.schema.backend)
-        left = " ".join([l.get_name() for l in left])
-        right = " ".join([r.get_name() for r in right])
-        dropped_keys = f"\n{pt.get_num_dropped_keys()} keys hidden"
-        dropped_vals = f"\n{pt.get_num_dropped_vals()} values hidden"
-        repr = f"[{left} || {right}]" + "\n" + str(pt.get_table_to_display())
-        if pt.get_num_dropped_keys() > 0:
-            repr += dropped_keys
-        if pt.get_num_dropped_vals() > 0:
-            repr += dropped_vals
-
-        if col is not None:
-            return Column(col, repr)
-        raise KeyError
+        return self.__format(
+            left,
+            right,
+            format_frame(pt),
+            pt.get_num_dropped_keys(),
+            pt.get_num_dropped_vals(),
+        )
+
+    def __getitem__(self, item):
+        col = self.derivation.find_column_with_name(item)
+        if col is None:
+            raise KeyError(item)
+        # Columns are mostly indexed to build expressions, so they are only displayed when printed
+        return Column(col, lambda: self.__column_repr(col))
@@ -0,0 +1,173 @@
+import expecttest
+import pandas as pd
+
+from frontend.tables.exceptions import TableNotProfiledException
+from frontend.tables.table import Table
+from schema.schema import Schema
+
+
+class TestTable(expecttest.TestCase):
+
+    def initialise(self, lazy):
+        trips_df = pd.DataFrame(
+            {
+                "trip_id": [1, 2, 3],
+                "hr": [7, 8, 8],
+                "destination": ["Zoo", "CBD", "Zoo"],
+            }
+        ).set_index("trip_id")
+        s = Schema(lazy=lazy)
+        trips = s.insert_dataframe(trips_df)
+        executions = []
+        execute_query = s.execute_query
+
+        def counting_execute_query(table_id, derived_from, derivation):
+            executions.append(table_id)
+            return execute_query(table_id, derived_from, derivation)
+
+        s.execute_query = counting_execute_query
+        return s, trips, executions
+
+    def test_lazyTable_executesOnlyWhenObserved(self):
+        s, trips, executions = self.initialise(lazy=True)
+        t = (
+            s.get(trip_id=trips["trip_id"])
+            .infer(["trip_id"], trips["hr"])
+            .infer(["trip_id"], trips["destination"])
+        )
+        self.assertEqual([], executions)
+        self.assertExpectedInline(
+            str(t),
+            """\
+[trip_id || hr destination]
+         hr destination
+trip_id                
+1         7         Zoo
+2         8         CBD
+3         8         Zoo
+
+""",
+        )
+        self.assertEqual([t.table_id], executions)
+        str(t)
+        self.assertEqual([t.table_id], executions)
+
+    def test_lazyTable_collectExecutesOnce(self):
+        s, trips, executions = self.initialise(lazy=True)
+        t = s.get(trip_id=trips["trip_id"]).infer(["trip_id"], trips["hr"])
+        self.assertIs(t, t.collect())
+        t.collect()
+        self.assertEqual([t.table_id], executions)
+
+    def test_lazyTable_matchesEagerTable(self):
+        results = []
+        for lazy in [True, False]:
+            s, trips, _ = self.initialise(lazy=lazy)
+            t = s.get(trip_id=trips["trip_id"]).infer(["trip_id"], trips["hr"])
+            t = t.mutate(late=t["hr"] > 7).hide("hr")
+            results += [str(t)]
+        self.assertEqual(results[0], results[1])
+
+    def test_eagerTable_executesEveryStep(self):
+        s, trips, executions = self.initialise(lazy=False)
+        s.get(trip_id=trips["trip_id"]).infer(["trip_id"], trips["hr"])
+        self.assertEqual(2, len(executions))
+
+    def test_window_showsRowsOfTheTable(self):
+        s, trips, _ = self.initialise(lazy=False)
+        t = s.get(trip_id=trips["trip_id"]).infer(["trip_id"], trips["destination"])
+        self.assertExpectedInline(
+            str(t.head(2)),
+            """\
+        destination
+trip_id            
+1               Zoo
+2               CBD""",
+        )
+        self.assertExpectedInline(
+            str(t.tail(1)),
+            """\
+        destination
+trip_id            
+3               Zoo""",
+        )
+        self.assertExpectedInline(
+            str(t.page(1, size=2)),
+            """\
+        destination
+trip_id            
+3               Zoo""",
+        )
+
+    def test_repr_ofLongTable_buildsOnlyTheRowsItShows(self):
+        s = Schema()
+        trips = s.insert_dataframe(
+            pd.DataFrame(
+                {"trip_id": range(100), "hr": [i % 24 for i in range(100)]}
+            ).set_index("trip_id")
+        )
+        t = s.get(trip_id=trips["trip_id"]).infer(["trip_id"], trips["hr"])
+        repr = str(t)
+        self.assertIsNone(t.populated_table.get_displayed_table())
+        self.assertEqual(
+            f"[trip_id || hr]\n{t.populated_table.get_table_to_display()}\n\n", repr
+        )
+
+    def test_repr_ofLongTable_followsDisplayOptions(self):
+        s = Schema()
+        trips = s.insert_dataframe(
+            pd.DataFrame(
+                {"trip_id": range(100), "hr": [i % 24 for i in range(100)]}
+            ).set_index("trip_id")
+        )
+        options = [
+            ("display.show_dimensions", False),
+            ("display.show_dimensions", True),
+            ("display.max_rows", 10),
+            ("display.min_rows", 4),
+        ]
+        for option, value in options:
+            with pd.option_context(option, value):
+                t = s.get(trip_id=trips["trip_id"]).infer(["trip_id"], trips["hr"])
+                repr = str(t)
+                self.assertIsNone(t.populated_table.get_displayed_table())
+                self.assertEqual(
+                    f"[trip_id || hr]\n{t.populated_table.get_table_to_display()}\n\n",
+                    repr,
+                )
+
+    def test_derivedTable_sharesRawTableOfItsParent(self):
+        s, trips, _ = self.initialise(lazy=False)
+        t = s.get(trip_id=trips["trip_id"]).infer(["trip_id"], trips["hr"])
+        raw_table = t.populated_table.raw_table
+        self.assertIs(raw_table, Table.create_from_table(t).populated_table.raw_table)
+        self.assertIs(raw_table, t.populated_table.copy().raw_table)
+
+    def test_profile_measuresEveryStep(self):
+        trips_df = pd.DataFrame({"trip_id": [1, 2, 3], "hr": [7, 8, 8]})
+        s = Schema(profile=True)
+        trips = s.insert_dataframe(trips_df.set_index("trip_id"))
+        t = s.get(trip_id=trips["trip_id"]).infer(["trip_id"], trips["hr"])
+        profile = t.profile().to_frame()
+        self.assertExpectedInline(
+            str(profile[["name", "cached", "rows_in", "rows_out", "columns_out"]]),
+            """\
+  name  cached  rows_in  rows_out  columns_out
+0  GET    True     <NA>      <NA>         <NA>
+1  GET    True     <NA>      <NA>         <NA>
+2  CAL   False        3         3            1
+3  STT   False        3         3            2
+4  TRV   False        3         3            2
+5  ENT   False        3         3            2
+6  RET   False        3         3            2
+7  MER   False        3         3            2""",
+        )
+        ran = [f"{i} {s['name']}" for i, s in profile.iterrows() if not s.cached]
+        folded = [l.split(";")[1] for l in t.profile().to_folded().split("\n")]
+        self.assertEqual(ran, [f.rsplit(" ", 1)[0] for f in folded])
+
+    def test_profile_ofTableThatWasNotProfiled_raises(self):
+        s, trips, _ = self.initialise(lazy=False)
+        t = s.get(trip_id=trips["trip_id"])
+        with self.assertRaises(TableNotProfiledException):
+            t.profile()
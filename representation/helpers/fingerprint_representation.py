@@ -0,0 +1,82 @@
+import hashlib
+from enum import Enum
+
+from representation.domain import Domain
+from representation.representation import RepresentationStep
+from schema.edge import SchemaEdge
+from schema.node import AtomicNode, ProductNode, SchemaClass
+
+
+def fingerprint(obj) -> tuple | str | int | float | bool | None:
+    """
+    Returns a structural fingerprint of an object appearing in a representation step.
+    The fingerprint only contains primitives, so it can be compared and hashed safely,
+    and two objects have the same fingerprint iff they describe the same computation.
+
+    Args:
+        obj: The object to fingerprint
+
+    Returns:
+        The fingerprint of the object
+    """
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, Enum):
+        return type(obj).__name__, obj.name
+    if isinstance(obj, AtomicNode):
+        return "AtomicNode", str(obj.id)
+    if isinstance(obj, SchemaClass):
+        return "SchemaClass", obj.name
+    if isinstance(obj, ProductNode):
+        return "ProductNode", tuple(fingerprint(c) for c in obj.constituents)
+    if isinstance(obj, Domain):
+        return "Domain", obj.name, fingerprint(obj.node)
+    if isinstance(obj, SchemaEdge):
+        return (
+            type(obj).__name__,
+            fingerprint(obj.from_node),
+            fingerprint(obj.to_node),
+            fingerprint(obj.cardinality),
+        )
+    if isinstance(obj, (list, tuple)):
+        return tuple(fingerprint(o) for o in obj)
+    if isinstance(obj, (set, frozenset)):
+        return tuple(sorted((fingerprint(o) for o in obj), key=repr))
+    if isinstance(obj, dict):
+        return tuple(
+            sorted(((fingerprint(k), fingerprint(v)) for k, v in obj.items()), key=repr)
+        )
+    return type(obj).__name__, fingerprint(vars(obj))
+
+
+def fingerprint_step(step: RepresentationStep) -> str:
+    """
+    Returns a deterministic string describing a representation step
+
+    Args:
+        step (RepresentationStep): The step to fingerprint
+
+    Returns:
+        str: The fingerprint of the step
+    """
+    return repr(fingerprint(step))
+
+
+def fingerprint_prefixes(representation: list[RepresentationStep]) -> list[str]:
+    """
+    Returns a digest for every prefix of a representation.
+    The i-th digest identifies the first i + 1 steps, so two representations
+    share a prefix of length i + 1 iff their i-th digests are equal.
+
+    Args:
+        representation (list[RepresentationStep]): The representation
+
+    Returns:
+        list[str]: The digest of each prefix of the representation
+    """
+    digests = []
+    digest = hashlib.sha1()
+    for step in representation:
+        digest.update(fingerprint_step(step).encode())
+        digests += [digest.copy().hexdigest()]
+    return digests
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from schema.exceptions import ChunksHaveDifferentColumnsException
+
+# pandas hashes with a 16 character key, and the first hash uses its default key
+SECOND_HASH_KEY = "chunk loader key"
+
+
+def comparable(column: pd.Series) -> pd.Series:
+    """
+    Replaces the integral values of a float column by the integers they equal, so that they
+    hash the same as in a chunk where the column has no missing values and is read as integers
+
+    Args:
+        column (pd.Series): The column
+
+    Returns:
+        pd.Series: The column to hash in place of the given one
+    """
+    if column.dtype != np.float64:
+        return column
+    values = column.to_numpy()
+    with np.errstate(invalid="ignore"):
+        integral = (np.trunc(values) == values) & (np.abs(values) < 2**63)
+    bits = values.view(np.uint64).copy()
+    bits[integral] = values[integral].astype(np.int64).view(np.uint64)
+    return pd.Series(bits, copy=False)
+
+
+class RowHashes:
+    """
+    The hashes of the distinct rows seen so far.
+    Each row is hashed twice with different keys, and the two 64 bit hashes are compared
+    together, so rows from later chunks can be looked up without keeping the earlier rows.
+    The hashes are kept in sorted runs of decreasing length. A new run is merged into the
+    runs before it that are no longer than it, so every hash is merged a logarithmic number
+    of times over a load, and there are logarithmically many runs to look hashes up in.
+    """
+
+    def __init__(self):
+        """Creates a new RowHashes, where no row has been seen"""
+        self.runs: list[np.ndarray] = []
+
+    @classmethod
+    def of(cls, df: pd.DataFrame | pd.Series) -> np.ndarray:
+        """
+        Hashes the rows of a dataframe, or the values of a series
+
+        Args:
+            df (pd.DataFrame | pd.Series): The dataframe or series
+
+        Returns:
+            np.ndarray: The 128 bit hash of each row
+        """
+        if isinstance(df, pd.Series):
+            df = comparable(df)
+        else:
+            df = pd.DataFrame(
+                {i: comparable(df.iloc[:, i]) for i in range(len(df.columns))}
+            )
+        first = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        second = pd.util.hash_pandas_object(
+            df, index=False, hash_key=SECOND_HASH_KEY
+        ).to_numpy()
+        return np.ascontiguousarray(np.stack([first, second], axis=1)).view("V16")[:, 0]
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Looks up the hashes of some rows
+
+        Args:
+            hashes (np.ndarray): The hashes
+
+        Returns:
+            np.ndarray: For each hash, whether a row with it has been seen
+        """
+        seen = np.zeros(len(hashes), dtype=bool)
+        for run in self.runs:
+            positions = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            seen |= run[positions] == hashes
+        return seen
+
+    def add(self, hashes: np.ndarray) -> None:
+        """
+        Records that rows with the given hashes, which have not been seen before, have been seen
+
+        Args:
+            hashes (np.ndarray): The hashes
+        """
+        if len(hashes) == 0:
+            return
+        run = np.sort(hashes)
+        while len(self.runs) > 0 and len(self.runs[-1]) <= len(run):
+            previous = self.runs.pop()
+            run = np.insert(previous, np.searchsorted(previous, run), run)
+        self.runs.append(run)
+
+    def __len__(self) -> int:
+        return sum(len(run) for run in self.runs)
+
+
+class ChunkLoader:
+    """
+    Computes the domains of the columns of a table, and the relations between its keys
+    and each of its other columns, from chunks of its rows.
+    Only the rows that are added to a domain or a relation are kept from each chunk, and the
+    keys and values that have been seen are recorded by their hashes, so that the uniqueness
+    of the keys, and the distinctness of the values in each domain, is checked chunk by chunk.
+    Rows are numbered across chunks, as they are in the table.
+    """
+
+    def __init__(self, keys: list[str]):
+        """
+        Creates a new ChunkLoader
+
+        Args:
+            keys (list[str]): The columns that uniquely identify the rows of the table
+        """
+        self.keys = keys
+        self.columns: list[str] | None = None
+        self.rows = 0
+        self.key_hashes = RowHashes()
+        self.value_hashes: dict[str, RowHashes] = {}
+        self.domains: dict[str, list[pd.DataFrame]] = {}
+        self.relations: dict[str, list[pd.DataFrame]] = {}
+
+    def add(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Adds a chunk of rows
+
+        Args:
+            chunk (pd.DataFrame): The rows, with the keys among the columns
+
+        Returns:
+            pd.DataFrame: The keys that occur more than once, either in the chunk or in an earlier chunk
+        """
+        if self.columns is None:
+            self.columns = chunk.columns.to_list()
+            for name in self.columns:
+                self.value_hashes[name] = RowHashes()
+                self.domains[name] = []
+                if name not in self.keys:
+                    self.relations[name] = []
+        if chunk.columns.to_list() != self.columns:
+            raise ChunksHaveDifferentColumnsException(
+                self.columns, chunk.columns.to_list()
+            )
+        chunk = chunk.set_axis(
+            pd.RangeIndex(self.rows, self.rows + len(chunk)), copy=False
+        )
+        self.rows += len(chunk)
+
+        keys = chunk[self.keys]
+        hashes = RowHashes.of(keys)
+        duplicated = keys.duplicated().to_numpy() | self.key_hashes.contains(hashes)
+        if duplicated.any():
+            return keys[duplicated].drop_duplicates()
+        self.key_hashes.add(hashes)
+
+        keys_present = keys.notna().all(axis=1).to_numpy()
+        for name in self.columns:
+            column = chunk[name]
+            present = column.notna().to_numpy()
+            hashes = RowHashes.of(column)
+            mask = present & ~column.duplicated().to_numpy()
+            mask[mask] = ~self.value_hashes[name].contains(hashes[mask])
+            self.value_hashes[name].add(hashes[mask])
+            self.domains[name] += [column[mask].to_frame()]
+            if name in self.relations:
+                self.relations[name] += [
+                    chunk.loc[keys_present & present, self.keys + [name]]
+                ]
+        return keys.iloc[:0]
+
+    def domain(self, name: str) -> pd.DataFrame:
+        """
+        Collects the domain of a column, releasing the chunks it is collected from
+
+        Args:
+            name (str): The column
+
+        Returns:
+            pd.DataFrame: The distinct values in the column, at the first row they occur in
+        """
+        return collect(self.domains.pop(name))
+
+    def relation(self, name: str) -> pd.DataFrame:
+        """
+        Collects the relation between the keys and a column, releasing the chunks it is collected from
+
+        Args:
+            name (str): The column, which must not be a key
+
+        Returns:
+            pd.DataFrame: The keys and the value of every row where none of them are missing
+        """
+        return collect(self.relations.pop(name))
+
+
+def collect(pieces: list[pd.DataFrame]) -> pd.DataFrame:
+    if len(pieces) == 1:
+        return pieces[0]
+    return pd.concat(pieces)
@@ -34,6 +34,30 @@ class SchemaEdgeList(Iterable):
             raise EdgeAlreadyExistsException(edge)
         return SchemaEdgeList(frozenset(edge_list).union([edge]))
 
+    @classmethod
+    def add_edges(
+        cls, edge_list: SchemaEdgeList, edges: list[SchemaEdge]
+    ) -> SchemaEdgeList:
+        """
+        Adds several edges to an edge list at once
+
+        Args:
+            edge_list (SchemaEdgeList): The edge list
+            edges (list[SchemaEdge]): The edges to be added
+
+        Returns:
+            SchemaEdgeList: The new edge list
+
+        Raises:
+            EdgeAlreadyExistsException: If an edge already exists in the edge list, or is added twice
+        """
+        added = set()
+        for edge in edges:
+            if edge in edge_list or edge in added:
+                raise EdgeAlreadyExistsException(edge)
+            added.add(edge)
+        return SchemaEdgeList(frozenset(edge_list).union(added))
+
     @classmethod
     def replace_edge(
         cls, edge_list: SchemaEdgeList, edge: SchemaEdge
@@ -113,6 +113,18 @@ class CannotInsertDataFrameIfSchemaBackedBySQLBackendException(Exception):
         )
 
 
+class CannotSaveSchemaIfBackedByNonPandasBackendException(Exception):
+    def __init__(self):
+        super().__init__("Cannot save schema if it is backed by non-pandas backend")
+
+
+class CannotInsertSQLTableIfSchemaNotBackedBySQLBackendException(Exception):
+    def __init__(self):
+        super().__init__(
+            "Cannot insert SQL table if schema is not backed by SQL backend"
+        )
+
+
 class SchemaClassMustBeSpecifiedException(Exception):
     def __init__(self):
         super().__init__(
@@ -135,3 +147,10 @@ class CannotBlendNodesWithDifferentTypeException(Exception):
 class ColumnMustBeAnAtomicNodeOrClassException(Exception):
     def __init__(self, name):
         super().__init__(f"Column {name} must be an atomic node or class")
+
+
+class ChunksHaveDifferentColumnsException(Exception):
+    def __init__(self, columns, chunk_columns):
+        super().__init__(
+            f"Every chunk must have the same columns. Expected {columns} but found {chunk_columns}"
+        )
@@ -18,6 +18,8 @@ from schema.exceptions import (
 )
 from schema.helpers.is_sublist import is_sublist
 from schema.node import SchemaNode, AtomicNode, SchemaClass
+from schema.path_index import PathIndex
+from schema.search_side import SearchSide, Step
 from schema.union_find import UnionFind
 
 
@@ -42,13 +44,27 @@ def is_relational(cardinality):
 class SchemaGraph:
     """
     A graph of schema nodes and edges. The graph is undirected and unweighted.
+    Shortest paths and neighbours are memoized in a path index. Adding an edge or blending nodes
+    drops the entries that depend on the nodes it affects, while adding a node drops none,
+    as no search explores a node that has no edges.
+    Paths are found by a breadth first search from the start of each leg, or, for a bidirectional
+    graph, by a search from both ends of the leg that meets in the middle.
     """
 
-    def __init__(self):
-        """Initialises an empty schema graph."""
+    def __init__(self, bidirectional: bool = False):
+        """Initialises an empty schema graph.
+
+        Args:
+            bidirectional (bool): If True, shortest paths are searched for from both ends
+        """
+        self.bidirectional = bidirectional
         self.adjacencyList: dict[SchemaNode, SchemaEdgeList] = {}
         self.schema_nodes: list[SchemaNode] = []
         self.equivalence_class: UnionFind[SchemaNode] = UnionFind.initialise()
+        self.path_index: PathIndex = PathIndex()
+        self.nodes_containing: dict[AtomicNode | SchemaClass, set[SchemaNode]] = {}
+        self.equivalent_nodes: dict[SchemaNode, list[SchemaNode]] = {}
+        self.equivalent_nodes_version: int = 0
 
     def add_node(self, node: SchemaNode) -> None:
         """Idempotent add of a node to the graph.
@@ -59,7 +75,7 @@ class SchemaGraph:
         Returns:
             None
         """
-        if node not in frozenset(self.schema_nodes):
+        if node not in self.equivalence_class:
             self.schema_nodes += [node]
             self.equivalence_class = UnionFind.add_singleton(
                 self.equivalence_class, node
@@ -74,7 +90,7 @@ class SchemaGraph:
         Returns:
             None
         """
-        if clss not in frozenset(self.schema_nodes):
+        if clss not in self.equivalence_class:
             self.schema_nodes += [clss]
             self.equivalence_class = UnionFind.add_singleton(
                 self.equivalence_class, clss
@@ -90,8 +106,9 @@ class SchemaGraph:
         Returns:
             None
         """
-        nodeset = frozenset(self.schema_nodes)
-        new_nodes = list(filter(lambda n: n not in nodeset, nodes))
+        new_nodes = list(
+            dict.fromkeys(n for n in nodes if n not in self.equivalence_class)
+        )
         self.schema_nodes += new_nodes
         self.equivalence_class = UnionFind.add_singletons(
             self.equivalence_class, new_nodes
@@ -110,6 +127,10 @@ class SchemaGraph:
         """
         self.check_nodes_in_graph([node1, node2])
         self.equivalence_class = UnionFind.union(self.equivalence_class, node1, node2)
+        blended = self.equivalence_class.get_equivalence_class(node1)
+        self.path_index.invalidate(
+            lambda n: any(c in blended for c in SchemaNode.get_constituents(n))
+        )
 
     def check_node_in_graph(self, n: SchemaNode) -> None:
         """
@@ -126,7 +147,7 @@ class SchemaGraph:
         """
         ns = SchemaNode.get_constituents(n)
         for n in ns:
-            if n not in self.schema_nodes:
+            if n not in self.equivalence_class:
                 raise NodeNotInSchemaGraphException(n)
 
     def check_node_not_in_graph(self, n: SchemaNode) -> None:
@@ -144,7 +165,7 @@ class SchemaGraph:
         """
         ns = SchemaNode.get_constituents(n)
         for n in ns:
-            if n in self.schema_nodes:
+            if n in self.equivalence_class:
                 raise NodeAlreadyInSchemaGraphException(n)
 
     def are_nodes_equal(self, node1: SchemaNode, node2: SchemaNode) -> bool:
@@ -172,11 +193,31 @@ class SchemaGraph:
         Returns:
             None
         """
-        if not (frozenset(nodes) <= frozenset(self.schema_nodes)):
-            not_in_graph = frozenset(nodes).difference(frozenset(self.schema_nodes))
-            raise AllNodesInClusterMustAlreadyBeInGraphException(not_in_graph)
-        for node in nodes:
-            self.add_edge(key_node, node, Cardinality.MANY_TO_ONE)
+        self.add_clusters([(nodes, key_node)])
+
+    def add_clusters(self, clusters: list[tuple[list[SchemaNode], SchemaNode]]) -> None:
+        """
+        Adds several star-shaped clusters of nodes to the graph at once, as add_cluster does for each
+
+        Args:
+            clusters (list[tuple[list[SchemaNode], SchemaNode]]): The nodes and the key node of each cluster
+
+        Returns:
+            None
+        """
+        for nodes, _ in clusters:
+            not_in_graph = frozenset(
+                n for n in nodes if n not in self.equivalence_class
+            )
+            if len(not_in_graph) > 0:
+                raise AllNodesInClusterMustAlreadyBeInGraphException(not_in_graph)
+        self.add_edges(
+            [
+                SchemaEdge(key_node, node, Cardinality.MANY_TO_ONE)
+                for nodes, key_node in clusters
+                for node in nodes
+            ]
+        )
 
     def find_all_equivalent_nodes(self, node: SchemaNode) -> list[SchemaNode]:
         """
@@ -188,6 +229,15 @@ class SchemaGraph:
         Returns:
             set[SchemaNode]: A list of all nodes in the graph that are equivalent to the given node
         """
+        # The expansions are only valid for the equivalence classes they were computed from
+        if self.equivalent_nodes_version != self.equivalence_class.version:
+            self.equivalent_nodes = {}
+            self.equivalent_nodes_version = self.equivalence_class.version
+        if node not in self.equivalent_nodes:
+            self.equivalent_nodes[node] = self.expand_equivalent_nodes(node)
+        return list(self.equivalent_nodes[node])
+
+    def expand_equivalent_nodes(self, node: SchemaNode) -> list[SchemaNode]:
         constituents = SchemaNode.get_constituents(node)
         # if node atomic
         if len(constituents) == 1:
@@ -254,23 +304,98 @@ class SchemaGraph:
         Raises:
             NodeNotInSchemaGraphException: If the from_node or to_node are not in the graph
         """
-        self.check_nodes_in_graph([from_node, to_node])
+        self.add_edges([SchemaEdge(from_node, to_node, cardinality)])
 
-        if from_node == to_node:
-            return
-        if from_node not in self.adjacencyList:
-            self.adjacencyList[from_node] = SchemaEdgeList()
-        if to_node not in self.adjacencyList:
-            self.adjacencyList[to_node] = SchemaEdgeList()
+    def add_edges(self, edges: list[SchemaEdge]) -> None:
+        """
+        Adds several edges to the graph at once, as add_edge does for each.
+        The path index is only invalidated once, and the edge list of each node is only rebuilt once.
 
-        edge = SchemaEdge(from_node, to_node, cardinality)
+        Args:
+            edges (list[SchemaEdge]): The edges
 
-        self.adjacencyList[from_node] = SchemaEdgeList.add_edge(
-            self.adjacencyList[from_node], edge
+        Returns:
+            None
+
+        Raises:
+            NodeNotInSchemaGraphException: If the from_node or to_node of an edge are not in the graph
+        """
+        self.check_nodes_in_graph(
+            list(dict.fromkeys(n for e in edges for n in [e.from_node, e.to_node]))
         )
-        self.adjacencyList[to_node] = SchemaEdgeList.add_edge(
-            self.adjacencyList[to_node], SchemaEdge.invert(edge)
+        edges = [e for e in edges if e.from_node != e.to_node]
+        if len(edges) == 0:
+            return
+        endpoints = {n for e in edges for n in [e.from_node, e.to_node]}
+        new_nodes = list(
+            dict.fromkeys(
+                n
+                for e in edges
+                for n in [e.from_node, e.to_node]
+                if n not in self.adjacencyList
+            )
         )
+        new_keys = [SchemaNode.get_constituents(n) for n in new_nodes]
+        # Nodes that are sublists of a new key gain it as a neighbour
+        self.path_index.invalidate(
+            lambda n: n in endpoints
+            or any(is_sublist(SchemaNode.get_constituents(n), k) for k in new_keys)
+        )
+        for node in new_nodes:
+            self.adjacencyList[node] = SchemaEdgeList()
+            self.index_constituents(node)
+
+        added = {}
+        for edge in edges:
+            added.setdefault(edge.from_node, []).append(edge)
+            added.setdefault(edge.to_node, []).append(SchemaEdge.invert(edge))
+        for node, node_edges in added.items():
+            self.adjacencyList[node] = SchemaEdgeList.add_edges(
+                self.adjacencyList[node], node_edges
+            )
+
+    def index_constituents(self, node: SchemaNode) -> None:
+        """
+        Records that a node in the adjacency list contains each of its constituents
+
+        Args:
+            node (SchemaNode): The node
+
+        Returns:
+            None
+        """
+        for c in SchemaNode.get_constituents(node):
+            if c not in self.nodes_containing:
+                self.nodes_containing[c] = set()
+            self.nodes_containing[c].add(node)
+
+    def find_nodes_containing(self, node: SchemaNode) -> set[SchemaNode]:
+        """
+        Finds the nodes in the adjacency list that the constituents of a node are a sublist of.
+        The candidates are the nodes that contain every constituent, so only they are checked.
+
+        Args:
+            node (SchemaNode): The node
+
+        Returns:
+            set[SchemaNode]: The nodes in the adjacency list that the node is a sublist of
+        """
+        constituents = SchemaNode.get_constituents(node)
+        if len(constituents) == 0:
+            return set(self.adjacencyList.keys())
+        postings = sorted(
+            [self.nodes_containing.get(c, set()) for c in set(constituents)], key=len
+        )
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if len(candidates) == 0:
+                break
+            candidates &= posting
+        return {
+            key
+            for key in candidates
+            if is_sublist(constituents, SchemaNode.get_constituents(key))
+        }
 
     def find_edge(
         self, from_node: SchemaNode, to_node: SchemaNode
@@ -305,6 +430,13 @@ class SchemaGraph:
         Returns:
             set[tuple[SchemaNode, Cardinality]]: A set of tuples, where each tuple is of the form (neighbour, cardinality)
         """
+        if node not in self.path_index.neighbours:
+            self.path_index.neighbours[node] = self.find_neighbours_of_node(node)
+        return set(self.path_index.neighbours[node])
+
+    def find_neighbours_of_node(
+        self, node: SchemaNode
+    ) -> set[tuple[SchemaNode, Cardinality]]:
         neighbours = set()
         # if the node is in the adjacency list, then do a lookup
         if node in self.adjacencyList.keys():
@@ -320,11 +452,8 @@ class SchemaGraph:
                 ]
             )
         # if I can do an expansion / cross product
-        for key in self.adjacencyList.keys():
-            if is_sublist(
-                SchemaNode.get_constituents(node), SchemaNode.get_constituents(key)
-            ):
-                neighbours.add((key, Cardinality.ONE_TO_MANY))
+        for key in self.find_nodes_containing(node):
+            neighbours.add((key, Cardinality.ONE_TO_MANY))
         return neighbours
 
     def find_shortest_path(
@@ -355,27 +484,40 @@ class SchemaGraph:
         else:
             waypoints = via
         self.check_nodes_in_graph([node1, node2] + waypoints)
+        cached = self.path_index.get(node1, node2, waypoints)
+        if cached is not None:
+            return cached
         current_leg_start = node1
         visited = {node1}
+        explored = set()
         edge_path = []
         for i in range(0, len(waypoints) + 1):
             if i >= len(waypoints):
                 current_leg_end = node2
             else:
                 current_leg_end = waypoints[i]
-            nodes, edges = self.find_all_shortest_paths_between_nodes(
-                current_leg_start, current_leg_end
-            )
+            if self.bidirectional:
+                search = self.find_all_shortest_paths_bidirectionally
+            else:
+                search = self.find_all_shortest_paths_between_nodes
+            nodes, edges = search(current_leg_start, current_leg_end, explored)
             if len(set(nodes).intersection(visited)) > 0:
                 raise CycleDetectedInPathException()
             else:
                 visited = visited.union(set(nodes))
                 edge_path += edges
                 current_leg_start = current_leg_end
-        return compute_cardinality_of_path(edge_path), edge_path
+        cardinality = compute_cardinality_of_path(edge_path)
+        self.path_index.put(
+            node1, node2, waypoints, cardinality, edge_path, frozenset(explored)
+        )
+        return cardinality, edge_path
 
     def find_all_shortest_paths_between_nodes(
-        self, node1: SchemaNode, node2: SchemaNode
+        self,
+        node1: SchemaNode,
+        node2: SchemaNode,
+        explored: set[SchemaNode] | None = None,
     ) -> (list[SchemaNode], list[SchemaEdge]):
         """
         Finds the shortest path between two nodes in the graph
@@ -383,6 +525,7 @@ class SchemaGraph:
         Args:
             node1 (SchemaNode): The first node
             node2 (SchemaNode): The second node
+            explored (set[SchemaNode] | None): If given, the nodes whose neighbours are looked up are added to it
 
         Returns:
             list[SchemaNode]: A list of nodes in the shortest path
@@ -414,16 +557,14 @@ class SchemaGraph:
                 break
 
             equivs = self.find_all_equivalent_nodes(u)
-            visited = visited.union(equivs)
-            # if we see the goal, then we have found a shortest path
-            for e in equivs:
-                if e == node2:
-                    if e != u:
-                        c = count + 1
-                    else:
-                        c = count
-                    if 0 < shortest_path_length < c:
-                        continue
+            visited.update(equivs)
+            # if we see the goal, then we have found a shortest path.
+            # The goal is one of the equivalent nodes exactly when it is equivalent
+            # constituent by constituent, which is checked without scanning them
+            if SchemaNode.is_equivalent(u, node2, self.equivalence_class):
+                e = node2
+                c = count + 1 if e != u else count
+                if not 0 < shortest_path_length < c:
                     if 0 < c < shortest_path_length:
                         shortest_paths = []
                     shortest_path_length = c
@@ -461,6 +602,9 @@ class SchemaGraph:
                                 )
                             )
 
+        if explored is not None:
+            explored.update(visited)
+
         if len(shortest_paths) > 1:
             raise MultipleShortestPathsBetweenNodesException(
                 node1, node2, shortest_paths
@@ -471,6 +615,220 @@ class SchemaGraph:
 
         return nodes[0], shortest_paths[0]
 
+    def find_successors_of_node(self, u: SchemaNode, goal: SchemaNode) -> list[Step]:
+        """
+        Finds the steps the breadth first search takes from a node: to a neighbour of the node,
+        to a neighbour of an equivalent node, or to an equivalent goal
+
+        Args:
+            u (SchemaNode): The node
+            goal (SchemaNode): The goal of the search
+
+        Returns:
+            list[Step]: The steps from the node
+        """
+        steps = []
+        if u != goal and SchemaNode.is_equivalent(u, goal, self.equivalence_class):
+            steps += [(goal, [SchemaEquality(u, goal)], [goal])]
+        for e in self.find_all_equivalent_nodes(u):
+            for n, c in self.get_all_neighbours_of_node(e):
+                if SchemaNode.is_equivalent(u, n, self.equivalence_class):
+                    continue
+                if e == u:
+                    steps += [(n, [SchemaEdge(e, n, c)], [n])]
+                else:
+                    steps += [(n, [SchemaEquality(u, e), SchemaEdge(e, n, c)], [e, n])]
+        return steps
+
+    def find_nodes_in_classes(
+        self, constituents: list[AtomicNode | SchemaClass]
+    ) -> set[SchemaNode]:
+        """
+        Finds the nodes in the adjacency list with a constituent equivalent to one of the given constituents
+
+        Args:
+            constituents (list[AtomicNode | SchemaClass]): The constituents
+
+        Returns:
+            set[SchemaNode]: The nodes
+        """
+        leaders = {self.equivalence_class.find_leader(c) for c in constituents}
+        nodes = set()
+        for leader in leaders:
+            for m in self.equivalence_class.get_equivalence_class(leader):
+                nodes |= self.nodes_containing.get(m, set())
+        return nodes
+
+    def find_predecessors_of_node(
+        self, v: SchemaNode, start: SchemaNode, goal: SchemaNode
+    ) -> list[Step]:
+        """
+        Finds the steps of the breadth first search that end at a node.
+        The search only takes steps from its start and from nodes in the adjacency list,
+        as every step ends at one of them.
+
+        Args:
+            v (SchemaNode): The node
+            start (SchemaNode): The start of the search
+            goal (SchemaNode): The goal of the search
+
+        Returns:
+            list[Step]: The steps to the node, each given from the node it starts at
+        """
+        steps = []
+        if v == goal:
+            for u in self.find_nodes_in_classes(SchemaNode.get_constituents(goal)) | {
+                start
+            }:
+                if u != goal and SchemaNode.is_equivalent(
+                    u, goal, self.equivalence_class
+                ):
+                    steps += [(u, [SchemaEquality(u, goal)], [goal])]
+        if v not in self.adjacencyList:
+            return steps
+        # Every node e that has v as a neighbour, with the cardinality from e to v
+        sources = set()
+        for edge in self.adjacencyList[v]:
+            if edge.from_node != v:
+                sources.add((edge.from_node, edge.cardinality))
+            else:
+                sources.add((edge.to_node, reverse_cardinality(edge.cardinality)))
+        constituents = SchemaNode.get_constituents(v)
+        leaders = [self.equivalence_class.find_leader(c) for c in constituents]
+        for u in self.find_nodes_in_classes(constituents) | {start}:
+            u_leaders = [
+                self.equivalence_class.find_leader(c)
+                for c in SchemaNode.get_constituents(u)
+            ]
+            for indices in itertools.combinations(range(len(leaders)), len(u_leaders)):
+                if [leaders[i] for i in indices] == u_leaders:
+                    e = SchemaNode.product([constituents[i] for i in indices])
+                    sources.add((e, Cardinality.ONE_TO_MANY))
+        for e, c in sources:
+            candidates = self.find_nodes_in_classes(SchemaNode.get_constituents(e))
+            for u in candidates | {start}:
+                if not SchemaNode.is_equivalent(u, e, self.equivalence_class):
+                    continue
+                if SchemaNode.is_equivalent(u, v, self.equivalence_class):
+                    continue
+                if e == u:
+                    steps += [(u, [SchemaEdge(e, v, c)], [v])]
+                else:
+                    steps += [(u, [SchemaEquality(u, e), SchemaEdge(e, v, c)], [e, v])]
+        return steps
+
+    def find_all_shortest_paths_bidirectionally(
+        self,
+        node1: SchemaNode,
+        node2: SchemaNode,
+        explored: set[SchemaNode] | None = None,
+    ) -> (list[SchemaNode], list[SchemaEdge]):
+        """
+        Finds the shortest path between two nodes in the graph, taking the same steps as the
+        breadth first search, but searching from both nodes until the two searches meet.
+        The side with the fewest nodes to expand is expanded next. Steps through an equivalent
+        node are two edges long, so the search stops once every path shorter than the
+        shortest one found so far must pass through a node whose distance from both ends is final.
+
+        Args:
+            node1 (SchemaNode): The first node
+            node2 (SchemaNode): The second node
+            explored (set[SchemaNode] | None): If given, the nodes the search depends on are added to it
+
+        Returns:
+            list[SchemaNode]: A list of nodes in the shortest path
+            list[SchemaEdge]: A list of edges in the shortest path
+
+        Raises:
+            NoShortestPathBetweenNodesException: If there is no shortest path between the nodes
+            MultipleShortestPathsBetweenNodesException: If there are multiple shortest paths between the nodes
+        """
+        forward = SearchSide(node1)
+        backward = SearchSide(node2)
+        depends_on = {node1, node2}
+        shortest_path_length = None
+        if node1 == node2:
+            shortest_path_length = 0
+
+        while True:
+            levels = [forward.next_level(), backward.next_level()]
+            if None in levels:
+                break
+            if (
+                shortest_path_length is not None
+                and forward.expanded + backward.expanded + 1 >= shortest_path_length
+            ):
+                break
+            forward_size = len(forward.levels[levels[0]])
+            backward_size = len(backward.levels[levels[1]])
+            if forward_size <= backward_size:
+                for u in forward.pop_level():
+                    depends_on.update(self.find_all_equivalent_nodes(u))
+                    for n, edges, nodes in self.find_successors_of_node(u, node2):
+                        forward.label(n, levels[0] + len(edges), (u, edges, nodes))
+                        if n in backward.distances:
+                            length = forward.distances[n] + backward.distances[n]
+                            if (
+                                shortest_path_length is None
+                                or length < shortest_path_length
+                            ):
+                                shortest_path_length = length
+            else:
+                for v in backward.pop_level():
+                    depends_on.add(v)
+                    for c in SchemaNode.get_constituents(v):
+                        depends_on.update(
+                            self.equivalence_class.get_equivalence_class(c)
+                        )
+                    for u, edges, nodes in self.find_predecessors_of_node(
+                        v, node1, node2
+                    ):
+                        backward.label(u, levels[1] + len(edges), (v, edges, nodes))
+                        if u in forward.distances:
+                            length = forward.distances[u] + backward.distances[u]
+                            if (
+                                shortest_path_length is None
+                                or length < shortest_path_length
+                            ):
+                                shortest_path_length = length
+
+        if explored is not None:
+            explored.update(depends_on)
+
+        if shortest_path_length is None:
+            raise NoShortestPathBetweenNodesException(node1, node2)
+
+        # Every shortest path passes through a node whose distances from both ends are final
+        shortest_paths = {}
+        for m in forward.distances:
+            if not (forward.is_final(m) and backward.is_final(m)):
+                continue
+            if forward.distances[m] + backward.distances[m] != shortest_path_length:
+                continue
+            for to_m in forward.routes(m):
+                for from_m in backward.routes(m):
+                    steps = to_m + list(reversed(from_m))
+                    edges = [e for (_, es, _) in steps for e in es]
+                    key = tuple(
+                        (e.from_node, e.to_node, e.cardinality, e.is_equality())
+                        for e in edges
+                    )
+                    if key not in shortest_paths:
+                        shortest_paths[key] = (
+                            [n for (_, _, ns) in steps for n in ns],
+                            edges,
+                        )
+
+        if len(shortest_paths) > 1:
+            raise MultipleShortestPathsBetweenNodesException(
+                node1,
+                node2,
+                sorted([es for (_, es) in shortest_paths.values()], key=str),
+            )
+
+        ((nodes, edges),) = shortest_paths.values()
+        return nodes, edges
+
     def __repr__(self):
         divider = "==========================\n"
         small_divider = "--------------------------\n"
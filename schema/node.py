@@ -3,8 +3,6 @@ from __future__ import annotations
 import abc
 import uuid
 
-import numpy as np
-
 from schema.base_types import BaseType
 from schema.union_find import UnionFind
 
@@ -85,18 +83,11 @@ class SchemaNode(abc.ABC):
         c2 = SchemaNode.get_constituents(node2)
         if len(c1) != len(c2):
             return False
-        eq = np.all(
-            np.array(
-                list(
-                    map(
-                        lambda x: equivalence_class.find_leader(x[0])
-                        == equivalence_class.find_leader(x[1]),
-                        zip(c1, c2),
-                    )
-                )
-            )
+        # Stops at the first pair of constituents that are not equivalent
+        return all(
+            equivalence_class.find_leader(a) == equivalence_class.find_leader(b)
+            for a, b in zip(c1, c2)
         )
-        return eq
 
     @abc.abstractmethod
     def __eq__(self, other):
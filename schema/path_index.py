@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from schema.cardinality import Cardinality
+from schema.edge import SchemaEdge
+from schema.node import SchemaNode
+
+
+class PathIndexEntry:
+    """
+    A shortest path cached under its start node, end node and waypoints
+    """
+
+    def __init__(
+        self,
+        cardinality: Cardinality,
+        edges: list[SchemaEdge],
+        explored: frozenset[SchemaNode],
+    ):
+        """
+        Creates a new PathIndexEntry
+
+        Args:
+            cardinality (Cardinality): The cardinality of the path
+            edges (list[SchemaEdge]): The edges along the path
+            explored (frozenset[SchemaNode]): The nodes whose neighbours were looked up to find the path
+        """
+        self.cardinality = cardinality
+        self.edges = edges
+        self.explored = explored
+
+
+class PathIndex:
+    """
+    Memoizes the shortest paths found in a schema graph, and the neighbours of its nodes.
+    A path only depends on the nodes that were explored to find it, so when the graph changes,
+    only the paths that explored a node whose neighbours or equivalents changed are dropped.
+    """
+
+    def __init__(self):
+        """Creates a new, empty PathIndex"""
+        self.paths: dict[tuple, PathIndexEntry] = {}
+        self.neighbours: dict[SchemaNode, set[tuple[SchemaNode, Cardinality]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @classmethod
+    def key_of(
+        cls, node1: SchemaNode, node2: SchemaNode, via: list[SchemaNode]
+    ) -> tuple:
+        return node1, node2, tuple(via)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def get(
+        self, node1: SchemaNode, node2: SchemaNode, via: list[SchemaNode]
+    ) -> tuple[Cardinality, list[SchemaEdge]] | None:
+        """
+        Looks up the shortest path between two nodes through some waypoints
+
+        Args:
+            node1 (SchemaNode): The start node
+            node2 (SchemaNode): The end node
+            via (list[SchemaNode]): The waypoints
+
+        Returns:
+            tuple[Cardinality, list[SchemaEdge]] | None: The cardinality and edges of the path,
+            or None if it is not cached
+        """
+        key = PathIndex.key_of(node1, node2, via)
+        if key not in self.paths:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry = self.paths[key]
+        return entry.cardinality, list(entry.edges)
+
+    def put(
+        self,
+        node1: SchemaNode,
+        node2: SchemaNode,
+        via: list[SchemaNode],
+        cardinality: Cardinality,
+        edges: list[SchemaEdge],
+        explored: frozenset[SchemaNode],
+    ) -> None:
+        """
+        Caches the shortest path between two nodes through some waypoints
+
+        Args:
+            node1 (SchemaNode): The start node
+            node2 (SchemaNode): The end node
+            via (list[SchemaNode]): The waypoints
+            cardinality (Cardinality): The cardinality of the path
+            edges (list[SchemaEdge]): The edges along the path
+            explored (frozenset[SchemaNode]): The nodes whose neighbours were looked up to find the path
+        """
+        key = PathIndex.key_of(node1, node2, via)
+        self.paths[key] = PathIndexEntry(cardinality, list(edges), explored)
+
+    def invalidate(self, is_affected: Callable[[SchemaNode], bool]) -> None:
+        """
+        Drops the paths that explored an affected node, and the neighbours of affected nodes
+
+        Args:
+            is_affected (Callable[[SchemaNode], bool]): Whether the neighbours or equivalents of a node may have changed
+        """
+        stale = [
+            k for k, e in self.paths.items() if any(is_affected(n) for n in e.explored)
+        ]
+        for key in stale:
+            del self.paths[key]
+        self.invalidations += len(stale)
+        for node in [n for n in self.neighbours if is_affected(n)]:
+            del self.neighbours[node]
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the number of cached paths, and the number of hits, misses and invalidated paths
+
+        Returns:
+            dict[str, int]: The statistics
+        """
+        return {
+            "paths": len(self.paths),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+    def clear(self) -> None:
+        """Removes every cached path and neighbour set"""
+        self.paths.clear()
+        self.neighbours.clear()
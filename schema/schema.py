@@ -1,16 +1,30 @@
+from __future__ import annotations
+
+import os
+import pickle
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
 
 from backend.pandas_backend.determine_base_type_of_columns import (
+    convert_dtype_to_base_type,
     determine_base_type_of_columns,
 )
 from backend.pandas_backend.exceptions import KeyDuplicationException
 from backend.pandas_backend.pandas_backend import PandasBackend
+from backend.backend import Backend
+from backend.sql_backend.sql_backend import SQLBackend
 from schema.cardinality import Cardinality
+from schema.chunk_loader import ChunkLoader
 from schema.edge import SchemaEdge
 from schema.exceptions import (
     NodesDoNotExistInGraphException,
     ClassAlreadyExistsException,
     CannotInsertDataFrameIfSchemaBackedBySQLBackendException,
+    CannotInsertSQLTableIfSchemaNotBackedBySQLBackendException,
+    CannotSaveSchemaIfBackedByNonPandasBackendException,
     SchemaClassMustBeSpecifiedException,
     CannotBlendNodesUnderDifferentClassesException,
     CannotBlendNodesWithDifferentTypeException,
@@ -21,10 +35,36 @@ from schema.node import SchemaNode, AtomicNode, SchemaClass
 from representation.domain import Domain
 from frontend.tables.table import Table
 
+SNAPSHOT_FILE = "schema.pickle"
+
 
 def check_for_duplicate_keys(keys):
-    duplicates = keys[keys.duplicated()].drop_duplicates()
-    if len(keys.columns) > 1:
+    raise_for_duplicate_keys(keys[keys.duplicated()].drop_duplicates())
+
+
+def prepare_data(columns: list[pd.Series]) -> pd.DataFrame:
+    """
+    Selects the rows of some columns with no missing values, keeping only the first of any duplicate rows.
+    The columns are only copied once, when the rows are selected.
+
+    Args:
+        columns (list[pd.Series]): The columns, with the same index
+
+    Returns:
+        pd.DataFrame: The selected rows
+    """
+    df = pd.DataFrame({i: c for i, c in enumerate(columns)}, copy=False)
+    mask = np.logical_and.reduce([c.notna().to_numpy() for c in columns])
+    if len(columns) == 1:
+        mask &= ~columns[0].duplicated().to_numpy()
+    # The keys of a dataframe are unique, so the rows of a relation are never duplicated
+    selected = df[mask]
+    selected.columns = [c.name for c in columns]
+    return selected
+
+
+def raise_for_duplicate_keys(duplicates):
+    if len(duplicates.columns) > 1:
         duplicates = duplicates.itertuples(index=False, name=None)
     else:
         duplicates = duplicates.values
@@ -36,14 +76,33 @@ def check_for_duplicate_keys(keys):
 class Schema:
     """A Schema holds a SchemaGraph and a Backend"""
 
-    def __init__(self):
-        """Creates a new Schema with an empty graph and no backend"""
-        self.schema_graph = SchemaGraph()
-        self.backend = None
+    def __init__(
+        self,
+        lazy: bool = False,
+        backend: Backend = None,
+        bidirectional: bool = False,
+        profile: bool = False,
+    ):
+        """Creates a new Schema with an empty graph
+
+        Args:
+            lazy (bool): If True, tables derived from the schema are only executed
+                when their result is observed, rather than after every operation
+            backend (Backend): The backend holding the data. If None, a PandasBackend
+                is created when the first dataframe is inserted
+            bidirectional (bool): If True, the paths composed along are searched for
+                from both of their ends
+            profile (bool): If True, the PandasBackend created for the schema measures every
+                representation step it runs, and tables report the measurements with Table.profile
+        """
+        self.schema_graph = SchemaGraph(bidirectional)
+        self.backend = backend
+        self.lazy = lazy
+        self.profile = profile
 
     def insert_dataframe(self, df: pd.DataFrame) -> dict[str, AtomicNode]:
         """Inserts a dataframe with non-empty index into the Schema.
-        The backend must be of type PandasBackend.
+        The backend must be of type PandasBackend or SQLBackend.
         If the Backend is None, it is automatically initialised as a new PandasBackend.
         Each column is a new node in the schema.
         An edge between the indices and each value column is added.
@@ -54,19 +113,246 @@ class Schema:
         Returns:
             dict[str, AtomicNode]: A dictionary from name of column in the df to corresponding node in the SchemaGraph
         """
+        return self.insert_dataframes([df])[0]
+
+    def insert_dataframes(
+        self, dfs: list[pd.DataFrame], max_workers: int | None = None
+    ) -> list[dict[str, AtomicNode]]:
+        """Inserts several dataframes with non-empty indices into the Schema, as insert_dataframe does for each.
+        Every dataframe is checked for duplicate keys before any of them is inserted.
+        The domain of each column, and the relation between the keys and each value column,
+        is computed with a single copy of the column, and the graph is modified once for all the dataframes.
+        If the backend is a SQLBackend, each dataframe is registered with the database and inserted
+        as insert_sql_table inserts a table, so its domains and relations are computed by the database.
+
+        Args:
+            dfs (list[pd.DataFrame]): The pandas DataFrames, each with non-empty index.
+            max_workers (int | None): If given, the domains and relations are computed by this many threads.
+                Ignored if the backend is a SQLBackend
+
+        Returns:
+            list[dict[str, AtomicNode]]: For each dataframe, a dictionary from name of column in the df
+            to corresponding node in the SchemaGraph
+        """
+        if isinstance(self.backend, SQLBackend):
+            return self.__insert_registered_dataframes(dfs)
+        self.__use_pandas_backend()
+
+        frames = []
+        for df in dfs:
+            keys = df.index.to_frame().reset_index(drop=True)
+            check_for_duplicate_keys(keys)
+            key_types = determine_base_type_of_columns(keys)
+            val_types = determine_base_type_of_columns(df)
+            key_nodes = [
+                AtomicNode(name.lower(), node_type)
+                for (name, node_type) in zip(keys.columns.to_list(), key_types)
+            ]
+            val_nodes = [
+                AtomicNode(name.lower(), node_type)
+                for (name, node_type) in zip(df.columns.to_list(), val_types)
+            ]
+            frames += [(df, keys, key_nodes, val_nodes)]
+
+        tasks = []
+        for df, keys, key_nodes, val_nodes in frames:
+            key_node = SchemaNode.product(key_nodes)
+            index = pd.RangeIndex(len(df))
+            columns = {n.name: keys[n.name] for n in key_nodes} | {
+                n.name: df[n.name].set_axis(index, copy=False) for n in val_nodes
+            }
+            for node in key_nodes + val_nodes:
+                tasks += [(node, [columns[node.name]])]
+            for node in val_nodes:
+                edge = SchemaEdge(key_node, node, Cardinality.MANY_TO_ONE)
+                tasks += [(edge, [columns[n.name] for n in key_nodes + [node]])]
+
+        if max_workers is None:
+            prepared = [prepare_data(cs) for (_, cs) in tasks]
+        else:
+            with ThreadPoolExecutor(max_workers) as executor:
+                prepared = list(executor.map(prepare_data, [cs for (_, cs) in tasks]))
+
+        return self.__insert_prepared(
+            [(key_nodes, val_nodes) for (_, _, key_nodes, val_nodes) in frames],
+            [(target, data) for (target, _), data in zip(tasks, prepared)],
+        )
+
+    def insert_chunks(
+        self, chunks: Iterable[pd.DataFrame], keys: list[str]
+    ) -> dict[str, AtomicNode]:
+        """Inserts a table whose rows arrive in chunks into the Schema, as insert_dataframe does for the whole table.
+        The chunks are consumed one at a time, and only the rows that end up in a domain or a relation
+        are kept from each of them, so the whole table is never held in memory.
+        The keys are checked for duplicates chunk by chunk, and the types of the columns
+        are determined from the values of every chunk.
+
+        Args:
+            chunks (Iterable[pd.DataFrame]): The chunks, each with the same columns, including the keys
+            keys (list[str]): The columns that uniquely identify the rows of the table
+
+        Returns:
+            dict[str, AtomicNode]: A dictionary from name of column in the table to corresponding node in the SchemaGraph
+        """
+        self.__use_pandas_backend()
+        loader = ChunkLoader(keys)
+        for chunk in chunks:
+            raise_for_duplicate_keys(loader.add(chunk))
+        if loader.columns is None:
+            return {}
+
+        val_names = [c for c in loader.columns if c not in set(keys)]
+        domains = {name: loader.domain(name) for name in keys + val_names}
+        key_nodes = [
+            AtomicNode(name.lower(), convert_dtype_to_base_type(domains[name], name))
+            for name in keys
+        ]
+        val_nodes = [
+            AtomicNode(name.lower(), convert_dtype_to_base_type(domains[name], name))
+            for name in val_names
+        ]
+        key_node = SchemaNode.product(key_nodes)
+        data = [
+            (n, domains[c]) for n, c in zip(key_nodes + val_nodes, keys + val_names)
+        ]
+        for node, name in zip(val_nodes, val_names):
+            edge = SchemaEdge(key_node, node, Cardinality.MANY_TO_ONE)
+            data += [(edge, loader.relation(name))]
+        return self.__insert_prepared([(key_nodes, val_nodes)], data)[0]
+
+    def insert_file(
+        self, path: str, keys: list[str], chunksize: int = 100_000
+    ) -> dict[str, AtomicNode]:
+        """Inserts a CSV or Parquet file into the Schema, reading it in chunks as insert_chunks does.
+        Files ending in .parquet or .pq are read as Parquet, which requires pyarrow, and any other file as CSV.
+
+        Args:
+            path (str): The path of the file
+            keys (list[str]): The columns that uniquely identify the rows of the file
+            chunksize (int): The number of rows in each chunk
+
+        Returns:
+            dict[str, AtomicNode]: A dictionary from name of column in the file to corresponding node in the SchemaGraph
+        """
+        if path.endswith(".parquet") or path.endswith(".pq"):
+            import pyarrow.parquet as pq
+
+            batches = pq.ParquetFile(path).iter_batches(batch_size=chunksize)
+            return self.insert_chunks((b.to_pandas() for b in batches), keys)
+        with pd.read_csv(path, chunksize=chunksize) as reader:
+            return self.insert_chunks(reader, keys)
+
+    def __use_pandas_backend(self) -> None:
         if self.backend is None:
-            self.backend = PandasBackend()
+            self.backend = PandasBackend(profile=self.profile)
         else:
             if not isinstance(self.backend, PandasBackend):
                 raise CannotInsertDataFrameIfSchemaBackedBySQLBackendException()
 
-        keys = df.index.to_frame().reset_index(drop=True)
-        check_for_duplicate_keys(keys)
+    def __insert_prepared(
+        self,
+        tables: list[tuple[list[AtomicNode], list[AtomicNode]]],
+        data: list[tuple[AtomicNode | SchemaEdge, pd.DataFrame]],
+    ) -> list[dict[str, AtomicNode]]:
+        """
+        Stores the prepared domains and relations of some tables in the backend, and adds the
+        nodes and clusters of the tables to the graph
 
-        key_names = keys.columns.to_list()
-        key_types = determine_base_type_of_columns(keys)
-        val_names = df.columns.to_list()
-        val_types = determine_base_type_of_columns(df)
+        Args:
+            tables (list[tuple[list[AtomicNode], list[AtomicNode]]]): The key nodes and value nodes of each table
+            data (list[tuple[AtomicNode | SchemaEdge, pd.DataFrame]]): The domain of each node,
+                and the relation of each edge, with no missing values or duplicates
+
+        Returns:
+            list[dict[str, AtomicNode]]: For each table, a dictionary from name of column to corresponding node
+        """
+        for target, d in data:
+            if isinstance(target, SchemaEdge):
+                self.backend.map_edge_to_data_relation(target, d, prepared=True)
+            else:
+                self.backend.map_atomic_node_to_domain(target, d, prepared=True)
+
+        self.schema_graph.add_nodes(
+            [n for (key_nodes, val_nodes) in tables for n in key_nodes + val_nodes]
+        )
+        self.schema_graph.add_clusters(
+            [
+                (key_nodes + val_nodes, SchemaNode.product(key_nodes))
+                for (key_nodes, val_nodes) in tables
+            ]
+        )
+
+        return [
+            {node.name: node for node in key_nodes + val_nodes}
+            for (key_nodes, val_nodes) in tables
+        ]
+
+    def insert_sql_table(self, table: str, keys: list[str]) -> dict[str, AtomicNode]:
+        """Inserts a table that is stored in the database of the backend into the Schema.
+        The backend must be a SQLBackend. The data never leaves the database.
+        Each column is a new node in the schema.
+        An edge between the keys and each value column is added.
+
+        Args:
+            table (str): The name of the table in the database
+            keys (list[str]): The columns of the table that uniquely identify its rows
+
+        Returns:
+            dict[str, AtomicNode]: A dictionary from name of column in the table to corresponding node in the SchemaGraph
+        """
+        if not isinstance(self.backend, SQLBackend):
+            raise CannotInsertSQLTableIfSchemaNotBackedBySQLBackendException()
+        return self.__insert_sql_tables([(table, keys)])[0]
+
+    def __insert_registered_dataframes(
+        self, dfs: list[pd.DataFrame]
+    ) -> list[dict[str, AtomicNode]]:
+        """
+        Inserts dataframes into a Schema backed by a SQLBackend, by registering each with the database
+        for as long as its domains and relations are computed from it
+
+        Args:
+            dfs (list[pd.DataFrame]): The pandas DataFrames, each with non-empty index.
+
+        Returns:
+            list[dict[str, AtomicNode]]: For each dataframe, a dictionary from name of column in the df
+            to corresponding node in the SchemaGraph
+        """
+        tables = []
+        try:
+            for df in dfs:
+                frame = df.reset_index()
+                table = self.backend.new_table("frame")
+                self.backend.register_table(table, frame)
+                tables += [(table, list(frame.columns[: df.index.nlevels]))]
+            return self.__insert_sql_tables(tables)
+        finally:
+            for table, _ in tables:
+                self.backend.unregister_table(table)
+
+    def __insert_sql_tables(
+        self, tables: list[tuple[str, list[str]]]
+    ) -> list[dict[str, AtomicNode]]:
+        """
+        Inserts tables of the database of the backend into the Schema, as insert_sql_table does for each.
+        Every table is checked for duplicate keys before any of them is inserted.
+
+        Args:
+            tables (list[tuple[str, list[str]]]): The name of each table, with the columns that uniquely identify its rows
+
+        Returns:
+            list[dict[str, AtomicNode]]: For each table, a dictionary from name of column to corresponding node
+        """
+        for table, keys in tables:
+            raise_for_duplicate_keys(self.backend.find_duplicate_keys(table, keys))
+        return [self.__insert_sql_table(table, keys) for table, keys in tables]
+
+    def __insert_sql_table(self, table: str, keys: list[str]) -> dict[str, AtomicNode]:
+        sample = self.backend.sample_table(table)
+        key_names = keys
+        key_types = determine_base_type_of_columns(sample[key_names])
+        val_names = [c for c in sample.columns if c not in set(keys)]
+        val_types = determine_base_type_of_columns(sample[val_names])
 
         key_nodes = [
             AtomicNode(name.lower(), node_type)
@@ -80,17 +366,14 @@ class Schema:
         key_node = SchemaNode.product(key_nodes)
         nodes = key_nodes + val_nodes
 
-        dfa = df.reset_index()
-
-        for node in nodes:
-            self.backend.map_atomic_node_to_domain(
-                node, pd.DataFrame(dfa[node.name]).drop_duplicates()
-            )
+        for name, node in zip(key_names + val_names, nodes):
+            self.backend.map_atomic_node_to_column(node, table, name)
 
-        for node in val_nodes:
-            self.backend.map_edge_to_data_relation(
+        for name, node in zip(val_names, val_nodes):
+            self.backend.map_edge_to_columns(
                 SchemaEdge(key_node, node, Cardinality.MANY_TO_ONE),
-                df[node.name].reset_index().drop_duplicates(),
+                table,
+                key_names + [name],
             )
 
         self.schema_graph.add_nodes(nodes)
@@ -319,6 +602,62 @@ class Schema:
         self.backend = new_backend
         return populated_table, self
 
+    def save(self, path: str) -> None:
+        """Saves the Schema, with the data of its backend, to a directory, from which load reads it back.
+        The graph is pickled, and the domains and relations are written to Arrow IPC files.
+        Files that the save this one replaces wrote, and that this save does not refer to, are removed,
+        unless a schema loaded in this process still maps them.
+        The backend must be a PandasBackend, or None.
+
+        Args:
+            path (str): The directory, which is created if it does not exist
+        """
+        if self.backend is not None and not isinstance(self.backend, PandasBackend):
+            raise CannotSaveSchemaIfBackedByNonPandasBackendException()
+        os.makedirs(path, exist_ok=True)
+        replaced = None
+        if os.path.exists(os.path.join(path, SNAPSHOT_FILE)):
+            with open(os.path.join(path, SNAPSHOT_FILE), "rb") as f:
+                replaced = pickle.load(f)["backend"]
+        snapshot = {
+            "graph": self.schema_graph,
+            "lazy": self.lazy,
+            "profile": self.profile,
+            "backend": None if self.backend is None else self.backend.snapshot(path),
+        }
+        with open(os.path.join(path, f"{SNAPSHOT_FILE}.tmp"), "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(
+            os.path.join(path, f"{SNAPSHOT_FILE}.tmp"),
+            os.path.join(path, SNAPSHOT_FILE),
+        )
+        # Files are only removed once the snapshot that no longer refers to them has replaced the old one
+        PandasBackend.remove_replaced_files(path, replaced, snapshot["backend"])
+
+    @classmethod
+    def load(cls, path: str, storage_dir: str | None = None) -> Schema:
+        """Loads a Schema saved to a directory by save.
+        The nodes keep their ids, and the domains and relations are memory-mapped from their files
+        when they are first read, so the files must not be removed while the Schema is in use.
+
+        Args:
+            path (str): The directory
+            storage_dir (str | None): If given, data stored in the backend after it is loaded is kept in
+                Arrow IPC files in this directory, as with PandasBackend(storage_dir=...), rather than in memory
+
+        Returns:
+            Schema: The Schema
+        """
+        with open(os.path.join(path, SNAPSHOT_FILE), "rb") as f:
+            snapshot = pickle.load(f)
+        schema = Schema(snapshot["lazy"], profile=snapshot.get("profile", False))
+        schema.schema_graph = snapshot["graph"]
+        if snapshot["backend"] is not None:
+            schema.backend = PandasBackend.from_snapshot(
+                path, snapshot["backend"], storage_dir
+            )
+        return schema
+
     def __repr__(self):
         return self.schema_graph.__repr__()
 
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+
+from schema.edge import SchemaEdge
+from schema.node import SchemaNode
+
+# A step along a path: the node at the other end of the step, the edges it traverses,
+# and the nodes it adds to the path, both in the direction of the path
+Step = tuple[SchemaNode, list[SchemaEdge], list[SchemaNode]]
+
+
+class SearchSide:
+    """
+    One side of a bidirectional shortest path search.
+    Nodes are labelled with their distance from the start of the side, and are expanded
+    one distance at a time. The length of a step is the number of edges it traverses.
+    Each node keeps every step that reaches it at its distance, so that all shortest paths
+    to it can be recovered.
+    """
+
+    def __init__(self, start: SchemaNode):
+        """
+        Creates a new SearchSide, where only the start node is labelled
+
+        Args:
+            start (SchemaNode): The node the side starts from
+        """
+        self.distances: dict[SchemaNode, int] = {start: 0}
+        self.steps: dict[SchemaNode, list[Step]] = {start: []}
+        self.levels: dict[int, list[SchemaNode]] = {0: [start]}
+        self.expanded: int = -1
+
+    def next_level(self) -> int | None:
+        """
+        Returns the smallest distance whose nodes have not been expanded, or None if there is none
+
+        Returns:
+            int | None: The distance
+        """
+        if len(self.levels) == 0:
+            return None
+        return min(self.levels)
+
+    def pop_level(self) -> list[SchemaNode]:
+        """
+        Removes the nodes at the next distance, which are then considered expanded.
+        The distances of every node up to one more than this distance are then final,
+        as every step traverses at least one edge.
+
+        Returns:
+            list[SchemaNode]: The nodes at the next distance
+        """
+        level = self.next_level()
+        self.expanded = level
+        return self.levels.pop(level)
+
+    def label(self, node: SchemaNode, distance: int, step: Step) -> None:
+        """
+        Records a step reaching a node, if it reaches it no later than any step before it
+
+        Args:
+            node (SchemaNode): The node reached
+            distance (int): The distance of the node along the step
+            step (Step): The step, from the node it starts at on this side
+        """
+        if node in self.distances and self.distances[node] < distance:
+            return
+        if node not in self.distances or self.distances[node] > distance:
+            if node in self.distances:
+                self.levels[self.distances[node]].remove(node)
+            self.distances[node] = distance
+            self.steps[node] = []
+            self.levels.setdefault(distance, []).append(node)
+        self.steps[node].append(step)
+
+    def is_final(self, node: SchemaNode) -> bool:
+        return node in self.distances and self.distances[node] <= self.expanded + 1
+
+    def routes(self, node: SchemaNode) -> Iterator[list[Step]]:
+        """
+        Generates the shortest routes from the start of the side to a node
+
+        Args:
+            node (SchemaNode): The node, whose distance must be final
+
+        Returns:
+            Iterator[list[Step]]: The steps along each route, from the start of the side
+        """
+        if len(self.steps[node]) == 0:
+            yield []
+        for step in self.steps[node]:
+            for route in self.routes(step[0]):
+                yield route + [step]
@@ -1,7 +1,14 @@
+import os
+import pickle
+import tempfile
+
 import expecttest
 
+import numpy as np
 import pandas as pd
 
+from backend.pandas_backend.exceptions import KeyDuplicationException
+from schema.chunk_loader import RowHashes
 from schema.exceptions import *
 from schema.schema import Schema
 from representation.domain import Domain
@@ -111,6 +118,158 @@ bonus
             """Cannot insert dataframe if schema is backed by non-pandas backend""",
         )
 
+    def test_schema_insert_dataframes_insertsEveryDataframeOrNone(self):
+        bonus_df = pd.read_csv("csv/bonus.csv").set_index(["trip_id", "cardnum"])
+        person_df = pd.read_csv("csv/person.csv").set_index("cardnum")
+        schema = Schema()
+        bonus, person = schema.insert_dataframes([bonus_df, person_df], max_workers=2)
+        self.assertExpectedInline(
+            str([sorted(bonus), sorted(person)]),
+            """[['bonus', 'cardnum', 'trip_id'], ['cardnum', 'person']]""",
+        )
+        self.assertEqual(
+            schema.backend.get_domain_size(person["cardnum"]),
+            person_df.index.nunique(),
+        )
+        self.assertEqual(len(schema.schema_graph.adjacencyList), 6)
+
+        duplicated_df = pd.concat([person_df, person_df])
+        self.assertRaises(
+            KeyDuplicationException,
+            lambda: schema.insert_dataframes([person_df, duplicated_df]),
+        )
+        self.assertEqual(len(schema.schema_graph.schema_nodes), 5)
+
+    def test_schema_insert_file_matchesInsertDataframe(self):
+        keys = ["trip_id", "cardnum"]
+        bonus_df = pd.read_csv("csv/bonus.csv").set_index(keys)
+        schema = Schema()
+        bonus = schema.insert_dataframe(bonus_df)
+        chunked = schema.insert_file("csv/bonus.csv", keys, chunksize=2)
+        self.assertEqual(
+            [bonus[c].node_type for c in sorted(bonus)],
+            [chunked[c].node_type for c in sorted(chunked)],
+        )
+        backend = schema.backend
+        for c in bonus:
+            pd.testing.assert_frame_equal(
+                backend.node_data[bonus[c]], backend.node_data[chunked[c]]
+            )
+        relations = {e.to_node: r for e, r in backend.edge_data.items()}
+        pd.testing.assert_frame_equal(
+            relations[bonus["bonus"]], relations[chunked["bonus"]]
+        )
+
+        chunks = pd.read_csv("csv/bonus.csv", chunksize=2)
+        duplicated = [*chunks, pd.read_csv("csv/bonus.csv").iloc[[0]]]
+        self.assertExpectedRaisesInline(
+            KeyDuplicationException,
+            lambda: schema.insert_chunks(duplicated, keys),
+            """Duplicate key/s detected: (0, 101).""",
+        )
+        self.assertEqual(len(schema.schema_graph.schema_nodes), 6)
+
+    def test_rowHashes_mergesChunksIntoLogarithmicallyManyRuns(self):
+        values = np.random.default_rng(0).permutation(1000)
+        hashes = RowHashes()
+        for chunk in np.array_split(values[:900], 90):
+            hashes.add(RowHashes.of(pd.Series(chunk)))
+        self.assertEqual(len(hashes), 900)
+        self.assertLessEqual(len(hashes.runs), 10)
+        for run in hashes.runs:
+            self.assertTrue(np.array_equal(run, np.sort(run)))
+        seen = hashes.contains(RowHashes.of(pd.Series(values)))
+        self.assertEqual(list(seen), [True] * 900 + [False] * 100)
+
+    def test_schema_load_restoresSavedSchema(self):
+        bonus_df = (
+            pd.read_csv("csv/bonus.csv").dropna().set_index(["trip_id", "cardnum"])
+        )
+        person_df = pd.read_csv("csv/person.csv").dropna().set_index(["cardnum"])
+        schema = Schema()
+        bonus = schema.insert_dataframe(bonus_df)
+        person = schema.insert_dataframe(person_df)
+        schema.blend(bonus["cardnum"], person["cardnum"], schema.create_class("Card"))
+        t = schema.get(cardnum=person["cardnum"]).infer(["cardnum"], bonus["bonus"])
+
+        with tempfile.TemporaryDirectory() as directory:
+            schema.save(directory)
+            loaded = Schema.load(directory)
+            self.assertEqual(
+                sorted(str(loaded).split("\n")), sorted(str(schema).split("\n"))
+            )
+            self.assertEqual(len(loaded.backend.edge_data.frames), 0)
+            loaded_t = loaded.get(cardnum=person["cardnum"]).infer(
+                ["cardnum"], bonus["bonus"]
+            )
+            self.assertEqual(str(loaded_t), str(t))
+
+    def test_schema_save_removesFilesOfEarlierSaves(self):
+        person_df = pd.read_csv("csv/person.csv").dropna().set_index(["cardnum"])
+        bonus_df = (
+            pd.read_csv("csv/bonus.csv").dropna().set_index(["trip_id", "cardnum"])
+        )
+        schema = Schema()
+        person = schema.insert_dataframe(person_df)
+
+        def files(directory):
+            return {
+                os.path.join(kind, name)
+                for kind in os.listdir(directory)
+                if os.path.isdir(os.path.join(directory, kind))
+                for name in os.listdir(os.path.join(directory, kind))
+            }
+
+        with tempfile.TemporaryDirectory() as directory:
+            schema.save(directory)
+            first = files(directory)
+            schema.insert_dataframe(bonus_df)
+            schema.save(directory)
+            with open(os.path.join(directory, "schema.pickle"), "rb") as f:
+                state = pickle.load(f)["backend"]
+            saved = {
+                os.path.join(kind, name)
+                for kind in ["node_data", "edge_data", "closure_results"]
+                for name in state[kind].values()
+            }
+            self.assertEqual(files(directory), saved)
+            self.assertTrue(first.isdisjoint(saved))
+
+            loaded = Schema.load(directory)
+            loaded.insert_dataframe(person_df.rename(columns={"person": "name"}))
+            loaded.save(directory)
+            self.assertEqual(len(files(directory)), len(saved) + 3)
+            t = Schema.load(directory).get(cardnum=person["cardnum"])
+            self.assertEqual(str(t), str(schema.get(cardnum=person["cardnum"])))
+
+    def test_schema_save_keepsFilesOfLoadedSchemasAndOtherFiles(self):
+        person_df = pd.read_csv("csv/person.csv").dropna().set_index(["cardnum"])
+        bonus_df = (
+            pd.read_csv("csv/bonus.csv").dropna().set_index(["trip_id", "cardnum"])
+        )
+        schema = Schema()
+        person = schema.insert_dataframe(person_df)
+
+        with tempfile.TemporaryDirectory() as directory:
+            schema.save(directory)
+            loaded = Schema.load(directory)
+            other = os.path.join(directory, "node_data", "other.arrow")
+            open(other, "wb").close()
+            schema.insert_dataframe(bonus_df)
+            schema.save(directory)
+            self.assertTrue(os.path.exists(other))
+            t = loaded.get(cardnum=person["cardnum"]).infer(
+                ["cardnum"], person["person"]
+            )
+            self.assertEqual(
+                str(t),
+                str(
+                    schema.get(cardnum=person["cardnum"]).infer(
+                        ["cardnum"], person["person"]
+                    )
+                ),
+            )
+
     def test_add_node_successfullyAddsNodeIfNodeNotAlreadyInGraph(self):
         schema = Schema()
         from schema.node import AtomicNode
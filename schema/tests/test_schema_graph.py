@@ -582,3 +582,130 @@ class
         self.assertExpectedInline(
             str(path), """(<Cardinality.MANY_TO_MANY: 4>, [u --- w])"""
         )
+
+    def test_findShortestPath_reusesPathUntilExploredNodeChanges(self):
+        g = SchemaGraph()
+        u = AtomicNode("u")
+        v = AtomicNode("v")
+        w = AtomicNode("w")
+        x = AtomicNode("x")
+        y = AtomicNode("y")
+        u.id_prefix = 0
+        v.id_prefix = 0
+        w.id_prefix = 0
+        x.id_prefix = 0
+        y.id_prefix = 0
+        g.add_nodes([u, v, w, x])
+        g.add_edge(u, v)
+        g.add_edge(v, w)
+        g.find_shortest_path(u, w, [])
+        g.find_shortest_path(u, w, [])
+        # the search from u does not explore x or y, so the path is kept
+        g.add_node(y)
+        g.add_edge(x, y)
+        g.find_shortest_path(u, w, [])
+        self.assertExpectedInline(
+            str(g.path_index.stats()),
+            """{'paths': 1, 'hits': 2, 'misses': 1, 'invalidations': 0}""",
+        )
+        g.add_edge(u, w)
+        self.assertExpectedInline(
+            str(g.find_shortest_path(u, w, [])),
+            """(<Cardinality.MANY_TO_MANY: 4>, [u --- w])""",
+        )
+        self.assertExpectedInline(
+            str(g.path_index.stats()),
+            """{'paths': 1, 'hits': 2, 'misses': 2, 'invalidations': 1}""",
+        )
+
+    def test_findNodesContaining_intersectsConstituentsAndRespectsOrder(self):
+        g = SchemaGraph()
+        u = AtomicNode("u")
+        v = AtomicNode("v")
+        w = AtomicNode("w")
+        u.id_prefix = 0
+        v.id_prefix = 0
+        w.id_prefix = 0
+        g.add_nodes([u, v, w])
+        g.add_edge(SchemaNode.product([u, v, w]), w)
+        g.add_edge(SchemaNode.product([v, u]), w)
+        self.assertExpectedInline(
+            str(sorted(g.nodes_containing[u], key=str)),
+            """[u;v;w, v;u]""",
+        )
+        self.assertExpectedInline(
+            str(sorted(g.find_nodes_containing(SchemaNode.product([u, v])), key=str)),
+            """[u;v;w]""",
+        )
+        self.assertExpectedInline(
+            str(sorted(g.find_nodes_containing(w), key=str)),
+            """[u;v;w, w]""",
+        )
+
+    def test_findAllEquivalentNodes_recomputesAfterBlend(self):
+        g = SchemaGraph()
+        u = AtomicNode("u")
+        v = AtomicNode("v")
+        w = AtomicNode("w")
+        u.id_prefix = 0
+        v.id_prefix = 0
+        w.id_prefix = 0
+        g.add_nodes([u, v, w])
+        p = SchemaNode.product([u, w])
+        self.assertExpectedInline(str(g.find_all_equivalent_nodes(p)), """[u;w]""")
+        self.assertIn(p, g.equivalent_nodes)
+        g.blend_nodes(u, v)
+        self.assertExpectedInline(str(g.find_all_equivalent_nodes(p)), """[u;w, v;w]""")
+        self.assertEqual(g.equivalent_nodes_version, g.equivalence_class.version)
+
+    def test_findAllShortestPathsBidirectionally_RaisesExceptionIfMultipleShortestPathsFound(
+        self,
+    ):
+        g = SchemaGraph(bidirectional=True)
+        u = AtomicNode("u")
+        v = AtomicNode("v")
+        w = AtomicNode("w")
+        x = AtomicNode("x")
+        u.id_prefix = 0
+        v.id_prefix = 0
+        w.id_prefix = 0
+        x.id_prefix = 0
+        g.add_nodes([u, v, w, x])
+        g.add_edge(u, v)
+        g.add_edge(u, w)
+        g.add_edge(v, x)
+        g.add_edge(w, x)
+        self.assertExpectedRaisesInline(
+            MultipleShortestPathsBetweenNodesException,
+            lambda: str(g.find_all_shortest_paths_bidirectionally(u, x)),
+            """Multiple shortest paths found between nodes u and x. Shortest paths: [[u --- v, v --- x], [u --- w, w --- x]]""",
+        )
+
+    def test_findShortestPath_bidirectionalFindsPathsThroughWaypointsAndEquivalences(
+        self,
+    ):
+        g = SchemaGraph(bidirectional=True)
+        u = AtomicNode("u")
+        v = AtomicNode("v")
+        w = AtomicNode("w")
+        x = AtomicNode("x")
+        y = AtomicNode("y")
+        u.id_prefix = 0
+        v.id_prefix = 0
+        w.id_prefix = 0
+        x.id_prefix = 0
+        y.id_prefix = 0
+        g.add_nodes([u, v, w, x, y])
+        g.add_edge(u, v)
+        g.add_edge(v, w, Cardinality.ONE_TO_MANY)
+        g.add_edge(x, y, Cardinality.ONE_TO_ONE)
+        g.blend_nodes(w, x)
+        self.assertExpectedInline(
+            str(g.find_shortest_path(u, y, [v])),
+            """(<Cardinality.MANY_TO_MANY: 4>, [u --- v, v <--- w, w === x, x <--> y])""",
+        )
+        self.assertExpectedRaisesInline(
+            CycleDetectedInPathException,
+            lambda: str(g.find_shortest_path(u, u, [v])),
+            """Cycle detected in path.""",
+        )
@@ -11,65 +11,58 @@ class UnionFindTest(unittest.TestCase):
         self.assertEqual(i1, i2)
         self.assertNotEqual(i1, i3)
 
-    def test_add_singleton_succeedsWithNoSideEffects_whenSingletonNotInUF(self):
+    def test_add_singleton_succeeds_whenSingletonNotInUF(self):
         uf = UnionFind.initialise()
-        uf2 = UnionFind.add_singleton(uf, 2)
-        self.assertEqual({UnionFindItem(2): UnionFindItem(2)}, uf2.leaders)
-        self.assertEqual({UnionFindItem(2): 0}, uf2.rank)
-        self.assertEqual({UnionFindItem(2): frozenset()}, uf2.graph)
-        self.assertEqual({}, uf.leaders)
+        UnionFind.add_singleton(uf, 2)
+        self.assertEqual({2: 2}, uf.leaders)
+        self.assertEqual({2: 0}, uf.rank)
+        self.assertEqual({2: [2]}, uf.members)
 
     def test_add_singleton_isIdempotent(self):
         uf = UnionFind.initialise()
-        uf2 = UnionFind.add_singleton(uf, 2)
-        uf3 = UnionFind.add_singleton(uf2, 2)
-        self.assertEqual({UnionFindItem(2): UnionFindItem(2)}, uf3.leaders)
-        self.assertEqual({UnionFindItem(2): 0}, uf3.rank)
-        self.assertEqual({UnionFindItem(2): frozenset()}, uf3.graph)
-        self.assertEqual({}, uf.leaders)
+        uf = UnionFind.add_singleton(uf, 2)
+        uf = UnionFind.add_singleton(uf, 2)
+        self.assertEqual({2: 2}, uf.leaders)
+        self.assertEqual({2: 0}, uf.rank)
+        self.assertEqual({2: [2]}, uf.members)
 
-    def test_union_succeeds(self):
+    def test_snapshot_isNotAffectedByLaterUpdates(self):
         uf = UnionFind.initialise()
-        uf2 = UnionFind.add_singleton(uf, 2)
-        uf3 = UnionFind.add_singleton(uf2, 3)
-        uf4 = UnionFind.union(uf3, 2, 3)
-        self.assertEqual(
-            {UnionFindItem(2): UnionFindItem(2), UnionFindItem(3): UnionFindItem(2)},
-            uf4.leaders,
-        )
+        uf = UnionFind.add_singletons(uf, [2, 3])
+        snapshot = uf.snapshot()
+        uf = UnionFind.add_singleton(uf, 4)
+        uf = UnionFind.union(uf, 2, 3)
+        self.assertEqual({2: 2, 3: 3}, snapshot.leaders)
+        self.assertEqual({3}, snapshot.get_equivalence_class(3))
+        self.assertEqual({2, 3}, uf.get_equivalence_class(3))
 
-    def test_find_leader_succeeds(self):
+    def test_union_succeeds(self):
         uf = UnionFind.initialise()
         uf = UnionFind.add_singleton(uf, 2)
         uf = UnionFind.add_singleton(uf, 3)
-        uf = UnionFind.add_singleton(uf, 4)
         uf = UnionFind.union(uf, 2, 3)
-        uf = UnionFind.union(uf, 3, 4)
-        self.assertEqual(
-            {
-                UnionFindItem(2): UnionFindItem(2),
-                UnionFindItem(3): UnionFindItem(2),
-                UnionFindItem(4): UnionFindItem(3),
-            },
-            uf.leaders,
-        )
-        self.assertEqual(2, uf.find_leader(4))
-        self.assertEqual(
-            {
-                UnionFindItem(2): UnionFindItem(2),
-                UnionFindItem(3): UnionFindItem(2),
-                UnionFindItem(4): UnionFindItem(2),
-            },
-            uf.leaders,
-        )
-        self.assertEqual(
-            {
-                UnionFindItem(2): frozenset([UnionFindItem(3), UnionFindItem(4)]),
-                UnionFindItem(3): frozenset(),
-                UnionFindItem(4): frozenset(),
-            },
-            uf.graph,
-        )
+        self.assertEqual({2: 2, 3: 2}, uf.leaders)
+        self.assertEqual({2: [2, 3]}, uf.members)
+
+    def test_union_linksLeaders(self):
+        uf = UnionFind.initialise()
+        uf = UnionFind.add_singletons(uf, [2, 3, 4, 5])
+        uf = UnionFind.union(uf, 2, 3)
+        uf = UnionFind.union(uf, 4, 5)
+        uf = UnionFind.union(uf, 5, 3)
+        self.assertEqual({2: 4, 3: 2, 4: 4, 5: 4}, uf.leaders)
+        self.assertEqual({4: [4, 5, 2, 3]}, uf.members)
+        self.assertEqual({2, 3, 4, 5}, uf.get_equivalence_class(2))
+
+    def test_find_leader_succeeds(self):
+        uf = UnionFind.initialise()
+        uf = UnionFind.add_singletons(uf, [2, 3, 4, 5])
+        uf = UnionFind.union(uf, 2, 3)
+        uf = UnionFind.union(uf, 4, 5)
+        uf = UnionFind.union(uf, 4, 2)
+        self.assertEqual({2: 4, 3: 2, 4: 4, 5: 4}, uf.leaders)
+        self.assertEqual(4, uf.find_leader(3))
+        self.assertEqual({2: 4, 3: 4, 4: 4, 5: 4}, uf.leaders)
 
     def test_get_equivalence_class(self):
         uf = UnionFind.initialise()
@@ -83,6 +76,14 @@ class UnionFindTest(unittest.TestCase):
         self.assertEqual({2, 3, 4}, xs)
         self.assertEqual({5}, uf.get_equivalence_class(5))
 
+    def test_union_attachesClassnameToWholeClass(self):
+        uf = UnionFind.initialise()
+        uf = UnionFind.add_singletons(uf, [2, 3, 4])
+        uf = UnionFind.union(uf, 2, 3)
+        uf.attach_classname(4, "c")
+        uf = UnionFind.union(uf, 4, 3)
+        self.assertEqual(["c", "c", "c"], [uf.get_classname(v) for v in [2, 3, 4]])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,4 @@
 from __future__ import annotations
-from collections import deque
 from typing import TypeVar, Generic
 
 T = TypeVar("T")
@@ -47,30 +46,53 @@ class UnionFind(Generic[T]):
     """
     A UnionFind data structure
     Parameterised on type T
+
+    The structure is updated in place, using union by rank and path compression,
+    and the members of each equivalence class are kept in a list at its leader.
+    Callers that need an earlier state to persist should take a snapshot first.
+    The version is incremented whenever two classes are merged, so that callers can
+    tell whether results they derived from the classes are still valid.
     """
 
     def __init__(
         self,
-        leaders: dict[UnionFindItem[T], UnionFindItem[T]],
-        rank: dict[UnionFindItem[T], int],
-        graph: dict[UnionFindItem[T], frozenset[UnionFindItem[T]]],
-        classnames: dict[UnionFindItem[T], UnionFindItem[T]],
+        leaders: dict[T, T],
+        rank: dict[T, int],
+        members: dict[T, list[T]],
+        classnames: dict[T, T | None],
     ):
-        self.leaders: dict[UnionFindItem[T], UnionFindItem[T]] = leaders
-        self.classnames: dict[UnionFindItem[T], UnionFindItem[T]] = classnames
-        self.rank: dict[UnionFindItem[T], int] = rank
-        self.graph: dict[UnionFindItem[T], frozenset[UnionFindItem[T]]] = graph
+        self.leaders: dict[T, T] = leaders
+        self.classnames: dict[T, T | None] = classnames
+        self.rank: dict[T, int] = rank
+        self.members: dict[T, list[T]] = members
+        self.version: int = 0
 
     def __repr__(self):
         return str(self.leaders)
 
     def __contains__(self, v):
-        return v in self.leaders.keys()
+        return v in self.leaders
 
     @classmethod
     def initialise(cls):
         return UnionFind({}, {}, {}, {})
 
+    def snapshot(self) -> UnionFind[T]:
+        """
+        Copies the UnionFind data structure, so that later updates to either copy do not affect the other
+
+        Returns:
+            UnionFind[T]: The copy
+        """
+        copy = UnionFind(
+            dict(self.leaders),
+            dict(self.rank),
+            {k: list(v) for k, v in self.members.items()},
+            dict(self.classnames),
+        )
+        copy.version = self.version
+        return copy
+
     @classmethod
     def add_singleton(
         cls, uf: UnionFind[T], v: T, classname: str | None = None
@@ -84,18 +106,15 @@ class UnionFind(Generic[T]):
             classname (str | None): The class name of the singleton
 
         Returns:
-            UnionFind[T]: A new UnionFind data structure with the added singleton
+            UnionFind[T]: The UnionFind data structure, with the added singleton
         """
-        item = UnionFindItem(v)
-        if item in uf.leaders.keys():
+        if v in uf.leaders:
             return uf
-        leaders = uf.leaders | {item: item}
-        rank = uf.rank | {item: 0}
-        graph = uf.graph | {item: frozenset()}
-        classnames = uf.classnames | {
-            item: UnionFindItem(classname) if classname is not None else None
-        }
-        return UnionFind(leaders, rank, graph, classnames)
+        uf.leaders[v] = v
+        uf.rank[v] = 0
+        uf.members[v] = [v]
+        uf.classnames[v] = classname
+        return uf
 
     @classmethod
     def add_singletons(cls, uf: UnionFind[T], vs: list[T]) -> UnionFind[T]:
@@ -107,15 +126,11 @@ class UnionFind(Generic[T]):
             vs (T): The values of the singletons to be addled
 
         Returns:
-            UnionFind[T]: A new UnionFind data structure with the added singleton
+            UnionFind[T]: The UnionFind data structure, with the added singletons
         """
-        items = frozenset([UnionFindItem(v) for v in vs])
-        new_items = items.difference(uf.leaders.keys())
-        leaders = uf.leaders | {item: item for item in new_items}
-        rank = uf.rank | {item: 0 for item in new_items}
-        graph = uf.graph | {item: frozenset() for item in new_items}
-        classnames = uf.classnames | {item: None for item in new_items}
-        return UnionFind(leaders, rank, graph, classnames)
+        for v in vs:
+            UnionFind.add_singleton(uf, v)
+        return uf
 
     def find_leader(self, val: T) -> T:
         """
@@ -127,19 +142,14 @@ class UnionFind(Generic[T]):
         Returns:
             T: The leader of the equivalence class of the given value
         """
-        item = UnionFindItem(val)
-        if item not in self.leaders.keys():
-            raise UnionFindDoesNotContainItemException(item)
-        u = item
-        path = frozenset()
-        while not (u == self.leaders[u]):
-            path = path.union([u])
-            u = self.leaders[u]
-        for node in path:
-            self.leaders[node] = u
-            self.graph[u] = self.graph[u].union([node])
-            self.graph[node] = frozenset()
-        return u.val
+        if val not in self.leaders:
+            raise UnionFindDoesNotContainItemException(UnionFindItem(val))
+        leader = val
+        while self.leaders[leader] != leader:
+            leader = self.leaders[leader]
+        while self.leaders[val] != leader:
+            self.leaders[val], val = leader, self.leaders[val]
+        return leader
 
     def attach_classname(self, val: T, classname: str) -> list[T]:
         """
@@ -154,15 +164,12 @@ class UnionFind(Generic[T]):
         """
         members = self.get_equivalence_class(val)
         for m in members:
-            i = UnionFindItem(m)
             assert (
-                i not in self.classnames.keys()
-                or self.classnames[i] is None
-                or self.classnames[i].val == classname
-            )
-            self.classnames[i] = (
-                UnionFindItem(classname) if classname is not None else None
+                m not in self.classnames
+                or self.classnames[m] is None
+                or self.classnames[m] == classname
             )
+            self.classnames[m] = classname
         return members
 
     @classmethod
@@ -176,45 +183,30 @@ class UnionFind(Generic[T]):
             val2 (T): The second value
 
         Returns:
-            UnionFind[T]: A new UnionFind data structure with the equivalence classes of val1 and val2 unioned
-        """
-        """
-        :param uf: 
-        :param val1: 
-        :param val2: 
-        :return: 
-        """
-        item1 = UnionFindItem(val1)
-        item2 = UnionFindItem(val2)
-
-        if item1 not in uf.rank.keys():
-            raise UnionFindDoesNotContainItemException(item1)
-        if item2 not in uf.rank.keys():
-            raise UnionFindDoesNotContainItemException(item2)
-        rank1 = uf.rank[item1]
-        clss1 = uf.classnames[item1]
-        rank2 = uf.rank[item2]
-        clss2 = uf.classnames[item2]
+            UnionFind[T]: The UnionFind data structure, with the equivalence classes of val1 and val2 unioned
+        """
+        if val1 not in uf.leaders:
+            raise UnionFindDoesNotContainItemException(UnionFindItem(val1))
+        if val2 not in uf.leaders:
+            raise UnionFindDoesNotContainItemException(UnionFindItem(val2))
+        clss1 = uf.classnames[val1]
+        clss2 = uf.classnames[val2]
         assert clss1 is None or clss2 is None or clss1 == clss2
-        leaders = uf.leaders
-        graph = uf.graph
-        rank = uf.rank
-        if rank1 > rank2:
-            leaders[item2] = item1
-            graph[item1] = graph[item1].union([item2])
-        elif rank2 > rank1:
-            leaders[item1] = item2
-            graph[item2] = graph[item2].union([item1])
-        else:
-            leaders[item2] = item1
-            graph[item1] = graph[item1].union([item2])
-            rank[item1] += 1
-        new_uf = UnionFind(leaders, rank, graph, uf.classnames)
+        leader1 = uf.find_leader(val1)
+        leader2 = uf.find_leader(val2)
+        if leader1 != leader2:
+            if uf.rank[leader1] < uf.rank[leader2]:
+                leader1, leader2 = leader2, leader1
+            elif uf.rank[leader1] == uf.rank[leader2]:
+                uf.rank[leader1] += 1
+            uf.leaders[leader2] = leader1
+            uf.members[leader1] += uf.members.pop(leader2)
+            uf.version += 1
         if clss1 is not None:
-            new_uf.attach_classname(val2, clss1.val)
+            uf.attach_classname(val2, clss1)
         if clss2 is not None:
-            new_uf.attach_classname(val1, clss2.val)
-        return new_uf
+            uf.attach_classname(val1, clss2)
+        return uf
 
     def get_classname(self, val: T) -> str | None:
         """
@@ -226,13 +218,7 @@ class UnionFind(Generic[T]):
         Returns:
             str | None: The class name of the equivalence class of the given value, or None if there is no such class name
         """
-
-        item = UnionFindItem(val)
-        return (
-            self.classnames[item].val
-            if item in self.classnames.keys() and self.classnames[item] is not None
-            else None
-        )
+        return self.classnames.get(val)
 
     def get_equivalence_class(self, val: T) -> set[T]:
         """
@@ -244,13 +230,4 @@ class UnionFind(Generic[T]):
         Returns:
             set[T]: The equivalence class of the given value
         """
-        es = {val}
-        ldr = self.find_leader(val)
-        to_explore = deque([UnionFindItem(ldr)])
-        while len(to_explore) > 0:
-            u = to_explore.popleft()
-            es = es.union([u.val])
-            ns = self.graph[u]
-            for n in ns:
-                to_explore.appendleft(n)
-        return es
+        return set(self.members[self.find_leader(val)])